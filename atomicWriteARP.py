@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+'''This script writes the cached outputs of this ARP (the data snapshot,
+   stage outputs, crosswalks, model records, figures, and their manifests)
+   through a temporary file that is renamed into place, so a reader never
+   sees a partly written file, whether the writer was interrupted or another
+   worker process was writing the same path'''
+
+
+# import relevant Python libraries
+import os
+
+# function for writing path atomically: writer is called with the open temporary file (mode "w" for text,
+# "wb" for binary), which then replaces path; a failed write removes the temporary file and leaves path as it was
+def atomicWrite (path, writer, mode="w"):
+	os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+	temporaryPath = f"{path}.{os.getpid()}.tmp"
+	try:
+		with open(temporaryPath, mode=mode) as temporaryFile:
+			writer(temporaryFile)
+		os.replace(temporaryPath, path)
+	finally:
+		if os.path.exists(temporaryPath):
+			os.remove(temporaryPath)
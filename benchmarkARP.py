@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+'''This script benchmarks the ingestion pipeline on synthetic inputs written
+   by syntheticDataARP: it times each stage, records its throughput and peak
+   memory, fails when a stage regresses past a threshold relative to a saved
+   baseline, and checks that the merged output still matches the digest of
+   the original (pre-optimization) implementation's output on the same
+   synthetic inputs, recorded in benchmarkGolden.json'''
+
+
+# import relevant Python libraries
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# import data importing/processing functions, state assessment specs, and synthetic data generator scripted for this ARP
+import dataImportProcessingARP
+import instrumentationARP
+import syntheticDataARP
+from stateAssessmentsARP import stateSpecs
+
+# stages shorter than this are dominated by timer noise and never count as regressions
+noiseFloor = 0.05
+
+# digests of the original implementation's dataFinal output, by number of synthetic schools and seed
+goldenPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarkGolden.json")
+
+# function for running one stage, recording wall time, throughput and peak memory
+# size is the amount of work done by the stage (input megabytes or school records), used for throughput
+def timeStage (stages, name, function, *args, size=None, unit=None):
+	peakBefore = instrumentationARP.peakMemory()
+	start = time.perf_counter()
+	result = function(*args)
+	seconds = time.perf_counter() - start
+	stages[name] = {
+		'seconds': seconds,
+		'throughput': size / seconds if size is not None and seconds > 0 else None,
+		'unit': unit,
+		'peakRSS': instrumentationARP.peakMemory(),
+		'peakRSSGrowth': instrumentationARP.memoryGrowth(peakBefore, instrumentationARP.peakMemory())
+	}
+	return result
+
+# function for the size of a list of input files in MB
+def megabytes (paths):
+	return sum(os.path.getsize(path) for path in paths) / (1 << 20)
+
+# function for a digest of stateDatasets that changes if any state, record, field, value or value type changes
+# only the fields of the merged school schema count, since the original implementation also kept every unused CRDC column
+def outputDigest (stateDatasets):
+	fields = set(dataImportProcessingARP.schoolFields)
+	digest = hashlib.sha256()
+	for state, data in stateDatasets.items():
+		digest.update(f"{state}|{len(data)}\n".encode())
+		for school in data:
+			digest.update(repr(sorted((field, type(value).__name__, repr(value)) for field, value in school.items() if field in fields)).encode())
+	return digest.hexdigest()
+
+# function for the digest of the original implementation's output on the inputs in the current directory,
+# given the path of its dataImportProcessingARP.py (e.g. written by: git show <baseline commit>:dataImportProcessingARP.py)
+def goldenDigest (baselinePath):
+	moduleSpec = importlib.util.spec_from_file_location("baselineDataImportProcessingARP", baselinePath)
+	baselineModule = importlib.util.module_from_spec(moduleSpec)
+	moduleSpec.loader.exec_module(baselineModule)
+	return outputDigest(baselineModule.dataFinal())
+
+# function for running every benchmarked stage against the synthetic inputs in the current directory
+def runStages (workers, analysis):
+	stages = {}
+	states = list(stateSpecs)
+
+	# national parse
+	nationalPaths = [path for source in dataImportProcessingARP.nationalFiles for path in dataImportProcessingARP.sourcePaths(source)]
+	national = timeStage(stages, "national parse", dataImportProcessingARP.importNational, [stateSpecs[state]['state'] for state in states],
+		size=megabytes(nationalPaths), unit="MB/s")
+
+	# each state's assessment parse and merge, as the per-state assessmentXX functions did
+	stateDatasets = {}
+	for state in states:
+		spec = stateSpecs[state]
+		paths = list(dict.fromkeys(test['file'] for test in spec['tests']))
+		stateDatasets[state] = timeStage(stages, f"assessment{spec['state']}",
+			lambda: dataImportProcessingARP.mergeState(national, state, dataImportProcessingARP.readAssessments(spec)),
+			size=megabytes(paths), unit="MB/s")
+
+	# z scores for every state
+	records = sum(len(data) for data in stateDatasets.values())
+	timeStage(stages, "calculateZScores", lambda: [dataImportProcessingARP.calculateZScores(data) for data in stateDatasets.values()],
+		size=records, unit="schools/s")
+	stateDatasets["All"] = [school for data in stateDatasets.values() for school in data]
+
+	# the full dataFinal call, whose output must match the staged pipeline's
+	final = timeStage(stages, "dataFinal", dataImportProcessingARP.dataFinal, workers, size=records, unit="schools/s")
+	digest = outputDigest(stateDatasets)
+	if outputDigest(final) != digest:
+		sys.exit("FAIL: dataFinal output differs from the staged pipeline's output")
+
+	# the analysis stages need pandas and pingouin; without them they are skipped rather than failing the run
+	if analysis and not all(importlib.util.find_spec(module) for module in ["pandas", "pingouin"]):
+		print("skipping the analysis stages: pandas and pingouin are not both installed")
+		analysis = False
+
+	# the analysis passes: the columnar frame and the sample funnel
+	if analysis:
+		import funnelARP
+		frame, present = timeStage(stages, "columnar frame", funnelARP.columnarFrame, stateDatasets, size=records, unit="schools/s")
+		timeStage(stages, "funnel", funnelARP.funnel, {state: len(data) for state, data in stateDatasets.items()}, frame, present, size=records, unit="schools/s")
+
+	# the analysis script, run as a child process on the same inputs with the same number of workers on any host
+	if analysis:
+		script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataAnalysisARP.py")
+		start = time.perf_counter()
+		completed = subprocess.run([sys.executable, script, "--workers", str(workers)], capture_output=True, text=True, env={**os.environ, 'MPLBACKEND': 'Agg'})
+		if completed.returncode != 0:
+			sys.exit("FAIL: the analysis script exited with an error:\n" + completed.stderr)
+		seconds = time.perf_counter() - start
+		stages["analysis"] = {
+			'seconds': seconds,
+			'throughput': records / seconds,
+			'unit': "schools/s",
+			'peakRSS': instrumentationARP.peakMemory(children=True),
+			'peakRSSGrowth': None
+		}
+
+	return stages, digest
+
+# function for comparing a run against the baseline; returns the list of failures
+def compare (run, baseline, threshold):
+	failures = []
+	if baseline['schools'] != run['schools'] or baseline['seed'] != run['seed']:
+		return [f"baseline was recorded for {baseline['schools']} schools with seed {baseline['seed']}"]
+
+	if baseline['digest'] != run['digest']:
+		failures.append("output digest differs from the baseline's")
+
+	for name, stage in run['stages'].items():
+		if name not in baseline['stages']:
+			continue
+		before = baseline['stages'][name]['seconds']
+		if stage['seconds'] > noiseFloor and stage['seconds'] > before * (1 + threshold):
+			failures.append(f"{name} took {stage['seconds']:.3f}s, {stage['seconds'] / before - 1:+.0%} versus the baseline's {before:.3f}s")
+
+	return failures
+
+# function for printing the per-stage results table
+def printTable (run, baseline):
+	print(f"{'stage':<20}{'seconds':>10}{'baseline':>10}{'throughput':>20}{'peak RSS MB':>14}")
+	for name, stage in run['stages'].items():
+		before = baseline['stages'].get(name, {}).get('seconds') if baseline else None
+		before = f"{before:.3f}" if before is not None else ""
+		throughput = f"{stage['throughput']:,.1f} {stage['unit']}" if stage['throughput'] is not None else ""
+		print(f"{name:<20}{stage['seconds']:>10.3f}{before:>10}{throughput:>20}{instrumentationARP.formatMemory(stage['peakRSS'], 14)}")
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('--schools', type=int, default=5000, help="number of synthetic schools nationwide (default 5000)")
+	parser.add_argument('--seed', type=int, default=0, help="random seed for the synthetic inputs (default 0)")
+	parser.add_argument('--data', help="directory for the synthetic inputs (default: a temporary directory)")
+	parser.add_argument('--workers', type=int, default=1, help="worker processes for the dataFinal stage and the analysis script (default 1)")
+	parser.add_argument('--analysis', action='store_true', help="also time the analysis passes and the analysis script")
+	parser.add_argument('--baseline', default="benchmarkBaseline.json", help="baseline JSON file (default benchmarkBaseline.json)")
+	parser.add_argument('--save-baseline', action='store_true', help="write this run as the new baseline instead of comparing")
+	parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown per stage before failing (default 0.25)")
+	parser.add_argument('--output', help="also write this run's results to a JSON file")
+	parser.add_argument('--save-golden', metavar='BASELINE_MODULE', help="run the original implementation (the path of its dataImportProcessingARP.py) "
+		"on the synthetic inputs and record its output digest in benchmarkGolden.json")
+	args = parser.parse_args()
+
+	baselinePath = os.path.abspath(args.baseline)
+	outputPath = os.path.abspath(args.output) if args.output else None
+	baselineModulePath = os.path.abspath(args.save_golden) if args.save_golden else None
+
+	with tempfile.TemporaryDirectory() as temporary:
+		root = args.data or temporary
+		start = time.perf_counter()
+		syntheticDataARP.generate(root, args.schools, args.seed)
+		print(f"generated {args.schools} synthetic schools in {time.perf_counter() - start:.1f}s")
+
+		# the pipeline reads its inputs relative to the data directory
+		os.chdir(root)
+		golden = {}
+		if os.path.exists(goldenPath):
+			with open(goldenPath) as goldenFile:
+				golden = json.load(goldenFile)
+		goldenKey = f"{args.schools}|{args.seed}"
+		if baselineModulePath:
+			golden[goldenKey] = goldenDigest(baselineModulePath)
+			with open(goldenPath, mode="w") as goldenFile:
+				json.dump(golden, goldenFile, indent=1, sort_keys=True)
+			print("saved the original implementation's output digest to", goldenPath)
+		stages, digest = runStages(args.workers, args.analysis)
+
+	# the output must match the original implementation's, whatever the timings
+	if goldenKey not in golden:
+		print(f"no golden digest for {args.schools} schools with seed {args.seed} - run with --save-golden to record one")
+	elif golden[goldenKey] != digest:
+		sys.exit("FAIL: output differs from the original implementation's output on the same inputs")
+
+	run = {'schools': args.schools, 'seed': args.seed, 'digest': digest, 'stages': stages}
+	if outputPath:
+		with open(outputPath, mode="w") as outputFile:
+			json.dump(run, outputFile, indent=1)
+
+	if args.save_baseline:
+		with open(baselinePath, mode="w") as baselineFile:
+			json.dump(run, baselineFile, indent=1)
+		printTable(run, None)
+		print("saved baseline to", baselinePath)
+		sys.exit()
+
+	baseline = None
+	if os.path.exists(baselinePath):
+		with open(baselinePath) as baselineFile:
+			baseline = json.load(baselineFile)
+	printTable(run, baseline)
+
+	if baseline is None:
+		print("no baseline at", baselinePath, "- run with --save-baseline to record one")
+		sys.exit()
+
+	failures = compare(run, baseline, args.threshold)
+	for failure in failures:
+		print("FAIL:", failure)
+	sys.exit(1 if failures else 0)
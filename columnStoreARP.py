@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+'''This script writes the merged school table as a directory of memory-
+   mappable .npy files (one per numeric column, dictionary codes for every
+   string column, and a matrix of which fields each school has) with a JSON
+   manifest keyed by the data snapshot's fingerprint, so the table is built
+   once per machine and every analysis process, including pool workers,
+   opens it zero-copy and shares its pages through the OS cache'''
+
+
+# import relevant Python libraries
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# import the data snapshot and columnar frame scripted for this ARP
+import dataCacheARP
+import funnelARP
+
+# directory (relative to the data directory) holding the column files and their manifest
+storeDir = os.path.join(dataCacheARP.cacheDir, "columns")
+manifestName = "manifest.json"
+
+# bump when the store layout changes so old stores are rebuilt
+storeVersion = 1
+
+# function for writing a columnar frame (and its presence frame) to the store; datasetRows maps each dataset
+# (every state, then "All") to its number of schools, in order
+def writeStore (frame, present, datasetRows, key):
+	manifest = {'version': storeVersion, 'key': key, 'rows': len(frame), 'datasets': datasetRows, 'columns': [],
+		'present': {'file': "present.npy", 'fields': list(present.columns)}}
+
+	# write to a temporary directory first so an interrupted run never leaves a partial store
+	temporaryDir = f"{storeDir}.{os.getpid()}.tmp"
+	shutil.rmtree(temporaryDir, ignore_errors=True)
+	os.makedirs(temporaryDir)
+
+	for c, column in enumerate(frame.columns):
+		values = frame[column]
+
+		# numbers as fixed-width arrays; strings (and anything else) as int32 codes into a dictionary, -1 where missing
+		if values.dtype.kind in "biuf":
+			columnMeta = {'name': column, 'dtype': str(values.dtype), 'file': f"c{c}.npy"}
+			np.save(os.path.join(temporaryDir, columnMeta['file']), values.to_numpy())
+		else:
+			codes, dictionary = pd.factorize(values)
+			columnMeta = {'name': column, 'dtype': str(values.dtype), 'file': f"c{c}.codes.npy", 'dictionary': dictionary.tolist()}
+			np.save(os.path.join(temporaryDir, columnMeta['file']), codes.astype(np.int32))
+		manifest['columns'].append(columnMeta)
+
+	np.save(os.path.join(temporaryDir, manifest['present']['file']), present.to_numpy(dtype=bool))
+
+	# the manifest is written last: a directory without one is never opened
+	with open(os.path.join(temporaryDir, manifestName), mode="w") as manifestFile:
+		json.dump(manifest, manifestFile, indent=1)
+	shutil.rmtree(storeDir, ignore_errors=True)
+	os.replace(temporaryDir, storeDir)
+
+# function for opening the store as memory-mapped arrays; returns None if it is missing or (given a key) stale
+def openStore (key=None):
+	manifestPath = os.path.join(storeDir, manifestName)
+	if not os.path.exists(manifestPath):
+		return None
+	with open(manifestPath) as manifestFile:
+		manifest = json.load(manifestFile)
+	if manifest['version'] != storeVersion or (key is not None and manifest['key'] != key):
+		return None
+
+	return {
+		'manifest': manifest,
+		'columns': {columnMeta['name']: np.load(os.path.join(storeDir, columnMeta['file']), mmap_mode='r') for columnMeta in manifest['columns']},
+		'present': np.load(os.path.join(storeDir, manifest['present']['file']), mmap_mode='r')
+	}
+
+# function for reading the store back as the columnar frame and presence frame (as funnelARP.columnarFrame builds them),
+# optionally only some rows (renumbered from 0) and columns; only the pages of those rows and columns are read
+def storeFrame (store, rows=None, columns=None):
+	selected = [columnMeta for columnMeta in store['manifest']['columns'] if columns is None or columnMeta['name'] in columns]
+
+	data = {}
+	for columnMeta in selected:
+		values = store['columns'][columnMeta['name']]
+		values = np.asarray(values) if rows is None else values[rows]
+		if 'dictionary' in columnMeta:
+			# decode through the dictionary, with a trailing NaN for the missing code
+			values = np.array(columnMeta['dictionary'] + [np.nan], dtype=object)[values]
+		data[columnMeta['name']] = pd.Series(values, dtype=columnMeta['dtype'])
+
+	fields = store['manifest']['present']['fields']
+	present = store['present'] if rows is None else store['present'][rows]
+	present = pd.DataFrame(np.asarray(present), columns=fields)
+	if columns is not None:
+		present = present[[field for field in fields if field in columns]]
+
+	return pd.DataFrame(data), present
+
+# function imported into the data analysis Python program: open the store if it matches the data snapshot's fingerprint,
+# otherwise load (or ingest) stateDatasets and write the store from their columnar frame
+def loadStore (rebuild=False, workers=1):
+	key = dataCacheARP.fingerprint()
+
+	store = None if rebuild else openStore(key)
+	if store is not None:
+		print("opened column store", storeDir)
+		return store
+
+	stateDatasets = dataCacheARP.loadStateDatasets(rebuild=rebuild, workers=workers)
+	frame, present = funnelARP.columnarFrame(stateDatasets)
+	writeStore(frame, present, {state: len(data) for state, data in stateDatasets.items()}, key)
+	print("saved column store to", storeDir)
+
+	return openStore(key)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+'''This script keeps a versioned crosswalk of school identifiers for each
+   state: every CRDC school's row number (its integer id) with its COMBOKEY,
+   CCD NCESSCH, CCD ST_SCHID, and the state-native key its assessment files
+   are matched on. It is built once from the national files and the state
+   specs (kept for the process, and stored as JSON when given a cache
+   directory) and loaded as an index with O(1) lookups in every direction,
+   so ingestion joins assessment rows to school ids without re-deriving
+   any school's key'''
+
+
+# import relevant Python libraries
+import hashlib
+import inspect
+import json
+import os
+import numpy as np
+
+# import the per-state assessment specs, pipeline instrumentation and atomic writes scripted for this ARP
+import stateAssessmentsARP
+import instrumentationARP
+from atomicWriteARP import atomicWrite
+
+# bump when the crosswalk layout changes so old crosswalks are rebuilt
+crosswalkVersion = 3
+
+# identifier columns, each with one entry (None where a school has no such identifier) per school
+idColumns = ['COMBOKEY', 'NCESSCH', 'ST_SCHID', 'native']
+
+# crosswalks built or loaded by this process, by key
+crosswalks = {}
+
+# function for the source code of a function that derives crosswalk entries (its name where the source is not available)
+def derivationSource (derive):
+	if not callable(derive):
+		return derive
+	try:
+		return inspect.getsource(derive)
+	except (OSError, TypeError):
+		return derive.__qualname__
+
+# function for the key of a state's crosswalk: the state, the code that derives it (the spec's join and derived field
+# functions, and buildCrosswalk itself), and the CRDC and CCD files it is built from
+def crosswalkKey (spec, inputPaths):
+	digest = hashlib.sha256(f"crosswalk v{crosswalkVersion}|{spec['state']}".encode())
+	for derive in [buildIndex, buildCrosswalk, spec['join'], *spec.get('derived', {}).values()]:
+		digest.update(derivationSource(derive).encode())
+	for path in inputPaths:
+		stat = os.stat(path)
+		digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+	return digest.hexdigest()
+
+# function for indexing an identifier column: every distinct value gets an integer code (in first-seen order), and the ids
+# of the schools with code c are order[starts[c]:starts[c + 1]], in id order
+def buildIndex (values):
+	codes = {}
+	valueCodes = np.array([codes.setdefault(value, len(codes)) if value is not None else -1 for value in values], dtype=np.int64)
+	order = np.flatnonzero(valueCodes >= 0)
+	order = order[np.argsort(valueCodes[order], kind='stable')]
+	starts = np.concatenate([[0], np.cumsum(np.bincount(valueCodes[order], minlength=len(codes)))])
+	return {'keys': list(codes), 'order': order.tolist(), 'starts': starts.tolist()}
+
+# function for building a state's crosswalk from the national index: one entry per school, in CRDC order,
+# with the spec's derived fields and its school-side join key (which may use only COMBOKEY and ST_SCHID)
+def buildCrosswalk (national, spec):
+	schools = national['schoolsByState'].get(spec['state'], [])
+	ccdData = national['ccdData']
+	join = spec['join']
+
+	columns = {column: [] for column in idColumns}
+	derived = {field: [] for field in spec.get('derived', {})}
+	for row in schools:
+		# map CRDC COMBOKEY to NCESSCH from CCD, and so to ST_SCHID
+		school = {'COMBOKEY': row['COMBOKEY']}
+		if row['COMBOKEY'] in ccdData:
+			school['NCESSCH'] = row['COMBOKEY']
+			school['ST_SCHID'] = ccdData[row['COMBOKEY']].get('ST_SCHID')
+
+		# fields the state's join key needs, then the key itself
+		for field, derive in spec.get('derived', {}).items():
+			value = derive(school)
+			if value is not None:
+				school[field] = value
+			derived[field].append(value)
+		school['native'] = join(school) if callable(join) else school.get(join)
+
+		for column in idColumns:
+			columns[column].append(school.get(column))
+
+	# the join key index is stored with the crosswalk; the counts of schools with each identifier give its match rates
+	return {'version': crosswalkVersion, 'state': spec['state'], 'join': join if isinstance(join, str) else join.__name__,
+		'columns': columns, 'derived': derived, 'nativeIndex': buildIndex(columns['native']),
+		'counts': {column: sum(value is not None for value in columns[column]) for column in idColumns}}
+
+# function for a crosswalk's index of one identifier column, as {'codes': value -> code, 'order', 'starts'} (see buildIndex)
+# the join key index is loaded with the crosswalk; the others are built on first use and kept with it
+def crosswalkIndex (crosswalk, column):
+	indexes = crosswalk.setdefault('indexes', {})
+	if column not in indexes:
+		index = crosswalk['nativeIndex'] if column == 'native' else buildIndex(crosswalk['columns'][column])
+		indexes[column] = {'codes': dict(zip(index['keys'], range(len(index['keys'])))), 'order': index['order'], 'starts': index['starts']}
+	return indexes[column]
+
+# function for the ids (row numbers) of the schools with a value in an index, in id order
+def schoolIds (index, value):
+	code = index['codes'].get(value)
+	if code is None:
+		return []
+	return index['order'][index['starts'][code]:index['starts'][code + 1]]
+
+# function for translating an identifier between columns, e.g. lookup(crosswalk, 'ST_SCHID', 'GA-601-0177', 'COMBOKEY')
+def lookup (crosswalk, fromColumn, value, toColumn):
+	return [crosswalk['columns'][toColumn][i] for i in schoolIds(crosswalkIndex(crosswalk, fromColumn), value)]
+
+# function for a crosswalk's match rates: the share of schools with each identifier and, given the state's
+# assessment results (one {key: row} dictionary per test), the share of result keys and of schools that matched
+def matchRates (crosswalk, results=None):
+	schools = crosswalk['counts']['COMBOKEY']
+	rates = {'schools': schools}
+	for column in idColumns[1:]:
+		rates[column] = crosswalk['counts'][column] / schools if schools else float('nan')
+
+	if results is not None:
+		index = crosswalkIndex(crosswalk, 'native')
+		keys = {key for stateData in results for key in stateData}
+		matched = keys & index['codes'].keys()
+		rates['resultKeys'] = len(matched) / len(keys) if keys else float('nan')
+		rates['matchedSchools'] = sum(len(schoolIds(index, key)) for key in matched) / schools if schools else float('nan')
+	return rates
+
+# function for a state's crosswalk, built from the national index once per process; inputPaths are the CRDC school
+# characteristics and CCD files. Given a cacheDir, the crosswalk is also kept in its "crosswalk" directory and
+# loaded from there, unless it is stale or does not line up with the national index's schools; without one
+# nothing is written
+def stateCrosswalk (national, spec, inputPaths, cacheDir=None):
+	key = crosswalkKey(spec, inputPaths)
+	schools = len(national['schoolsByState'].get(spec['state'], []))
+
+	with instrumentationARP.span("crosswalk", state=spec['state']):
+		crosswalk = crosswalks.get(key)
+		if cacheDir is not None and crosswalk is None:
+			path = os.path.join(cacheDir, "crosswalk", spec['state'] + ".json")
+			if os.path.exists(path):
+				with open(path) as crosswalkFile:
+					crosswalk = json.load(crosswalkFile)
+				if crosswalk['key'] != key:
+					crosswalk = None
+		if crosswalk is not None and crosswalk['counts']['COMBOKEY'] != schools:
+			crosswalk = None
+
+		if crosswalk is None:
+			crosswalk = buildCrosswalk(national, spec)
+			crosswalk['key'] = key
+			if cacheDir is not None:
+				atomicWrite(path, lambda crosswalkFile: json.dump(crosswalk, crosswalkFile))
+		crosswalks[key] = crosswalk
+
+		# schools in the crosswalk, schools with a join key, and schools matched to a CCD record
+		instrumentationARP.count(rowsRead=schools, rowsKept=crosswalk['counts']['native'], rowsMatched=crosswalk['counts']['NCESSCH'])
+
+	return crosswalk
+
+# report every state's crosswalk match rates when run as a script from the data directory, keeping the crosswalks
+# in the cache directory of incrementalBuildARP
+if __name__ == "__main__":
+	import dataImportProcessingARP
+	import incrementalBuildARP
+
+	stateSpecs = stateAssessmentsARP.stateSpecs
+	national = dataImportProcessingARP.importNational([spec['state'] for spec in stateSpecs.values()])
+	inputPaths = dataImportProcessingARP.sourcePaths('characteristics') + dataImportProcessingARP.sourcePaths('ccd')
+
+	print(f"\n{'state':<16}{'schools':>9}{'NCESSCH':>9}{'ST_SCHID':>10}{'join key':>10}{'result keys':>13}{'schools matched':>17}")
+	for state, spec in stateSpecs.items():
+		crosswalk = stateCrosswalk(national, spec, inputPaths, incrementalBuildARP.cacheDir)
+		rates = matchRates(crosswalk, dataImportProcessingARP.readAssessments(spec))
+		print(f"{state:<16}{rates['schools']:>9}{rates['NCESSCH']:>9.1%}{rates['ST_SCHID']:>10.1%}{rates['native']:>10.1%}"
+			f"{rates['resultKeys']:>13.1%}{rates['matchedSchools']:>17.1%}")
@@ -1,332 +1,155 @@
 #!/usr/bin/env python3
 # scripted by Matthew Prins, June-October 2025
-'''This script performs the statistical analysis for a study examining 
-   the impact of 1:1 digital device access on academic growth in mathematics and 
+'''This script performs the statistical analysis for a study examining
+   the impact of 1:1 digital device access on academic growth in mathematics and
    English Language Arts during the COVID-19 pandemic'''
 
-# import relevant Python libraries
-import numpy as np
-import pandas as pd
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
-import seaborn as sns
-import matplotlib.pyplot as plt
-import pingouin as pg
+# import relevant Python libraries (the analysis libraries are imported by the steps that use them,
+# so importing this script, or running one step, does not load the rest)
+import argparse
+import os
+import sys
 
-# import data importing/processing function scripted for this ARP
-import dataImportProcessingARP
+# subjects analyzed, in output order
+subjects = ['MATH', 'ENG']
 
-# save processed data as stateDatasets
-stateDatasets = dataImportProcessingARP.dataFinal()
-print("data processed and imported\n-----\n")
+# "All"-state battery tests run by the regress and hlm steps
+regressTests = ['Descriptive Characteristics', 'Multiple Linear Regression', 'RATIO_DEVICES_TO_ENROLLMENT',
+	'TITLE1ELIG', "3_ENG_ZSCORE", "3_MATH_ZSCORE", "pctBlack", "pctHispanic",
+	"DISTRICT_POVERTY_PERCENTAGE", "Alternate Thresholds"]
+hlmTests = ["Hierarchical Linear Model"]
 
-# iterate through states
-dfFiltered = {}
-for state, testData in stateDatasets.items():
-	for subject in ['MATH', 'ENG']:
-		
-		print("\n-------")
-		print(state, subject, "t test:\n")
-		print("n:", len(testData))
-		
-		# filter data for state and print n
-		filteredData = [row for row in testData 
-			if '3_' + subject + '_NUMBER_STUDENTS' in row
-			or '5_' + subject + '_NUMBER_STUDENTS' in row
-			or '3_' + subject + '_PASS' in row
-			or '5_' + subject + '_PASS' in row
-		]
-		
-		print("n, any state data:", len(filteredData))
-		
-		filteredData = [row for row in filteredData	
-			if subject + '_ZSCORE_CHANGE' in row
-			and 'RATIO_DEVICES_TO_ENROLLMENT' in row]
-	
-		print("n, all state data:", len(filteredData))
+# function for loading the processed data as a store of memory-mapped columns (built once per data snapshot)
+def loadData (rebuild=False, workers=1):
+	import columnStoreARP
+	store = columnStoreARP.loadStore(rebuild=rebuild, workers=workers)
+	print("data processed and imported\n-----\n")
+	return store
+
+# function for reading the store as a columnar frame and computing the sample funnel for every state and subject
+def sampleData (store):
+	import columnStoreARP
+	import funnelARP
+	frame, present = columnStoreARP.storeFrame(store)
+	funnelTable, samples = funnelARP.funnel(store['manifest']['datasets'], frame, present)
+	return frame, samples, funnelTable
+
+# function for splitting every state's filtered data into schools not 1:1 and schools that are 1:1
+def comparisonGroups (frame, samples):
+	comparisons = {}
+	for (state, subject), rows in samples.items():
+		filteredData = frame.iloc[rows]
+		comparisons[(state, subject)] = (
+			filteredData[subject + '_ZSCORE_CHANGE'][filteredData['RATIO_DEVICES_TO_ENROLLMENT'] <= .5].to_numpy(),
+			filteredData[subject + '_ZSCORE_CHANGE'][filteredData['RATIO_DEVICES_TO_ENROLLMENT'] >= .90].to_numpy()
+		)
+	return comparisons
+
+# function for printing the t test, permutation test, and bootstrap intervals of every state and subject
+def tTests (frame, samples, states, subjects, workers=1):
+	import numpy as np
+	import pingouin as pg
+	import inferenceARP
+
+	# permutation tests and bootstrap confidence intervals for the selected states and subjects, resampled in batches
+	# (seeded among all comparisons, so a selection gives the same intervals as the full run)
+	comparisons = comparisonGroups(frame, samples)
+	selected = [(state, subject) for state in states for subject in subjects]
+	resampling = inferenceARP.compareGroups(comparisons, resamples=10000, seed=0, workers=workers, keys=set(selected))
+
+	# iterate through states
+	for state in states:
+		for subject in subjects:
+
+			print("\n-------")
+			print(state, subject, "t test:\n")
+
+			# databases of schools not 1:1 and schools that are 1:1
+			not1to1Data, yes1to1Data = comparisons[(state, subject)]
 
-		filteredData = [row for row in filteredData
-			if row.get('SCH_STATUS_SPED') == 'No'
-			and row.get('SCH_STATUS_MAGNET') == 'No'
-			and row.get('SCH_STATUS_CHARTER') == 'No'
-			and row.get('SCH_STATUS_ALT') == 'No'
-		]																																																																																																																																																																																		
-		
-		print("n, no charter etc.:", len(filteredData))
-		
-		filteredData = [row for row in filteredData
-			if row.get('SCH_DIND_INSTRUCTIONTYPE') == 'A'
-			or row.get('SCH_DIND_INSTRUCTIONTYPE') == 'C'
-			or row.get('SCH_DIND_INSTRUCTIONTYPE') == 'D'
-		]
-		
-		print("n, excluding virtual schools:", len(filteredData))
-		
-		filteredData = [row for row in filteredData 
-			if row['3_' + subject + '_NUMBER_STUDENTS'] >= 20
-			and row['5_' + subject + '_NUMBER_STUDENTS'] >= 20
-		]
-		
-		print("n, >=20 students:", len(filteredData))		
-		
-		filteredData = [row for row in filteredData 
-			if .75*row['3_' + subject + '_NUMBER_STUDENTS'] < row['5_' + subject + '_NUMBER_STUDENTS'] < 1.25*row['3_' + subject + '_NUMBER_STUDENTS']
-		]
-		
-		print("n, 75%-125%:", len(filteredData), "\n")	
+			# perform and print t test
+			result = pg.ttest(np.array(not1to1Data), np.array(yes1to1Data), paired=False, correction='auto', alternative='two-sided')
+			print(result, "\n")
 
-		# create database of schools not 1:1
-		not1to1Data = [row[subject + '_ZSCORE_CHANGE'] for row in filteredData
-			if row['RATIO_DEVICES_TO_ENROLLMENT'] <= .5
-		]
-		
-		# create database of schools that are 1:1
-		yes1to1Data = [row[subject + '_ZSCORE_CHANGE'] for row in filteredData
-			if row['RATIO_DEVICES_TO_ENROLLMENT'] >= .90
-		]
-		
-		# perform and print t test
-		result = pg.ttest(np.array(not1to1Data), np.array(yes1to1Data), paired=False, correction='auto', alternative='two-sided')
-		print(result, "\n")
+			# calculate/print sample sizes, means, and SDs for 1:1/non-1:1
+			n1 = len(not1to1Data)
+			n2 = len(yes1to1Data)
+			mean1 = np.mean(not1to1Data)
+			mean2 = np.mean(yes1to1Data)
+			sd1 = np.std(not1to1Data, ddof=1)
+			sd2 = np.std(yes1to1Data, ddof=1)
 
-		# calculate/print sample sizes, means, and SDs for 1:1/non-1:1
-		n1 = len(not1to1Data)
-		n2 = len(yes1to1Data)
-		mean1 = np.mean(not1to1Data)
-		mean2 = np.mean(yes1to1Data)
-		sd1 = np.std(not1to1Data, ddof=1)
-		sd2 = np.std(yes1to1Data, ddof=1)
-		
-		print(f"Not 1:1 Access: n={n1}, M={mean1:.3f}, SD={sd1:.3f}")
-		print(f"1:1 Access:     n={n2}, M={mean2:.3f}, SD={sd2:.3f}")
-		print(f"Mean Difference: {mean2-mean1:.3f}")
-		
-		# if state is All, save database in dfFiltered[subject] for additional analysis
-		if state == "All":
-				
-			dfFiltered[subject] = pd.DataFrame(filteredData)
-			
-			# add necessary demographic/1:1 columns
-			dfFiltered[subject]['OneToOne'] = dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'].apply(
-				lambda x: 1 if x is not None and x >= 0.90
-					else 0 if x is not None and x <= 0.5 
-					else None
-				)
-			dfFiltered[subject]['pctBlack'] = dfFiltered[subject]['TOTAL_ENROLLMENT_BLACK'] / dfFiltered[subject]['TOTAL_ENROLLMENT']
-			dfFiltered[subject]['pctHispanic'] = dfFiltered[subject]['TOTAL_ENROLLMENT_HISPANIC'] / dfFiltered[subject]['TOTAL_ENROLLMENT']
+			print(f"Not 1:1 Access: n={n1}, M={mean1:.3f}, SD={sd1:.3f}")
+			print(f"1:1 Access:     n={n2}, M={mean2:.3f}, SD={sd2:.3f}")
+			print(f"Mean Difference: {mean2-mean1:.3f}")
 
-	# additional statistical tests/charts for all states
-	if state == "All":
-		# run statistical tests on specific attributes
-		for test in ['Descriptive Characteristics', 'Multiple Linear Regression', 'RATIO_DEVICES_TO_ENROLLMENT',
-					'TITLE1ELIG', "3_ENG_ZSCORE", "3_MATH_ZSCORE", "pctBlack", "pctHispanic",
-					"DISTRICT_POVERTY_PERCENTAGE", "Alternate Thresholds", "Hierarchical Linear Model"]:
-			for subject in ['MATH', 'ENG']:
-				# skip 3_MATH_ZSCORE with ENG and 3_ENG_ZSCORE with MATH
-				if test == '3_MATH_ZSCORE' and subject == 'ENG':
-					continue
-				if test == '3_ENG_ZSCORE' and subject == 'MATH':
-					continue
-				
-				if test == "Descriptive Characteristics":
-					# printing various descriptive characteristics for 1:1 and non-1:1
-					print(f"\n{subject} descriptive characteristics:\n")
-					for label, value in [("One To One", 1), ("Not One To One", 0)]:
-						baselineData = dfFiltered[subject][dfFiltered[subject]['OneToOne'] == value]
-						print(f"{label}:")
-						print(f"n: {len(baselineData)}")
-						print(f"mean pctBlack: {baselineData['pctBlack'].mean(skipna=True)}")
-						print(f"mean pctHispanic: {baselineData['pctHispanic'].mean(skipna=True)}")
-						print(f"fifth-grade {subject} test takers: {baselineData[f'5_{subject}_NUMBER_STUDENTS'].mean(skipna=True)}")
-						print(f"third-grade {subject} z score: {baselineData[f'3_{subject}_ZSCORE'].mean(skipna=True)}")
-						print(f"fifth-grade {subject} z score: {baselineData[f'5_{subject}_ZSCORE'].mean(skipna=True)}")
-						print(f"{subject} z score change: {baselineData[f'{subject}_ZSCORE_CHANGE'].mean(skipna=True)}")
-						print(f"mean district poverty percentage: {baselineData['DISTRICT_POVERTY_PERCENTAGE'].mean(skipna=True)}")
-						print(f"percentage Title I elig.: {baselineData['TITLE1ELIG'].mean(skipna=True)}")
-						print()
-						
-				# run multiple linear regression
-				elif test == "Multiple Linear Regression":
-					
-					# filter data
-					dfTesting = dfFiltered[subject][
-						dfFiltered[subject]['OneToOne'].notna() &
-						dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna() &
-						dfFiltered[subject]['pctBlack'].notna() &
-						dfFiltered[subject]['pctHispanic'].notna() &
-						dfFiltered[subject]['DISTRICT_POVERTY_PERCENTAGE'].notna()
-					]
-					
-					# create OLS model and print summary results
-					formula = f"""{subject}_ZSCORE_CHANGE ~ C(OneToOne) + pctBlack + pctHispanic + DISTRICT_POVERTY_PERCENTAGE + Q("3_{subject}_ZSCORE")"""
-					model = smf.ols(formula, data=dfTesting).fit()
-					
-					print("\n-------")
-					print(f"\nMultiple linear regression for {subject}_ZSCORE_CHANGE:\n")
-					print(model.summary(), "\n")
-					
-				# linear regression on all schools, including ones with ratios between 1:1 and non-1:1	
-				elif test == "RATIO_DEVICES_TO_ENROLLMENT":
-					
-					# filter data
-					dfTesting = dfFiltered[subject][
-						dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'].notna() &
-						dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna()
-					]
-					
-					# create OLS model and print summary results
-					formula = f'Q("{subject}_ZSCORE_CHANGE") ~ Q("RATIO_DEVICES_TO_ENROLLMENT")'
-					model = smf.ols(formula, data=dfTesting).fit()
-					
-					print("\n-------")
-					print(f"Linear regression for the effect of RATIO_DEVICES_TO_ENROLLMENT on {subject}_ZSCORE_CHANGE:\n")
-					print(model.summary(), '\n')
-					
-					# additional linear regression on schools where RATIO_DEVICES_TO_ENROLLMENT <= .5
-					# filter data
-					dfTesting = dfFiltered[subject][
-						dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'].notna() &
-						(dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'] <= 0.5) &
-						dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna()
-					]
-					
-					# create OLS model and print summary results
-					formula = f'Q("{subject}_ZSCORE_CHANGE") ~ Q("RATIO_DEVICES_TO_ENROLLMENT")'
-					model = smf.ols(formula, data=dfTesting).fit()
-					
-					print("\n-------")
-					print(f"Linear regression for the effect of RATIO_DEVICES_TO_ENROLLMENT on {subject}_ZSCORE_CHANGE, only on schools where RATIO_DEVICES_TO_ENROLLMENT <= .5:\n")
-					print(model.summary(), '\n')
-				
-				# run t-tests with various threshold combinations
-				elif test == "Alternate Thresholds":
-					
-					print("\n-------")
-					print(f"\nAlternate Threshold Analysis for {subject}:")
-					
-					# define threshold combos
-					thresholds = [(0.4, 0.85), (0.4, 0.9), (0.4, 0.95), (0.5, 0.85), (0.5, 0.9), (0.5, 0.95), (0.6, 0.85), (0.6, 0.9), (0.6, 0.95)]
-					
-					for non1to1Threshold, yes1to1Threshold in thresholds:
-						
-						# filter at current threshold
-						not1to1DataAlt = dfFiltered[subject][dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'] <= non1to1Threshold][subject + '_ZSCORE_CHANGE'].dropna().values
-							
-						yes1to1DataAlt = dfFiltered[subject][dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'] >= yes1to1Threshold][subject + '_ZSCORE_CHANGE'].dropna().values
-						
-						# perform and print t test
-						result = pg.ttest(np.array(not1to1DataAlt), np.array(yes1to1DataAlt), paired=False, correction='auto', alternative='two-sided')
-						print(f"\n-------\nNon-1:1: <= {non1to1Threshold}, 1:1: >= {yes1to1Threshold}\n")
-						print(result, "\n")
-						
-						# calculate/print sample sizes, means, and SDs for 1:1/non-1:1
-						n1 = len(not1to1DataAlt)
-						n2 = len(yes1to1DataAlt)
-						mean1 = np.mean(not1to1DataAlt)
-						mean2 = np.mean(yes1to1DataAlt)
-						sd1 = np.std(not1to1DataAlt, ddof=1)
-						sd2 = np.std(yes1to1DataAlt, ddof=1)
-							
-						print(f"Not 1:1 Access: n={n1}, M={mean1:.3f}, SD={sd1:.3f}")
-						print(f"1:1 Access: n={n2}, M={mean2:.3f}, SD={sd2:.3f}")
-						print(f"Mean Difference: {mean2-mean1:.3f}")	
-				
-				# run HLM
-				elif test == "Hierarchical Linear Model":
-					
-					# filter data
-					dfTesting = dfFiltered[subject][
-						dfFiltered[subject]['OneToOne'].notna() &
-						dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna() &
-						dfFiltered[subject]['pctBlack'].notna() &
-						dfFiltered[subject]['pctHispanic'].notna() &
-						dfFiltered[subject]['DISTRICT_POVERTY_PERCENTAGE'].notna() &
-						dfFiltered[subject][f'3_{subject}_ZSCORE'].notna() &
-						dfFiltered[subject]['LEA_STATE'].notna()
-					]
-					
-					# create HLM/Mixed LM model and print summary results
-					formula = f'Q("{subject}_ZSCORE_CHANGE") ~ OneToOne + pctBlack + pctHispanic + DISTRICT_POVERTY_PERCENTAGE + Q("3_{subject}_ZSCORE")'
-					model = smf.mixedlm(formula, data=dfTesting, groups=dfTesting['LEA_STATE'], re_formula="1").fit(reml=True)
-					
-					print("\n-------")
-					print(f"HLM Random Intercept for {subject}_ZSCORE_CHANGE:\n")
-					print(model.summary(), '\n')
-					
-					# calculate random/residual and print results
-					tau00  = float(model.cov_re.iloc[0, 0])
-					sigma2 = float(model.scale)
-					icc    = tau00 / (tau00 + sigma2)
+			# print permutation p value and 95% bootstrap intervals (mean difference and Hedges' g are 1:1 minus non-1:1)
+			inference = resampling[(state, subject)]
+			print(f"Permutation p (10,000 resamples): {inference['permutationP']:.4f}")
+			print(f"Mean Difference (1:1 minus non-1:1) 95% bootstrap CI: [{inference['meanDifferenceCI'][0]:.3f}, {inference['meanDifferenceCI'][1]:.3f}]")
+			print(f"Hedges' g (1:1 minus non-1:1): {inference['hedgesG']:.3f}, 95% bootstrap CI: [{inference['hedgesGCI'][0]:.3f}, {inference['hedgesGCI'][1]:.3f}]")
 
-					print("\nRandom/Residual:")
-					print(f"  State intercept variance (tau_00): {tau00:.3f}")
-					print(f"  Residual variance (sigma^2):       {sigma2:.3f}")
-					print(f"  ICC (rho):                         {icc:.3f}\n")
-					
-				else:
-					
-					# for all other tests, use the test name to filter data
-					dfTesting = dfFiltered[subject][
-						dfFiltered[subject]['OneToOne'].notna() &
-						dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna() &
-						dfFiltered[subject][test].notna()
-					]
-					
-					# run ANOVA for TITLE1ELIG because everything's categorical
-					if test == "TITLE1ELIG":
-						#run AVOVA test and print summary results
-						formula = f'{subject}_ZSCORE_CHANGE ~ C(OneToOne) + C({test}) + C(OneToOne):C({test})'
-						model = smf.ols(formula, data=dfTesting).fit()
-						anova_table = sm.stats.anova_lm(model, typ=2)
-						
-						print("\n-------")
-						print(f"ANOVA test for effect of OneToOne, {test}, and their interaction on {subject}_ZSCORE_CHANGE:\n")
-						print(anova_table, '\n')
-						print(f"\nn: {len(dfTesting)}")
-						
-					# otherwise run linear regression
-					else:
-						# create OLS model and print summary results
-						formula = f'Q("{subject}_ZSCORE_CHANGE") ~ C(OneToOne) + Q("{test}") + C(OneToOne):Q("{test}")'
-						model = smf.ols(formula, data=dfTesting).fit()
-						
-						print("\n-------")
-						print(f"Linear regression for the effect of OneToOne, {test}, and their interaction on {subject}_ZSCORE_CHANGE:\n")
-						print(model.summary(), '\n')
-				
+# function for running statistical tests on specific attributes, each model as an independent job, printed in the original order,
+# on the "All" data of each subject (read from the column store by each worker); model fits are memoized in the result store
+# and this run's results are saved as JSON; sweepDir saves the alternate threshold sweeps there as CSV
+def runModels (samples, tests, subjects, workers=1, sweepDir=None):
+	import dataCacheARP
+	import modelBatteryARP
+	resultsPath = os.path.join(dataCacheARP.cacheDir, "analysisResults.json")
+	rows = {subject: samples[("All", subject)] for subject in subjects}
+	for output in modelBatteryARP.runBattery(workers=workers, resultsPath=resultsPath, tests=tests, subjects=subjects, rows=rows, sweepDir=sweepDir):
+		print(output, end="")
+
+# function for rendering the boxplots and the device ratio scatter/hexbin plots of every selected state and subject,
+# skipping figures whose data are unchanged since their last render
+def plotFigures (frame, samples, states, subjects, workers=1):
+	import figuresARP
+	rendered, unchanged = figuresARP.renderFigures(frame, samples, states, subjects, workers=workers)
+	print(f"figures: {len(rendered)} rendered, {len(unchanged)} unchanged")
+
+# function for running one step of the analysis from the command line, or with no step every step in the original order
+def main (argv=None):
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('step', nargs='?', default='all', choices=['all', 'ingest', 'funnel', 'ttest', 'regress', 'hlm', 'plot'],
+		help="step to run: ingest (load/cache the data), funnel (sample funnel), ttest (t tests, permutation tests, bootstrap intervals), "
+			"regress (\"All\"-state descriptives, regressions, ANOVA, alternate thresholds), hlm (hierarchical linear model), "
+			"plot (boxplots, scatter and hexbin plots); default all")
+	parser.add_argument('--states', nargs='+', help="states for the funnel, t tests, and figures, e.g. Utah All (default: every state and All)")
+	parser.add_argument('--subjects', nargs='+', choices=subjects, help="subjects to analyze (default: MATH ENG)")
+	parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes (default: one per CPU)")
+	parser.add_argument('--rebuild', action='store_true', help="re-import the data even if the cache is fresh")
+	parser.add_argument('--sweep-dir', help="directory to save each subject's 0.01-step alternate threshold sweep as CSV (default: not saved)")
+	args = parser.parse_args(argv)
+	selected = [subject for subject in subjects if args.subjects is None or subject in args.subjects]
+
+	# save processed data as a column store, and its datasets (every state, then All)
+	store = loadData(args.rebuild, args.workers)
+	datasets = list(store['manifest']['datasets'])
+	if args.step == 'ingest':
+		return
+
+	# selected states, in the datasets' order
+	unknown = set(args.states or []) - set(datasets)
+	if unknown:
+		sys.exit(f"unknown states: {', '.join(sorted(unknown))} (choose from {', '.join(datasets)})")
+	states = [state for state in datasets if args.states is None or state in args.states]
+
+	# print the sample funnel and the per-state t tests
+	frame, samples, funnelTable = sampleData(store)
+	if args.step in ['all', 'funnel']:
+		print(funnelTable.loc[[(state, subject) for state in states for subject in selected]].to_string(), "\n")
+	if args.step in ['all', 'ttest']:
+		tTests(frame, samples, states, selected, args.workers)
+
+	# additional statistical tests for all states
+	if args.step in ['all', 'regress', 'hlm']:
+		tests = {'all': regressTests + hlmTests, 'regress': regressTests, 'hlm': hlmTests}[args.step]
+		runModels(samples, tests, selected, args.workers, args.sweep_dir)
 		print("\n-------")
-		
-		# begin creation of boxplots 
-		sns.set(style="whitegrid")
-		
-		# set TNR as the font for all plots
-		plt.rcParams['font.family'] = 'Times New Roman'
-		
-		for subject in ['MATH', 'ENG']:
-			
-			# filter data
-			dfTesting = dfFiltered[subject][
-				(dfFiltered[subject]['OneToOne'].notnull()) &
-				(dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notnull())
-			]
-			
-			# create boxplot
-			fig = plt.figure(figsize=(8, 5))
-			sns.boxplot(x='OneToOne', y=f'{subject}_ZSCORE_CHANGE', data=dfTesting)
-			
-			# define labels and other layout specs
-			plt.xlabel("")
-			if subject == "ENG":
-				plt.ylabel("ELA z-Score Change")
-			else:
-				plt.ylabel("Math z-Score Change")
-			plt.xticks(ticks=[0, 1], labels=["No 1:1-Device Access", "1:1-Device Access"])
-			plt.tight_layout()
-			
-			# save boxplot as high-res PNG
-			plt.savefig(f'{subject}_boxplot.png', dpi=300, bbox_inches='tight')
-			
-			plt.close() 
-			print(f"Generated boxplot for {subject}_ZSCORE_CHANGE by 1:1-device access")
-		
-exit()
+
+	# charts for the selected states
+	if args.step in ['all', 'plot']:
+		plotFigures(frame, samples, states, selected, args.workers)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+'''This script saves the merged output of dataImportProcessingARP.dataFinal
+   as a columnar NumPy snapshot keyed by a fingerprint of every input file
+   and of the ingestion code, so analysis runs can skip re-ingesting the
+   raw CSV files when nothing has changed'''
+
+
+# import relevant Python libraries
+import hashlib
+import json
+import os
+import numpy as np
+
+# import data importing/processing function, state assessment specs, value decoder, identifier crosswalk and atomic writes scripted for this ARP
+import dataImportProcessingARP
+import stateAssessmentsARP
+import incrementalBuildARP
+import valueDecodingARP
+import crosswalkARP
+from atomicWriteARP import atomicWrite
+
+# directory (relative to the data directory) holding the snapshot
+cacheDir = incrementalBuildARP.cacheDir
+snapshotPath = os.path.join(cacheDir, "stateDatasets.npz")
+
+# JSON trace of the last ingestion run's stage spans
+tracePath = os.path.join(cacheDir, "trace.json")
+
+# bump when the snapshot layout changes so old snapshots are ignored
+snapshotVersion = 3
+
+# type codes stored for every cell of every column
+ABSENT, NONE, INT, FLOAT, NPFLOAT, STR = range(6)
+
+# function for fingerprinting the raw input files and the ingestion code
+def fingerprint (contentHash=False):
+	digest = hashlib.sha256()
+	digest.update(f"snapshot v{snapshotVersion}".encode())
+
+	# ingestion code version: the source of the ingestion modules and of this module
+	for sourcePath in [dataImportProcessingARP.__file__, stateAssessmentsARP.__file__, valueDecodingARP.__file__, crosswalkARP.__file__, __file__]:
+		with open(sourcePath, mode="rb") as sourceFile:
+			digest.update(sourceFile.read())
+
+	# every input file by path, size, and either mtime or a hash of its contents
+	for path in dataImportProcessingARP.inputFiles:
+		stat = os.stat(path)
+		digest.update(f"{path}|{stat.st_size}|".encode())
+		if contentHash:
+			with open(path, mode="rb") as inputFile:
+				for block in iter(lambda: inputFile.read(1 << 20), b""):
+					digest.update(block)
+		else:
+			digest.update(str(stat.st_mtime_ns).encode())
+
+	return digest.hexdigest()
+
+# function for encoding one column of school records as typed arrays
+def encodeColumn (data, column):
+	codes = np.zeros(len(data), dtype=np.uint8)
+	numbers = np.zeros(len(data), dtype=np.float64)
+	strings = {}
+	stringIndex = np.zeros(len(data), dtype=np.int32)
+
+	for i, school in enumerate(data):
+		if column not in school:
+			continue
+		value = school[column]
+		if value is None:
+			codes[i] = NONE
+		elif isinstance(value, str):
+			codes[i] = STR
+			stringIndex[i] = strings.setdefault(value, len(strings))
+		elif isinstance(value, np.floating):
+			codes[i] = NPFLOAT
+			numbers[i] = value
+		elif isinstance(value, int):
+			codes[i] = INT
+			numbers[i] = value
+		else:
+			codes[i] = FLOAT
+			numbers[i] = value
+
+	# dictionary-encode strings: unique values plus an index per school
+	return codes, numbers, np.array(list(strings), dtype=str), stringIndex
+
+# function for writing stateDatasets to the snapshot file
+def saveSnapshot (stateDatasets, key):
+	arrays = {}
+	meta = {'key': key, 'states': []}
+
+	for s, (state, data) in enumerate(stateDatasets.items()):
+		# "All" is rebuilt from the per-state lists on load so records are shared, as in dataFinal
+		if state == "All":
+			continue
+
+		# columns in first-seen order (SchoolRecord keeps its keys in schema order, so no per-record order is stored)
+		columns = list(dict.fromkeys(column for school in data for column in school))
+		meta['states'].append({'name': state, 'rows': len(data), 'columns': columns})
+
+		for c, column in enumerate(columns):
+			codes, numbers, strings, stringIndex = encodeColumn(data, column)
+			arrays[f"s{s}c{c}codes"] = codes
+			if (codes == STR).any():
+				arrays[f"s{s}c{c}strings"] = strings
+				arrays[f"s{s}c{c}index"] = stringIndex
+			if ((codes == INT) | (codes == FLOAT) | (codes == NPFLOAT)).any():
+				arrays[f"s{s}c{c}numbers"] = numbers
+
+	arrays['meta'] = np.array(json.dumps(meta))
+	atomicWrite(snapshotPath, lambda snapshotFile: np.savez_compressed(snapshotFile, **arrays), mode="wb")
+
+# function for decoding one column of the snapshot back into an object array, restoring each cell's original Python/NumPy type
+# every type is restored for all of its cells at once; absent cells are left as None (and are not set when records are rebuilt)
+def decodeColumn (arrays, prefix):
+	codes = arrays[prefix + "codes"]
+	values = np.full(len(codes), None, dtype=object)
+
+	# strings index into the column's distinct values, so schools share one copy of each string
+	if prefix + "strings" in arrays:
+		rows = np.flatnonzero(codes == STR)
+		values[rows] = np.array(arrays[prefix + "strings"].tolist(), dtype=object)[arrays[prefix + "index"][rows]]
+
+	# numbers: assigning a numeric array into an object array gives Python ints and floats, and a list of its elements NumPy floats
+	if prefix + "numbers" in arrays:
+		numbers = arrays[prefix + "numbers"]
+		rows = np.flatnonzero(codes == INT)
+		values[rows] = numbers[rows].astype(np.int64)
+		rows = np.flatnonzero(codes == FLOAT)
+		values[rows] = numbers[rows]
+		rows = np.flatnonzero(codes == NPFLOAT)
+		values[rows] = list(numbers[rows])
+	return values
+
+# function for reading stateDatasets back from the snapshot file; returns None if it is stale or missing
+def loadSnapshot (key):
+	if not os.path.exists(snapshotPath):
+		return None
+
+	with np.load(snapshotPath, allow_pickle=False) as arrays:
+		meta = json.loads(str(arrays['meta']))
+		if meta['key'] != key:
+			return None
+
+		stateDatasets = {}
+		for s, stateMeta in enumerate(meta['states']):
+			data = [dataImportProcessingARP.SchoolRecord() for _ in range(stateMeta['rows'])]
+
+			# set each column on the records that have it
+			for c, column in enumerate(stateMeta['columns']):
+				rows = np.flatnonzero(arrays[f"s{s}c{c}codes"] != ABSENT)
+				for i, value in zip(rows.tolist(), decodeColumn(arrays, f"s{s}c{c}")[rows].tolist()):
+					data[i][column] = value
+			stateDatasets[stateMeta['name']] = data
+
+	# consolidate per-state lists into a single list of school records
+	stateDatasets["All"] = [school for data in stateDatasets.values() for school in data]
+
+	return stateDatasets
+
+# function imported into the data analysis Python program: load the snapshot if fresh, otherwise ingest and save
+# incremental rebuilds recompute only the stages whose inputs changed; otherwise dataFinal reruns everything, with
+# workers running its per-state pipelines (the national parse stays serial, see dataImportProcessingARP.minChunkBytes)
+def loadStateDatasets (rebuild=False, contentHash=False, workers=1, incremental=True):
+	key = fingerprint(contentHash)
+
+	stateDatasets = None if rebuild else loadSnapshot(key)
+	if stateDatasets is not None:
+		print("loaded stateDatasets from snapshot", snapshotPath)
+		return stateDatasets
+
+	if incremental:
+		stateDatasets, report = incrementalBuildARP.incrementalBuild(tracePath=tracePath)
+	else:
+		stateDatasets = dataImportProcessingARP.dataFinal(workers=workers, tracePath=tracePath, cacheDir=cacheDir)
+	saveSnapshot(stateDatasets, key)
+	print("saved stateDatasets snapshot to", snapshotPath)
+
+	return stateDatasets
@@ -8,747 +8,707 @@
 
 # import relevant Python libraries
 import csv
-import re
+import io
+import locale
+import os
+import sys
+from collections.abc import MutableMapping
 import numpy as np
-import inspect
+import pandas as pd
+import multiprocessing
+import operator
+from concurrent.futures import ProcessPoolExecutor
 
-# function imported into the data analysis Python program as dataImportProcessingARP.dataFinal
-def dataFinal():
+# import the per-state assessment specs, school identifier crosswalk, and pipeline instrumentation scripted for this ARP
+from stateAssessmentsARP import stateSpecs
+import crosswalkARP
+import instrumentationARP
 
-	# function for importing relevant CRDC, CCD, and SAIPE data by state
-	def importCRDC (state):
-		
-		# open the CRDC school characteristics CSV file
-		with open("2020-21-crdc-data/CRDC/School/School Characteristics.csv", mode="r", newline="") as csvFile:
-			
-			# import each line as dictionaries with the CSV header as the variable keys
-			reader = csv.DictReader(csvFile)
-			
-			# make nested list of dictionaries of schools from the correct state
-			data = [row for row in reader
-				if row.get('LEA_STATE') == state
-			]
-			
-		# same thing, but for the internet access and devices CSV
-		with open("2020-21-crdc-data/CRDC/School/Internet Access and Devices.csv", mode="r", newline="") as csvFile:
-			reader = csv.DictReader(csvFile)
-			# build a lookup dictionary using COMBOKEY as the key
-			internetData = {row['COMBOKEY']: row for row in reader}
-			
-		# if COMBOKEY is the same in both databases, add the field SCH_INTERNET_WIFIENDEV to data
-		for school in data:
-			if school['COMBOKEY'] in internetData:
-				school['SCH_INTERNET_WIFIENDEV'] = internetData[school['COMBOKEY']].get('SCH_INTERNET_WIFIENDEV')
-				
-		# same thing, but for the COVID directional indicators CSV
-		with open("2020-21-crdc-data/CRDC/School/COVID Directional Indicators.csv", mode="r", newline="") as csvFile:
-			reader = csv.DictReader(csvFile)																																																																																																																																																																																													
-			# build a lookup dictionary using COMBOKEY as the key
-			covidData = {row['COMBOKEY']: row for row in reader}
+# national CRDC, CCD, and SAIPE files; a source may also be a list of yearly files, oldest first,
+# in which case each school (or district) takes its row from the latest year that has one
+nationalFiles = {
+	'characteristics': "2020-21-crdc-data/CRDC/School/School Characteristics.csv",
+	'internet': "2020-21-crdc-data/CRDC/School/Internet Access and Devices.csv",
+	'covid': "2020-21-crdc-data/CRDC/School/COVID Directional Indicators.csv",
+	'enrollment': "2020-21-crdc-data/CRDC/School/Enrollment.csv",
+	'ccd': "ccd_sch_129_2021_w_1a_080621/ccd_sch_129_2021_w_1a_080621.csv",
+	'saipe': "SAIPE/ussd20.csv"
+}
+
+# function for listing the files of a national source
+def sourcePaths (source):
+	paths = nationalFiles[source]
+	return [paths] if isinstance(paths, str) else list(paths)
+
+# every raw input file read by dataFinal, used to fingerprint cached snapshots of its output
+inputFiles = [path for source in nationalFiles for path in sourcePaths(source)] + list(dict.fromkeys(test['file'] for spec in stateSpecs.values() for test in spec['tests']))
+
+# columns kept from each national file; everything else is skipped while parsing
+crdcColumns = ['LEA_STATE', 'LEA_STATE_NAME', 'LEAID', 'LEA_NAME', 'SCHID', 'SCH_NAME', 'COMBOKEY', 'SCH_STATUS_SPED', 'SCH_STATUS_MAGNET', 'SCH_STATUS_CHARTER', 'SCH_STATUS_ALT']
+enrollmentCategories = ['SCH_ENR_HI_M', 'SCH_ENR_HI_F', 'SCH_ENR_AM_M', 'SCH_ENR_AM_F', 'SCH_ENR_AS_M', 'SCH_ENR_AS_F', 'SCH_ENR_HP_M', 'SCH_ENR_HP_F', 'SCH_ENR_BL_M', 'SCH_ENR_BL_F', 'SCH_ENR_WH_M', 'SCH_ENR_WH_F', 'SCH_ENR_TR_M', 'SCH_ENR_TR_F']
+
+# fixed schema of a merged school record: the projected CRDC columns, then every field added during ingestion
+schoolFields = crdcColumns + ['SCH_INTERNET_WIFIENDEV', 'SCH_DIND_INSTRUCTIONTYPE', 'SCH_DIND_VIRTUALTYPE',
+	'TOTAL_ENROLLMENT', 'RATIO_DEVICES_TO_ENROLLMENT', 'TOTAL_ENROLLMENT_BLACK', 'TOTAL_ENROLLMENT_HISPANIC',
+	'ST_SCHID', 'TITLE1ELIG', 'DISTRICT_POVERTY_PERCENTAGE', 'ST_SCHID_shortened',
+	'3_ENG_NUMBER_STUDENTS', '3_ENG_PASS', '3_MATH_NUMBER_STUDENTS', '3_MATH_PASS',
+	'5_ENG_NUMBER_STUDENTS', '5_ENG_PASS', '5_MATH_NUMBER_STUDENTS', '5_MATH_PASS',
+	'3_ENG_ZSCORE', '3_MATH_ZSCORE', '5_ENG_ZSCORE', '5_MATH_ZSCORE', 'ENG_ZSCORE_CHANGE', 'MATH_ZSCORE_CHANGE']
+
+# categorical fields whose few distinct values are interned so every record shares one copy of each string
+categoricalFields = {'LEA_STATE', 'LEA_STATE_NAME', 'SCH_STATUS_SPED', 'SCH_STATUS_MAGNET', 'SCH_STATUS_CHARTER', 'SCH_STATUS_ALT', 'SCH_DIND_INSTRUCTIONTYPE', 'SCH_DIND_VIRTUALTYPE'}
+
+# attribute name for each field (several fields start with a digit, which is not a valid attribute name)
+slotNames = {field: 'f_' + field for field in schoolFields}
+
+# compact school record: one slot per schema field instead of a per-school dict,
+# with a dict-like interface so analysis code (and pandas) can keep treating records as dicts;
+# unset slots behave like missing keys
+class SchoolRecord (MutableMapping):
+	__slots__ = tuple(slotNames.values())
+	
+	def __init__ (self, *args, **kwargs):
+		self.update(*args, **kwargs)
+	
+	def __getitem__ (self, key):
+		try:
+			return getattr(self, slotNames[key])
+		except AttributeError:
+			raise KeyError(key) from None
+	
+	def __setitem__ (self, key, value):
+		if key in categoricalFields and type(value) is str:
+			value = sys.intern(value)
+		setattr(self, slotNames[key], value)
+	
+	def __delitem__ (self, key):
+		try:
+			delattr(self, slotNames[key])
+		except AttributeError:
+			raise KeyError(key) from None
+	
+	def __contains__ (self, key):
+		return key in slotNames and hasattr(self, slotNames[key])
+	
+	def __iter__ (self):
+		return (field for field, slot in slotNames.items() if hasattr(self, slot))
+	
+	def __len__ (self):
+		return sum(1 for _ in self)
+	
+	def __repr__ (self):
+		return f"SchoolRecord({dict(self)!r})"
+
+# smallest byte range worth handing to a worker process when a file is parsed in parallel
+# the parallel parse is opt-in: workers send whole row dicts back to the parent, which rebuilds them, so on a
+# 400,000-school national set the serial parse took 15.6s and two or four workers still cost the parent 12.7s of CPU
+# (about 1.2x at best, and slower in wall time on a single core)
+minChunkBytes = 8 << 20
+
+# function for the multiprocessing context of process pools: fork where available, so workers inherit module state
+def poolContext ():
+	if 'fork' in multiprocessing.get_all_start_methods():
+		return multiprocessing.get_context('fork')
+	return None
+
+# function for resolving projected columns and row filters against a header
+# returns the (position, column) pairs to keep in file order and the (position, allowed values) filters
+def projectionPlan (header, columns, where):
+	
+	# column positions (the last one wins for duplicate names, as with csv.DictReader), kept in file order
+	positions = {column: i for i, column in enumerate(header)}
+	projection = sorted((positions[column], column) for column in set(columns) if column in positions)
+	filters = [(positions.get(column), allowed) for column, allowed in (where or {}).items()]
+	return projection, filters
+
+# function for projecting and filtering the rows of a CSV reader, skipping rows that fail the filter before any dict is built
+# where maps a column to the collection of values a row must have in it; counts collects [rows read, rows kept]
+def projectRows (reader, header, columns, where, counts):
+	projection, filters = projectionPlan(header, columns, where)
+	
+	for row in reader:
+		# skip blank lines, as csv.DictReader does
+		if not row:
+			continue
+		counts[0] += 1
+		
+		# check the row filter against the raw cells; short rows read as None, as with csv.DictReader
+		if not all((row[i] if i is not None and i < len(row) else None) in allowed for i, allowed in filters):
+			continue
+		counts[1] += 1
+		
+		yield {column: row[i] if i < len(row) else None for i, column in projection}
+
+# function for finding the end of the record containing a byte position: the byte after the next newline outside quotes
+# inQuotes says whether the position is inside a quoted field; '"' and '\n' are single bytes in every ASCII-compatible
+# encoding (UTF-8, Latin-1), so quote parity can be tracked on the raw bytes
+def recordEnd (binaryFile, position, inQuotes):
+	binaryFile.seek(position)
+	for line in binaryFile:
+		position += len(line)
+		inQuotes ^= line.count(b'"') % 2 == 1
+		if not inQuotes:
+			break
+	return position
+
+# function for splitting a file, from a record boundary onward, into about the given number of byte ranges
+# each range starts at a record boundary, so quoted fields containing newlines are never split
+def chunkBoundaries (path, start, chunks):
+	size = os.path.getsize(path)
+	boundaries = [start]
+	with open(path, mode="rb") as binaryFile:
+		for c in range(1, chunks):
+			target = start + (size - start) * c // chunks
+			if target <= boundaries[-1]:
+				continue
 			
-		# if COMBOKEY is the same in both databases, add the COVID instructional mode fields to data
-		for school in data:
-			if school['COMBOKEY'] in covidData:
-				school['SCH_DIND_INSTRUCTIONTYPE'] = covidData[school['COMBOKEY']].get('SCH_DIND_INSTRUCTIONTYPE')
-				school['SCH_DIND_VIRTUALTYPE'] = covidData[school['COMBOKEY']].get('SCH_DIND_VIRTUALTYPE')
-				
-		# same thing, but for the enrollment CSV
-		with open("2020-21-crdc-data/CRDC/School/Enrollment.csv", mode="r", newline="") as csvFile:
-			reader = csv.DictReader(csvFile)
-			# build a lookup dictionary using COMBOKEY as the key
-			enrollmentData = {row['COMBOKEY']: row for row in reader}
+			# quote parity from the last boundary (outside quotes) up to the target
+			binaryFile.seek(boundaries[-1])
+			remaining, quotes = target - boundaries[-1], 0
+			while remaining > 0:
+				block = binaryFile.read(min(remaining, 1 << 24))
+				quotes += block.count(b'"')
+				remaining -= len(block)
 			
-		# if COMBOKEY is the same in both databases, add the total enrollment to data
-		for school in data:
-			if school['COMBOKEY'] in enrollmentData:
-				
-				# sum all students by gender/race breakdown to get total number of students at the school
-				sum = 0
-				for studentCategory in ['SCH_ENR_HI_M', 'SCH_ENR_HI_F', 'SCH_ENR_AM_M', 'SCH_ENR_AM_F', 'SCH_ENR_AS_M', 'SCH_ENR_AS_F', 'SCH_ENR_HP_M', 'SCH_ENR_HP_F', 'SCH_ENR_BL_M', 'SCH_ENR_BL_F', 'SCH_ENR_WH_M', 'SCH_ENR_WH_F', 'SCH_ENR_TR_M', 'SCH_ENR_TR_F']:
-					if int(enrollmentData[school['COMBOKEY']].get(studentCategory)) > 0: #exclude error codes
-						sum += int(enrollmentData[school['COMBOKEY']].get(studentCategory))
-				school['TOTAL_ENROLLMENT'] = sum
-				
-				# create data column that is the ratio of devices to enrollment, max of 1
-				if int(school['SCH_INTERNET_WIFIENDEV']) >= 0 and sum > 0: # exclude error codes and division by zero
-					if int(school['SCH_INTERNET_WIFIENDEV'])/sum > 1:
-						school['RATIO_DEVICES_TO_ENROLLMENT'] = 1.0
-					else:	
-						school['RATIO_DEVICES_TO_ENROLLMENT'] = int(school['SCH_INTERNET_WIFIENDEV'])/sum
+			boundary = recordEnd(binaryFile, target, quotes % 2 == 1)
+			if boundary < size:
+				boundaries.append(boundary)
+	boundaries.append(size)
+	return boundaries
+
+# parsing job of the current parallel parse (path, encoding, header, columns, where), set in each worker by the pool initializer
+# so the filter sets travel to a worker once rather than with every byte range
+chunkJob = None
+
+# function run once in each worker process to receive the parsing job
+def setChunkJob (job):
+	global chunkJob
+	chunkJob = job
+
+# function run in worker processes: decode and parse one byte range of the job's CSV file
+# rows travel back as one joined string per column, since pickling a few long strings is far cheaper than millions of short ones
+def parseChunk (start, end):
+	path, encoding, header, columns, where = chunkJob
+	with open(path, mode="rb") as binaryFile:
+		binaryFile.seek(start)
+		text = binaryFile.read(end - start).decode(encoding)
+	
+	projection, filters = projectionPlan(header, columns, where)
+	names = [column for i, column in projection]
+	width = max((i for i, column in projection), default=-1) + 1
+	getter = operator.itemgetter(*[i for i, column in projection]) if len(projection) > 1 else lambda row: tuple(row[i] for i, column in projection)
+	
+	# same filtering as projectRows, collecting each kept row's projected cells as a tuple
+	read = 0
+	kept = []
+	missing = []
+	for row in csv.reader(io.StringIO(text, newline="")):
+		if not row:
+			continue
+		read += 1
+		if not all((row[i] if i is not None and i < len(row) else None) in allowed for i, allowed in filters):
+			continue
+		if len(row) >= width:
+			kept.append(getter(row))
+		else:
+			# short rows read as None; their cells are sent separately
+			kept.append(tuple(row[i] if i < len(row) else "" for i, column in projection))
+			missing += [(len(kept) - 1, c) for c, (i, column) in enumerate(projection) if i >= len(row)]
+	
+	# transpose to columns and join each with a control character absent from the text
+	cells = [list(column) for column in zip(*kept)] if kept else [[] for column in names]
+	separator = next((candidate for candidate in ["\x1f", "\x1e", "\x1d", "\x1c"] if candidate not in text), None)
+	if separator is not None:
+		cells = [separator.join(column) for column in cells]
+	return names, cells, missing, separator, [read, len(kept)]
+
+# function for parsing a CSV file as byte ranges across a process pool, yielding the rows of each range in file order
+def iterChunked (path, columns, where, encoding, fieldnames, chunks, counts):
+	encoding = encoding or locale.getpreferredencoding(False)
+	
+	# the header is the file's first record
+	start, header = 0, fieldnames
+	if header is None:
+		with open(path, mode="rb") as binaryFile:
+			start = recordEnd(binaryFile, 0, False)
+			binaryFile.seek(0)
+			header = next(csv.reader(io.StringIO(binaryFile.read(start).decode(encoding), newline="")), [])
+	
+	boundaries = chunkBoundaries(path, start, chunks)
+	job = (path, encoding, header, columns, where)
+	with ProcessPoolExecutor(max_workers=len(boundaries) - 1, mp_context=poolContext(), initializer=setChunkJob, initargs=(job,)) as pool:
+		futures = [pool.submit(parseChunk, chunkStart, chunkEnd) for chunkStart, chunkEnd in zip(boundaries, boundaries[1:])]
+		
+		# concatenate the ranges in order, rebuilding each range's rows from its columns
+		for future in futures:
+			names, cells, missing, separator, chunkCounts = future.result()
+			counts[0] += chunkCounts[0]
+			counts[1] += chunkCounts[1]
+			if not chunkCounts[1]:
+				continue
+			if separator is not None:
+				cells = [column.split(separator) for column in cells]
+			for i, c in missing:
+				cells[c][i] = None
+			for values in zip(*cells):
+				yield dict(zip(names, values))
+
+# function for streaming only the declared columns of a CSV file, skipping rows that fail the filter before any dict is built
+# where maps a column to the collection of values a row must have in it; fieldnames is given for files without a header;
+# with workers > 1, files of at least two minChunkBytes are split into byte ranges parsed in parallel
+def iterProjected (path, columns, where=None, encoding=None, fieldnames=None, workers=1):
+	counts = [0, 0]
+	chunks = min(workers, os.path.getsize(path) // minChunkBytes)
+	if chunks > 1:
+		yield from iterChunked(path, columns, where, encoding, fieldnames, chunks, counts)
+	else:
+		with open(path, mode="r", newline="", encoding=encoding) as csvFile:
+			reader = csv.reader(csvFile)
+			header = fieldnames if fieldnames is not None else next(reader, [])
+			yield from projectRows(reader, header, columns, where, counts)
+	instrumentationARP.count(rowsRead=counts[0], rowsKept=counts[1])
+
+# function for streaming the projected rows of every file of a national source, oldest year first
+# key gives a row's school or district; each file's span counts the wanted schools or districts it has a row for
+def iterSource (source, columns, key, wanted, **options):
+	for path in sourcePaths(source):
+		with instrumentationARP.span("national parse", source=source, file=path):
+			found = set()
+			for row in iterProjected(path, columns, **options):
+				found.add(key(row))
+				yield row
+			instrumentationARP.count(rowsMatched=len(found & wanted))
+
+# rows of the enrollment CSV parsed at a time, so only one block of a yearly file is in memory at once
+enrollmentBlockRows = 1 << 16
+
+# function for loading the enrollment counts of the selected schools into an integer matrix, one row per school (in
+# COMBOKEY order) and one column per category, and computing every school's totals and device ratio in a few array
+# operations; only the projected columns of each yearly file are parsed, and a school's latest row wins
+def enrollmentTable (combokeys, internetData):
+	keys = sorted(combokeys)
+	positions = pd.Series(np.arange(len(keys)), index=keys)
+	counts = np.zeros((len(keys), len(enrollmentCategories)), dtype=np.int64)
+	found = np.zeros(len(keys), dtype=bool)
+	
+	for path in sourcePaths('enrollment'):
+		with instrumentationARP.span("national parse", source='enrollment', file=path):
+			read = kept = 0
+			inFile = np.zeros(len(keys), dtype=bool)
+			blocks = pd.read_csv(path, usecols=['COMBOKEY'] + enrollmentCategories, dtype={'COMBOKEY': str}, keep_default_na=False,
+				encoding=locale.getpreferredencoding(False), chunksize=enrollmentBlockRows, low_memory=False)
+			for block in blocks:
+				read += len(block)
 				
-				# sum Black students
-				sum = 0
-				for studentCategory in ['SCH_ENR_BL_M', 'SCH_ENR_BL_F']:
-					if int(enrollmentData[school['COMBOKEY']].get(studentCategory)) > 0: #exclude error codes
-						sum += int(enrollmentData[school['COMBOKEY']].get(studentCategory))
-				school['TOTAL_ENROLLMENT_BLACK'] = sum
+				# keep only the rows of the selected schools (and so of the selected states), the last row of a school winning
+				block = block[block['COMBOKEY'].isin(positions.index)].drop_duplicates('COMBOKEY', keep='last')
+				kept += len(block)
+				rows = positions.index.get_indexer(block['COMBOKEY'])
 				
-				# sum Hispanic students
-				sum = 0
-				for studentCategory in ['SCH_ENR_HI_M', 'SCH_ENR_HI_F']:
-					if int(enrollmentData[school['COMBOKEY']].get(studentCategory)) > 0: #exclude error codes
-						sum += int(enrollmentData[school['COMBOKEY']].get(studentCategory))
-				school['TOTAL_ENROLLMENT_HISPANIC'] = sum
-		
-		# open the CCD school characteristics CSV file
-		with open("ccd_sch_129_2021_w_1a_080621/ccd_sch_129_2021_w_1a_080621.csv", mode="r", newline="", encoding="ISO-8859-1") as csvFile:
-			reader = csv.DictReader(csvFile)
-			# build a lookup dictionary using COMBOKEY as the key
-			ccdData = {row['NCESSCH']: row for row in reader}
+				# error codes (negative counts) count as zero, as do cells that are not whole numbers: a category with a
+				# decimal cell is read as floats, and one with any other text as strings
+				for c, category in enumerate(enrollmentCategories):
+					cells = block[category]
+					if cells.dtype.kind == 'f':
+						numbers = cells.to_numpy()
+						cells = np.where(np.isfinite(numbers) & (numbers == np.trunc(numbers)), numbers, 0).astype(np.int64)
+					elif cells.dtype.kind != 'i':
+						text = cells.astype(str).str.strip()
+						cells = text.where(text.str.isdigit(), "0").astype(np.int64).to_numpy()
+					counts[rows, c] = np.maximum(cells, 0)
+				inFile[rows] = True
+			found |= inFile
 			
-		# map CRDC COMBOKEY to NCESSCH from CCD; add ST_SCHID and Title 1 eligibility
-		for school in data:
-			if school['COMBOKEY'] in ccdData:
-				school['ST_SCHID'] = ccdData[school['COMBOKEY']].get('ST_SCHID')
-				if ccdData[school['COMBOKEY']].get('TITLEI_STATUS') == 'NOTTITLE1ELIG':
-					school['TITLE1ELIG'] = 0 
-				elif ccdData[school['COMBOKEY']].get('TITLEI_STATUS') != 'Not reported':
-					school['TITLE1ELIG'] = 1
-					
-		# open the SAIPE CSV file (exported from Excel)
-		fieldnames = ['state', 'stateCode', 'districtCode', 'districtName', 'population', 'studentPopulation', 'studentPovertyPopulation']
-		with open("SAIPE/ussd20.csv", mode="r", newline="", encoding="ISO-8859-1") as csvFile:
-			reader = csv.DictReader(csvFile,  fieldnames=fieldnames)  
-			# build a lookup dictionary using LEAID as the key
-			saipeData = {row['stateCode'] + row['districtCode']: row for row in reader}
-		
-		# add DISTRICT_POVERTY_PERCENTAGE = student poverty / total students (SAIPE)
-		for school in data:
-			if school['LEAID'] in saipeData:
-				school['DISTRICT_POVERTY_PERCENTAGE'] = int(saipeData[school['LEAID']].get('studentPovertyPopulation').replace(",", "")) / int(saipeData[school['LEAID']].get('studentPopulation').replace(",", ""))
-		return data
-	
-	# function for merging Alabama data
-	def assessmentAL ():
-		# import Alabama CRDC/CCD data
-		data = importCRDC ('AL')
-		
-		# import Alabama state assessment results
-		# exported from https://www.alabamaachieves.org/reports-data/school-performance/
-		resultsToMerge = [
-			{'file': 'AL/AL-2019-COMBOKEY.csv', 'subject': 'Reading', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'AL/AL-2019-COMBOKEY.csv', 'subject': 'Math', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'AL/AL-2021-COMBOKEY.csv', 'subject': 'ELA', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-			{'file': 'AL/AL-2021-COMBOKEY.csv', 'subject': 'Math', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}		
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# make nested list of dictionaries of results that are of the relevant test
-				stateData = {f"0{row['COMBOKEY']}": row
-							for row in reader
-							if row.get('Enrolled') != '*' #exclude those with no data provided
-							# and row.get('Proficient Rate') != '*'
-							and row.get("Subject") == test['subject']}
-				
-			# if COMBOKEY is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'COMBOKEY' in school and school['COMBOKEY'] in stateData:
-					# derive proficiency by priority: (1) 'Proficient Rate' if present; else (2) Level3 + Level4; else (3) 100 - (Level1 + Level2)
-					proficientRate = []
-					if stateData[school['COMBOKEY']].get('Proficient Rate') != '*':
-						proficientRate.append(float(stateData[school['COMBOKEY']].get('Proficient Rate')))
-					if stateData[school['COMBOKEY']].get('Level 3 %') not in ['*', '~'] and stateData[school['COMBOKEY']].get('Level 4 %') not in ['*', '~']:
-						proficientRate.append(float(stateData[school['COMBOKEY']].get('Level 3 %')) + float(stateData[school['COMBOKEY']].get('Level 4 %')))
-					if stateData[school['COMBOKEY']].get('Level 1 %') not in ['*', '~'] and stateData[school['COMBOKEY']].get('Level 2 %') not in ['*', '~']:
-						proficientRate.append(100 - float(stateData[school['COMBOKEY']].get('Level 1 %')) - float(stateData[school['COMBOKEY']].get('Level 2 %')))
-					
-					# tested count: use Tested when available; otherwise fall back to 'Enrolled' - 10
-					if proficientRate:
-						if stateData[school['COMBOKEY']].get('Tested') != '*':
-							school[test['studentsVar']] = int(float(stateData[school['COMBOKEY']].get('Tested')))
-						else:
-							school[test['studentsVar']] = int(float(stateData[school['COMBOKEY']].get('Enrolled'))) - 10
-						school[test['passVar']] = proficientRate[0]
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+			# rows read, rows of the selected schools, and selected schools with a row in this file
+			instrumentationARP.count(rowsRead=read, rowsKept=kept, rowsMatched=int(inFile.sum()))
 	
-	# function for merging Arkansas data
-	def assessmentAR ():
-		# import Arkansas CRDC/CCD data
-		data = importCRDC ('AR')
-		
-		# import Arkansas state assessment results
-		# exported from https://dese.ade.arkansas.gov/Offices/public-school-accountability/assessment-test-scores
-		resultsToMerge = [
-			{'file': 'AR/20201203132354_ACT_Aspire_Summary_10052020.csv', 'grade': '03', 'studentsVarEng': '3_ENG_NUMBER_STUDENTS', 'passVarEng': '3_ENG_PASS', 'studentsVarMath': '3_MATH_NUMBER_STUDENTS', 'passVarMath': '3_MATH_PASS'},
-			{'file': 'AR/ACT_Aspire_Summary_Post_Appeals_Spring_2021_20210930124157.csv', 'grade': '05', 'studentsVarEng': '5_ENG_NUMBER_STUDENTS', 'passVarEng': '5_ENG_PASS', 'studentsVarMath': '5_MATH_NUMBER_STUDENTS', 'passVarMath': '5_MATH_PASS'}	
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# key on "AR-{District LEA}-{School LEA}" to align with CCD ST_SCHID
-				stateData = {f"AR-{row['District LEA']}-{row['School LEA']}": row
-							for row in reader
-							if (row.get('Grade') == test['grade'] or row.get('Grade Level') == test['grade'])
-							and row.get('English N') != 'N<10'} #exclude those with no data provided
-				
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVarEng']] = int(stateData[school['ST_SCHID']].get('English N'))
-					school[test['passVarEng']] = float(stateData[school['ST_SCHID']].get('English % Met Readiness Benchmark')[:-1]) # cut % sign
-					school[test['studentsVarMath']] = int(stateData[school['ST_SCHID']].get('Math N'))
-					school[test['passVarMath']] = float(stateData[school['ST_SCHID']].get('Math % Met Readiness Benchmark')[:-1])
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	table = {'positions': {key: i for i, key in enumerate(keys) if found[i]}, 'counts': counts}
+	table['total'] = counts.sum(axis=1)
+	table['black'] = enrollmentTotal(table, ['SCH_ENR_BL_M', 'SCH_ENR_BL_F'])
+	table['hispanic'] = enrollmentTotal(table, ['SCH_ENR_HI_M', 'SCH_ENR_HI_F'])
 	
-	# function for merging Georgia data
-	def assessmentGA ():
-		# import Georgia CRDC/CCD data
-		data = importCRDC ('GA')
-		
-		# import Georgia state assessment results
-		# exported from https://gosa.georgia.gov/dashboards-data-report-card/downloadable-data
-		resultsToMerge = [
-			{'file': 'GA/EOG_2019_By_Grad_FEB_24_2020.csv', 'subject': 'English Language Arts', 'grade': '03', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'GA/EOG_2019_By_Grad_FEB_24_2020.csv', 'subject': 'Mathematics', 'grade': '03', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'GA/EOG_2021_by_grade_March_7_2022.csv', 'subject': 'English Language Arts', 'grade': '05', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-			{'file': 'GA/EOG_2021_by_grade_March_7_2022.csv', 'subject': 'Mathematics', 'grade': '05', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}		
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# key "GA-{SCHOOL_DISTRCT_CD}-{INSTN_NUMBER.zfill(4)}" to match CCD ST_SCHID format
-				stateData = {f"GA-{row['SCHOOL_DISTRCT_CD']}-{row['INSTN_NUMBER'].zfill(4)}": row
-							for row in reader
-							# N < 10 excluded by GA
-							if row.get('NUM_TESTED_CNT') != 'TFS'
-							and row.get('SUBGROUP_NAME') == "All Students"
-							and row.get('TEST_CMPNT_TYP_NM') == test['subject']
-							and (row.get('ACDMC_LVL') == test['grade'] or row.get('ACDMC_LVL') == test['grade'][1:])
-						}
-				
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVar']] = int(stateData[school['ST_SCHID']].get('NUM_TESTED_CNT'))
-					school[test['passVar']] = float(stateData[school['ST_SCHID']].get('PROFICIENT_PCT')) + float(stateData[school['ST_SCHID']].get('DISTINGUISHED_PCT')) 
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	# ratio of devices to enrollment, max of 1, excluding device error codes, schools without device counts, and division by zero
+	devices = np.full(len(keys), -1, dtype=np.int64)
+	for key, i in table['positions'].items():
+		if key in internetData:
+			devices[i] = int(internetData[key]['SCH_INTERNET_WIFIENDEV'])
+	table['hasRatio'] = (devices >= 0) & (table['total'] > 0)
+	table['ratio'] = np.ones(len(keys))
+	table['ratio'][table['hasRatio']] = np.minimum(devices[table['hasRatio']] / table['total'][table['hasRatio']], 1.0)
+	return table
 
-	# function for merging Indiana data
-	def assessmentIN ():
-		# import Georgia CRDC/CCD data
-		data = importCRDC ('IN')
-		
-		# import Indiana state assessment results
-		# exported from https://www.in.gov/doe/it/data-center-and-reports/data-reports-archive
-		resultsToMerge = [
-			{'file': 'IN/ilearn-2019-grade3-8-final-school-ELA.csv', 'subject': 'English Language Arts', 'grade': '03', 'testedNo': 'ELA Total Tested', 'proficient': 'ELA Proficient %', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'IN/ilearn-2019-grade3-8-final-school-math.csv', 'subject': 'Mathematics', 'grade': '03','testedNo': 'Math Total Tested', 'proficient': 'Math Proficient %', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'IN/ILEARN-2021-Grade3-8-Final-School-ELA.csv', 'subject': 'English Language Arts', 'grade': '05', 'testedNo': 'ELA Total Tested', 'proficient': 'ELA Proficient %', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-			{'file': 'IN/ILEARN-2021-Grade3-8-Final-School-Math.csv', 'subject': 'Mathematics', 'grade': '05', 'testedNo': 'Math Total Tested', 'proficient': 'Math Proficient %', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}	
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# key on "IN-{Corp ID}-{School ID}" to align with CCD ST_SCHID
-				stateData = {f"IN-{row['Corp ID']}-{row['School ID']}": row
-							for row in reader
-							# N < 10 excluded by IN
-							if row.get(test['proficient']) != '***' 
-							and row.get(test['proficient']) != ''
-						}
-				
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVar']] = int(stateData[school['ST_SCHID']].get(test['testedNo']))
-					school[test['passVar']] = float(stateData[school['ST_SCHID']].get(test['proficient'])[:-1])
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+# function for the enrollment of some categories (e.g. ['SCH_ENR_WH_F']) summed for every school of an enrollment table
+def enrollmentTotal (table, categories):
+	return table['counts'][:, [enrollmentCategories.index(category) for category in categories]].sum(axis=1)
 
-	# function for merging Iowa data
-	def assessmentIA ():
-		# import Iowa CRDC/CCD data
-		data = importCRDC ('IA')
-		
-		# import Iowa state assessment results
-		# exported from https://www.zelma.ai/data
-		
-		resultsToMerge = [
-			{'file': 'IA/edc-2.1-iowa-2019.csv', 'grade': 'G03', 'subject': 'math', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'IA/edc-2.1-iowa-2019.csv', 'grade': 'G03', 'subject': 'ela', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'IA/IA_AssmtData_2021.csv', 'grade': 'G05', 'subject': 'math', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'},
-			{'file': 'IA/IA_AssmtData_2021.csv', 'grade': 'G05', 'subject': 'ela', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'}
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# make nested list of dictionaries of results that are of the relevant test
-				stateData = {f"IA-**{str(row['StateAssignedDistID']).zfill(4)} 000-**{str(row['StateAssignedDistID']).zfill(4)} {row['StateAssignedSchID'][-3:]}": row
-							for row in reader
-							if (row.get('GradeLevel') == test['grade'])
-							and row.get('StudentGroup') == 'All Students'
-							and row.get('DataLevel') == 'School'
-							and row.get('Subject') == test['subject']
-							and row.get('StudentSubGroup_TotalTested') != '*'
-							and row.get('ProficientOrAbove_percent') != '*'
-							and row.get('ProficientOrAbove_percent') != '.'
-						} #exclude those with no data provided
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school:
-					maskedST_SCHID = re.sub(r'(\d{2})(\d{4})', r'**\2', school['ST_SCHID'])
-					if maskedST_SCHID in stateData:
-						school[test['studentsVar']] = int(stateData[maskedST_SCHID].get('StudentSubGroup_TotalTested'))
-						school[test['passVar']] = float(stateData[maskedST_SCHID].get('ProficientOrAbove_percent'))
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+# function for parsing the national CRDC, CCD, and SAIPE files once per run, keeping only the given states
+# rows are streamed straight into lookups keyed by the selected schools and districts, so no source is ever held
+# in full and memory is bounded by the number of selected schools, however many yearly files each source has;
+# workers > 1 parses large files in parallel byte ranges
+def importNational (stateCodes, workers=1):
 	
-	# function for merging Louisiana data
-	def assessmentLA ():
-		# import Louisiana CRDC/CCD data
-		data = importCRDC ('LA')
-		
-		# import Louisiana state assessment results
-		# exported from https://doe.louisiana.gov/data-and-reports/elementary-and-middle-school-performance
-		resultsToMerge = [
-			{'file': 'LA/2019-school-leap-2025-achievement-level-summary.csv', 'studentsVarEng': '3_ENG_NUMBER_STUDENTS', 'passVarEng': '3_ENG_PASS', 'studentsVarMath': '3_MATH_NUMBER_STUDENTS', 'passVarMath': '3_MATH_PASS'},
-			{'file': 'LA/2021-leap-2025-state-lea-school-achievement-level-summary.csv', 'studentsVarEng': '5_ENG_NUMBER_STUDENTS', 'passVarEng': '5_ENG_PASS', 'studentsVarMath': '5_MATH_NUMBER_STUDENTS', 'passVarMath': '5_MATH_PASS'}	
-		]
-		
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# make nested list of dictionaries of results that are of the relevant test
-				stateData = {f"LA-{row['Site Code'][:3]}-{row['Site Code']}": row
-							for row in reader
-							if row.get('Total Students Tested in at Least One Subject') != '<10'
-							and row.get('ELA M') != 'NR'
-							and row.get('ELA A') != 'NR' 
-						} #exclude those with no data provided
-			
-			# change all "≤1" for test results to 0
-			for record in stateData.values():
-				for key, value in record.items():
-					if value == "≤1":
-						record[key] = 0
+	# read the CRDC school characteristics CSV files for the selected states only, grouped by state in file order;
+	# a school's row from a later year replaces its row from an earlier one in place
+	schoolsByState = {}
+	latest = {}
+	for path in sourcePaths('characteristics'):
+		placed = {}
+		found = set()
+		with instrumentationARP.span("national parse", source='characteristics', file=path):
+			for row in iterProjected(path, crdcColumns, where={'LEA_STATE': set(stateCodes)}, workers=workers):
+				found.add(row['COMBOKEY'])
+				if row['COMBOKEY'] in latest:
+					state, position = latest[row['COMBOKEY']]
+					schoolsByState[state][position] = row
+				else:
+					schools = schoolsByState.setdefault(row.get('LEA_STATE'), [])
+					placed[row['COMBOKEY']] = (row.get('LEA_STATE'), len(schools))
+					schools.append(row)
 			
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVarEng']] = int(stateData[school['ST_SCHID']].get('Total Students Tested in at Least One Subject')[1:])
-					school[test['passVarEng']] = int(stateData[school['ST_SCHID']].get('ELA A')) + int(stateData[school['ST_SCHID']].get('ELA M'))
-					school[test['studentsVarMath']] = int(stateData[school['ST_SCHID']].get('Total Students Tested in at Least One Subject')[1:])
-					school[test['passVarMath']] = int(stateData[school['ST_SCHID']].get('Math A')) + int(stateData[school['ST_SCHID']].get('Math M'))
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+			# schools of the selected states in this file
+			instrumentationARP.count(rowsMatched=len(found))
+		latest.update(placed)
 	
-	# function for merging Mississippi data
-	def assessmentMS ():
-		# import Mississippi CRDC/CCD data
-		data = importCRDC ('MS')
-		
-		# import Mississippi state assessment results
-		# exported from https://mdek12.org/publicreporting/assessment/
-		with open('MS/MS-All-COMBOKEY.csv', mode="r", newline="") as csvFile:
-			# import each line as dictionaries with the CSV header as the variable keys
-			reader = csv.DictReader(csvFile)
-				
-			# make nested list of dictionaries of results
-			stateData = {row['COMBOKEY']: row
-						for row in reader
-						if row.get('Math 2019 Level 3 (PCT)') != '*' #exclude those with no data provided
-						and row.get('2021 Math Level 3 (PCT)') != '*'}
-		
-		# if COMBOKEY is from data is the same as key from stateData, add number of students and pass rate
-		for school in data:
-			if 'COMBOKEY' in school and school['COMBOKEY'] in stateData:
-				for subject in [['3_ENG', 'ELA 2019'], ['3_MATH', 'Math 2019'],['5_ENG', '2021 ELA'],['5_MATH', '2021 Math']]:
-					school[f"{subject[0]}_NUMBER_STUDENTS"] = int(float(stateData[school['COMBOKEY']].get(f"{subject[1]} Test-Takers")))
-					# proficiency = Level 3 + 4 + 5
-					school[f"{subject[0]}_PASS"] = float(stateData[school['COMBOKEY']].get(f"{subject[1]} Level 3 (PCT)")[:-1]) + float(stateData[school['COMBOKEY']].get(f"{subject[1]} Level 4 (PCT)")[:-1]) + float(stateData[school['COMBOKEY']].get(f"{subject[1]} Level 5 (PCT)")[:-1])
-	
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	# the other national files only need rows for these schools and districts
+	combokeys = set(latest)
+	stateFips = {school['LEAID'][:2] for schools in schoolsByState.values() for school in schools}
 	
-	# function for merging Nebraska data
-	def assessmentNE ():
-		# import NE CRDC/CCD data
-		data = importCRDC ('NE')
-		
-		# import NE state assessment results
-		# exported from https://nep.education.ne.gov/#/data-downloads
-		resultsToMerge = [
-			{'file': 'NE/NSCAS_ELA_Proficient_20202021.csv', 'school year': '2018-2019', 'grade': '03', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'NE/NSCAS_Math_Proficient_20202021.csv', 'school year': '2018-2019', 'grade': '03','studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'NE/NSCAS_ELA_Proficient_20202021.csv', 'school year': '2020-2021', 'grade': '05', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-			{'file': 'NE/NSCAS_Math_Proficient_20202021.csv', 'school year': '2020-2021', 'grade': '05', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}		
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# key "NE-{County}{District}000-{County}{District}{School}" matches CCD ST_SCHID
-				stateData = {f"NE-{row['County']}{row['District']}000-{row['County']}{row['District']}{row['School']}": row
-							for row in reader
-							if row.get('Proficient Pct') != '-1' 
-							and row.get('Advanced Pct') != '-1' #exclude those with no data provided
-							and row.get('Category') == "All Students"
-							and row.get('School Year') == test['school year']
-							and row.get('Grade') == test['grade']} 
-				
-				
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVar']] = int(stateData[school['ST_SCHID']].get('Student Count'))
-					school[test['passVar']] = float(stateData[school['ST_SCHID']].get('Proficient Pct')) + float(stateData[school['ST_SCHID']].get('Advanced Pct')) 
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	# same thing, but for the internet access and devices CSV
+	# build a lookup dictionary using COMBOKEY as the key
+	schoolKey = operator.itemgetter('COMBOKEY')
+	internetData = {row['COMBOKEY']: row for row in iterSource('internet', ['COMBOKEY', 'SCH_INTERNET_WIFIENDEV'], schoolKey, combokeys, where={'COMBOKEY': combokeys}, workers=workers)}
+		
+	# same thing, but for the COVID directional indicators CSV
+	covidData = {row['COMBOKEY']: row for row in iterSource('covid', ['COMBOKEY', 'SCH_DIND_INSTRUCTIONTYPE', 'SCH_DIND_VIRTUALTYPE'], schoolKey, combokeys, where={'COMBOKEY': combokeys}, workers=workers)}
+		
+	# same thing, but for the enrollment CSV, kept as an integer matrix with the totals and device ratios of all schools
+	enrollment = enrollmentTable(combokeys, internetData)
+		
+	# same thing, but for the CCD school characteristics CSV
+	# build a lookup dictionary using NCESSCH (the CCD equivalent of COMBOKEY) as the key
+	ccdData = {row['NCESSCH']: row for row in iterSource('ccd', ['NCESSCH', 'ST_SCHID', 'TITLEI_STATUS'], operator.itemgetter('NCESSCH'), combokeys, where={'NCESSCH': combokeys}, encoding="ISO-8859-1", workers=workers)}
+		
+	# same thing, but for the SAIPE CSV file (exported from Excel, no header row)
+	fieldnames = ['state', 'stateCode', 'districtCode', 'districtName', 'population', 'studentPopulation', 'studentPovertyPopulation']
+	districtKey = lambda row: row['stateCode'] + row['districtCode']
+	districts = {school['LEAID'] for schools in schoolsByState.values() for school in schools}
+	rows = iterSource('saipe', ['stateCode', 'districtCode', 'studentPopulation', 'studentPovertyPopulation'], districtKey, districts, where={'stateCode': stateFips}, encoding="ISO-8859-1", fieldnames=fieldnames, workers=workers)
+	# build a lookup dictionary using LEAID as the key
+	saipeData = {districtKey(row): row for row in rows}
 	
-	# function for merging South Carolina data
-	def assessmentSC ():
-		# import South Carolina CRDC/CCD data
-		data = importCRDC ('SC')
-		
-		# import South Carolina state assessment results
-		# exported from https://ed.sc.gov/data/test-scores/state-assessments/sc-ready/
-		
-		resultsToMerge = [
-			{'file': 'SC/SCREADY 2018-2019 Press Release v2.csv', 'grade': '03', 'studentsVarEng': '3_ENG_NUMBER_STUDENTS', 'passVarEng': '3_ENG_PASS', 'studentsVarMath': '3_MATH_NUMBER_STUDENTS', 'passVarMath': '3_MATH_PASS'},
-			{'file': 'SC/SCREADY 2020-2021 Press Release V3.csv', 'grade': '05', 'studentsVarEng': '5_ENG_NUMBER_STUDENTS', 'passVarEng': '5_ENG_PASS', 'studentsVarMath': '5_MATH_NUMBER_STUDENTS', 'passVarMath': '5_MATH_PASS'}
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# make nested list of dictionaries of results that are of the relevant test
-				stateData = {f"SC-{row['schoolid'][:4]}-{row['schoolid'][4:]}": row
-							for row in reader
-							if (row.get('testgrade') == test['grade'])
-							and row.get('demoID') == '01ALL'
-							and row.get('ELAN') != ''
-							and row.get('ELApct34') != ''
-							and row.get('MathN') != ''
-							and row.get('Mathpct34') != ''
-						} #exclude those with no data provided
-				
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVarEng']] = int(stateData[school['ST_SCHID']].get('ELAN'))
-					school[test['passVarEng']] = float(stateData[school['ST_SCHID']].get('ELApct34'))
-					school[test['studentsVarMath']] = int(stateData[school['ST_SCHID']].get('MathN'))
-					school[test['passVarMath']] = float(stateData[school['ST_SCHID']].get('Mathpct34'))
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	return {
+		'schoolsByState': schoolsByState,
+		'internetData': internetData,
+		'covidData': covidData,
+		'enrollment': enrollment,
+		'ccdData': ccdData,
+		'saipeData': saipeData
+	}
+
+# function for importing relevant CRDC, CCD, and SAIPE data by state from the national index
+def importCRDC (national, state):
+	with instrumentationARP.span("crdc merge", state=state):
+		return enrichSchools(national, state)
+
+# function for copying a state's schools out of the national index and adding the national fields to them
+def enrichSchools (national, state):
 	
-	# function for merging South Dakota data
-	def assessmentSD ():
-		# import South Dakota CRDC/CCD data
-		data = importCRDC ('SD')
-		
-		# import South Dakota state assessment results
-		# exported from https://www.zelma.ai/data
-		
-		resultsToMerge = [
-			{'file': 'SD/edc-2.1-south dakota-2019.csv', 'grade': 'G03', 'subject': 'math', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'SD/edc-2.1-south dakota-2019.csv', 'grade': 'G03', 'subject': 'ela', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'SD/edc-2.1-south dakota-2021.csv', 'grade': 'G05', 'subject': 'math', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'},
-			{'file': 'SD/edc-2.1-south dakota-2021.csv', 'grade': 'G05', 'subject': 'ela', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'}
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# make nested list of dictionaries of results that are of the relevant test
-				stateData = {f"SD-{row['StateAssignedSchID']}": row
-							for row in reader
-							if (row.get('GradeLevel') == test['grade'])
-							and row.get('StudentGroup') == 'All Students'
-							and row.get('DataLevel') == 'School'
-							and row.get('Subject') == test['subject']
-							and row.get('StudentSubGroup_TotalTested') != '*'
-							and row.get('ProficientOrAbove_percent') != '*'
-						} #exclude those with no data provided
-
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVar']] = int(stateData[school['ST_SCHID']].get('StudentSubGroup_TotalTested'))
-					school[test['passVar']] = float(stateData[school['ST_SCHID']].get('ProficientOrAbove_percent'))
-						
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	# copy the state's school characteristics rows into compact records so the national index is never modified
+	data = [SchoolRecord(row) for row in national['schoolsByState'].get(state, [])]
+	internetData = national['internetData']
+	covidData = national['covidData']
+	enrollment = national['enrollment']
+	ccdData = national['ccdData']
+	saipeData = national['saipeData']
+		
+	# if COMBOKEY is the same in both databases, add the field SCH_INTERNET_WIFIENDEV to data
+	for school in data:
+		if school['COMBOKEY'] in internetData:
+			school['SCH_INTERNET_WIFIENDEV'] = internetData[school['COMBOKEY']].get('SCH_INTERNET_WIFIENDEV')
+			
+	# if COMBOKEY is the same in both databases, add the COVID instructional mode fields to data
+	for school in data:
+		if school['COMBOKEY'] in covidData:
+			school['SCH_DIND_INSTRUCTIONTYPE'] = covidData[school['COMBOKEY']].get('SCH_DIND_INSTRUCTIONTYPE')
+			school['SCH_DIND_VIRTUALTYPE'] = covidData[school['COMBOKEY']].get('SCH_DIND_VIRTUALTYPE')
+			
+	# if COMBOKEY is the same in both databases, add the total enrollment, device ratio, and Black and Hispanic enrollment to data,
+	# gathered from the totals already computed for every school
+	enrolled = [school for school in data if school['COMBOKEY'] in enrollment['positions']]
+	rows = np.array([enrollment['positions'][school['COMBOKEY']] for school in enrolled], dtype=np.intp)
+	columns = [enrollment[column][rows].tolist() for column in ['total', 'hasRatio', 'ratio', 'black', 'hispanic']]
+	for school, total, hasRatio, ratio, black, hispanic in zip(enrolled, *columns):
+		school['TOTAL_ENROLLMENT'] = total
+		if hasRatio:
+			school['RATIO_DEVICES_TO_ENROLLMENT'] = ratio
+		school['TOTAL_ENROLLMENT_BLACK'] = black
+		school['TOTAL_ENROLLMENT_HISPANIC'] = hispanic
 	
-	# function for merging Texas data
-	def assessmentTX ():
-		# import Texas CRDC/CCD data
-		data = importCRDC ('TX')
-		
-		# import Texas state assessment results
-		# exported from https://txresearchportal.com/
-		resultsToMerge = [
-			{'file': 'TX/TX-Reading-3.csv', 'testType': 'STAAR - Reading', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'TX/TX-Math-3.csv', 'testType': 'STAAR - Mathematics', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'TX/TX-Reading-5.csv', 'testType': 'STAAR - Reading', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-			{'file': 'TX/TX-Math-5.csv', 'testType': 'STAAR - Mathematics', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}		
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# make nested list of dictionaries of results that are of the relevant test
-				stateData = {f"TX-{row['ID/CDC'][:-3]}-{row['ID/CDC']}": row
-							for row in reader
-							if row.get(test['testType'] + '|Performance Levels|Meets and Above|Percentage') != ''
-							and row.get(test['testType'] + '|Tests Taken') != '' #exclude those with no data provided
-							and row.get('Student Group') == "All Students"}
+	# map CRDC COMBOKEY to NCESSCH from CCD; add ST_SCHID and Title 1 eligibility
+	for school in data:
+		if school['COMBOKEY'] in ccdData:
+			school['ST_SCHID'] = ccdData[school['COMBOKEY']].get('ST_SCHID')
+			if ccdData[school['COMBOKEY']].get('TITLEI_STATUS') == 'NOTTITLE1ELIG':
+				school['TITLE1ELIG'] = 0 
+			elif ccdData[school['COMBOKEY']].get('TITLEI_STATUS') != 'Not reported':
+				school['TITLE1ELIG'] = 1
 				
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID' in school and school['ST_SCHID'] in stateData:
-					school[test['studentsVar']] = int(stateData[school['ST_SCHID']].get(test['testType'] + '|Tests Taken'))
-					school[test['passVar']] = float(stateData[school['ST_SCHID']].get(test['testType'] + '|Performance Levels|Meets and Above|Percentage'))
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	# add DISTRICT_POVERTY_PERCENTAGE = student poverty / total students (SAIPE)
+	for school in data:
+		if school['LEAID'] in saipeData:
+			school['DISTRICT_POVERTY_PERCENTAGE'] = int(saipeData[school['LEAID']].get('studentPovertyPopulation').replace(",", "")) / int(saipeData[school['LEAID']].get('studentPopulation').replace(",", ""))
 	
-	# function for merging Utah data
-	def assessmentUT ():
-		# import Utah CRDC/CCD data
-		data = importCRDC ('UT')
-		
-		# import Utah state assessment results
-		# exported from https://schools.utah.gov/datastatistics/reports
-		# COMBOKEY added to CSV via VLOOKUP and manually
-		with open('UT/UT-all-COMBOKEY.csv', mode="r", newline="") as csvFile:
-			# import each line as dictionaries with the CSV header as the variable keys
-			reader = csv.DictReader(csvFile)
+	# schools matched to a CCD record, and so to a state school ID
+	instrumentationARP.count(rowsRead=len(data), rowsKept=len(data), rowsMatched=len([school for school in data if 'ST_SCHID' in school]))
+	return data
+
+# function for calculating Z scores and Z-score changes
+def calculateZScores (data):
+	with instrumentationARP.span("zscores", state=data[0].get('LEA_STATE') if data else None):
+		return addZScores(data)
+
+# function for adding the Z score and Z-score change fields to a state's school records
+def addZScores (data):
+	zScorestoCalculate = [
+		{'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS', 'zScoreVar': '3_ENG_ZSCORE'},
+		{'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS', 'zScoreVar': '3_MATH_ZSCORE'},
+		{'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS', 'zScoreVar': '5_ENG_ZSCORE'},
+		{'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS', 'zScoreVar': '5_MATH_ZSCORE'}	
+	]
+	# extract the reference-population status columns once; reference schools are not SPED/Magnet/Charter/Alternative
+	statusOK = np.ones(len(data), dtype=bool)
+	for status in ['SCH_STATUS_SPED', 'SCH_STATUS_MAGNET', 'SCH_STATUS_CHARTER', 'SCH_STATUS_ALT']:
+		statusOK &= np.array([school.get(status) == 'No' for school in data], dtype=bool)
+	
+	# iterate through zScorestoCalculate, computing each z-score column in bulk
+	zScores = {}
+	inReference = np.zeros(len(data), dtype=bool)
+	for zScore in zScorestoCalculate:
+		
+		# pass rates and tested counts as arrays (NaN where a school has no result)
+		hasResult = np.array([zScore['passVar'] in school for school in data], dtype=bool)
+		passes = np.array([school.get(zScore['passVar'], np.nan) for school in data], dtype=np.float64)
+		tested = np.array([school.get(zScore['studentsVar'], np.nan) for school in data], dtype=np.float64)
+		
+		# build distribution from schools with ≥20 tested and not SPED/Magnet/Charter/Alternative
+		reference = hasResult & (tested >= 20) & statusOK
+		inReference |= reference
+		passPercentages = passes[reference]
+		
+		# calculate mean and standard deviation
+		mean = np.mean(passPercentages)
+		sd = np.std(passPercentages, ddof=1)
+		
+		# add Z score to data
+		zScores[zScore['zScoreVar']] = np.where(hasResult, (passes - mean) / sd, np.nan), hasResult
+		for i, value in zip(np.flatnonzero(hasResult), zScores[zScore['zScoreVar']][0][hasResult]):
+			data[i][zScore['zScoreVar']] = value
 			
-			# make nested list of dictionaries of results that are of the relevant test
-			stateData = {f"{row['Combokey']}-{row['School Year']}-{row['Grade']}-{row['Subject']}": row
-							for row in reader
-							if row.get('Percent Proficient') != 'N<10' } # exclude those with no data provided
+	# add Z score changes to data
+	for subject in ['ENG', 'MATH']:
+		(z5, has5), (z3, has3) = zScores[f"5_{subject}_ZSCORE"], zScores[f"3_{subject}_ZSCORE"]
+		hasBoth = has5 & has3
+		for i, value in zip(np.flatnonzero(hasBoth), (z5 - z3)[hasBoth]):
+			data[i][f"{subject}_ZSCORE_CHANGE"] = value
+	
+	# schools in at least one reference distribution, and schools with at least one Z score
+	hasAny = np.zeros(len(data), dtype=bool)
+	for values, hasResult in zScores.values():
+		hasAny |= hasResult
+	instrumentationARP.count(rowsRead=len(data), rowsKept=int(inReference.sum()), rowsMatched=int(hasAny.sum()))
 			
-			for utTest in [
-				{'school year': '2019', 'testType': 'English Language Arts', 'grade': '3rd Grade Language Arts', 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-				{'school year': '2019', 'testType': 'Mathematics', 'grade': '3rd Grade Math', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-				{'school year': '2021', 'testType': 'English Language Arts', 'grade': '5th Grade Language Arts', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-				{'school year': '2021', 'testType': 'Mathematics', 'grade': '5th Grade Math', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}	
-			]:
-				# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-				for school in data:
-					if 'COMBOKEY' in school:
-						matchingKey = f"{school['COMBOKEY']}-{utTest['school year']}-{utTest['grade']}-{utTest['testType']}"
-						if matchingKey in stateData:
-							school[utTest['studentsVar']] = int(stateData[matchingKey].get('Number Students'))
-							# if a range for percent proficient/advanced, average the smallest and largest
-							if stateData[matchingKey].get('Percent Proficient')[:2] == '<=':
-								school[utTest['passVar']] = int(stateData[matchingKey].get('Percent Proficient')[2:][:-1])/2
-							elif stateData[matchingKey].get('Percent Proficient')[:2] == '>=':
-								school[utTest['passVar']] = (int(stateData[matchingKey].get('Percent Proficient')[2:][:-1]) + 100)/2
-							elif '-' in stateData[matchingKey].get('Percent Proficient', ''):
-								range_str = stateData[matchingKey].get('Percent Proficient', '').replace('%', '')
-								low, high = map(int, range_str.split('-'))
-								school[utTest['passVar']] = (low + high) / 2
-							else:
-								school[utTest['passVar']] = float(stateData[matchingKey].get('Percent Proficient')[:-1])
-								
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	return data
+
+# function for pivoting a long-format (one row per indicator) file into wide rows in a single pass
+# rows are grouped on the 'by' columns; each indicator becomes a column holding its last non-blank value
+def pivotLong (rows, by, indicator, value):
+	wide = {}
+	for row in rows:
+		if row.get(value) == "":
+			continue
+		group = tuple(row.get(column) for column in by)
+		if group not in wide:
+			wide[group] = {column: row.get(column) for column in by}
+		wide[group][row.get(indicator)] = row.get(value)
+	return wide.values()
+
+# function for reading all of a state's assessment files, each in a single streaming pass
+# returns one {key: row} dictionary per test in the spec
+def readAssessments (spec):
+	tests = spec['tests']
+	results = [{} for _ in tests]
 	
-	# function for merging Vermont data
-	def assessmentVT ():
-		# import Vermont CRDC/CCD data
-		data = importCRDC ('VT')
-		
-		# make shorter ST_SCHID for VT, e.g. VT-T151-PS223 to VT-PS223
-		for school in data:
-			if 'ST_SCHID' in school:
-				school['ST_SCHID_shortened'] = re.sub(r"^(\w+)-\w+-(\w+)$", r"\1-\2", school['ST_SCHID'])
-				
-		# import Vermont state assessment results
-		# exported from https://education.vermont.gov/sites/aoe/files/documents/Assessment_Sept2023.zip
-		resultsToMerge = [
-			{'file': 'VT/Smarter Balance_Assessment_2019.csv', 'subject': 'SB English Language Arts Grade 03',  'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-			{'file': 'VT/Smarter Balance_Assessment_2019.csv', 'subject': 'SB Math Grade 03','studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS'},
-			{'file': 'VT/Smarter Balance_Assessment_2021.csv', 'subject': 'SB English Language Arts Grade 05', 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-			{'file': 'VT/Smarter Balance_Assessment_2021.csv', 'subject': 'SB Math Grade 05', 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}		
-		]
-		for test in resultsToMerge:
-			with open(test['file'], mode="r", newline="") as csvFile:
-				# import each line as dictionaries with the CSV header as the variable keys
-				reader = csv.DictReader(csvFile)
-				
-				# make nested list of dictionaries of results that are of the relevant test
-				stateData = {f"VT-{row['OrganizationIdentifer']}": row
-							for row in reader
-							if row.get('IndicatorLabel') == "Total Proficient and Above"
-							and row.get('TestName') == test['subject']
-							and row.get('AssessGroup') == "All Students"
-							and row.get('SchoolValue') != ""}
-				
-				# add number of students for each test
-				csvFile.seek(0) # rewind reader
-				for row in reader:
-					if row.get('IndicatorLabel') == "Number of Students Tested" and row.get('TestName') == test['subject'] and row.get('AssessGroup') == "All Students" and row.get('SchoolValue') != "" and f"VT-{row['OrganizationIdentifer']}" in stateData:
-						stateData[f"VT-{row['OrganizationIdentifer']}"]['NumberStudents'] = row.get('SchoolValue')
-						
-			# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-			for school in data:
-				if 'ST_SCHID_shortened' in school and school['ST_SCHID_shortened'] in stateData:
-					school[test['studentsVar']] = float(stateData[school['ST_SCHID_shortened']].get('NumberStudents'))
-					school[test['passVar']] = float(stateData[school['ST_SCHID_shortened']].get('SchoolValue'))
-					
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
+	# group the spec's tests by the file they read
+	testsByFile = {}
+	for t, test in enumerate(tests):
+		testsByFile.setdefault(test['file'], []).append(t)
 	
-	# function for merging Wyoming data
-	def assessmentWY ():
-		# import Wyoming CRDC/CCD data
-		data = importCRDC ('WY')
-		
-		# import WY state assessment results
-		# exported from https://edu.wyoming.gov/data/assessment-reports/
-		# COMBOKEY added to CSV via VLOOKUP and manually
-		with open('WY/WY-all-COMBOKEY.csv', mode="r", newline="") as csvFile:
+	for path, fileTests in testsByFile.items():
+		with instrumentationARP.span("state parse", state=spec['state'], file=path) as record, open(path, mode="r", newline="") as csvFile:
 			# import each line as dictionaries with the CSV header as the variable keys
 			reader = csv.DictReader(csvFile)
 			
-			# make nested list of dictionaries of results that are of the relevant test
-			stateData = {f"{row['COMBOKEY']}-{row['SCHOOL YEAR']}-{row['GRADE']}-{row['SUBJECT']}": row
-							for row in reader
-							if row.get('PERCENT PROFICIENT ADVANCED') != '.' } # exclude those with no data provided
+			# long-format sources are pivoted to one wide row per organization x test x group first
+			if 'pivot' in spec:
+				reader = pivotLong(reader, **spec['pivot'])
 			
+			# route every row to each test whose filter it passes; the last row for a key wins
+			read = kept = 0
+			for row in reader:
+				read += 1
+				passed = False
+				for t in fileTests:
+					test = tests[t]
+					if test['filter'](row):
+						results[t][test['key'](row)] = row
+						passed = True
+				kept += passed
+			instrumentationARP.count(rowsRead=read, rowsKept=kept)
 			
-			for wyTest in [
-				{'school year': '2018-19', 'testType': 'English Language Arts (ELA)', 'grade': 3, 'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS'},
-				{'school year': '2018-19', 'testType': 'Math', 'studentsVar': '3_MATH_NUMBER_STUDENTS', 'grade': 3, 'passVar': '3_MATH_PASS'},
-				{'school year': '2020-21', 'testType': 'English Language Arts (ELA)', 'grade': 5, 'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS'},
-				{'school year': '2020-21', 'testType': 'Math', 'grade': 5, 'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS'}	
-			]:
-				# if ST_SCHID is from data is the same as key from stateData, add number of students and pass rate
-				for school in data:
-					if 'COMBOKEY' in school:
-						matchingKey = f"{school['COMBOKEY']}-{wyTest['school year']}-{wyTest['grade']}-{wyTest['testType']}"
-						if matchingKey in stateData:
-							# average the smallest and largest values from the range for number of students
-							school[wyTest['studentsVar']] = sum(map(int, stateData[matchingKey].get('NUMBER OF STUDENTS TESTED').split('-'))) / 2
-							# if a range for percent proficient/advanced, average the smallest and largest
-							if stateData[matchingKey].get('PERCENT PROFICIENT ADVANCED')[:2] == '<=':
-								school[wyTest['passVar']] = int(stateData[matchingKey].get('PERCENT PROFICIENT ADVANCED')[2:][:-1])/2
-							elif stateData[matchingKey].get('PERCENT PROFICIENT ADVANCED')[:2] == '>=':
-								school[wyTest['passVar']] = (int(stateData[matchingKey].get('PERCENT PROFICIENT ADVANCED')[2:][:-1]) + 100)/2
-							else:
-								school[wyTest['passVar']] = float(stateData[matchingKey].get('PERCENT PROFICIENT ADVANCED')[:-1])
-								
-		# add Z scores
-		data = calculateZScores(data)
-		
-		return data
-	
-	# function for calculating Z scores and Z-score changes
-	def calculateZScores (data):
-		zScorestoCalculate = [
-			{'studentsVar': '3_ENG_NUMBER_STUDENTS', 'passVar': '3_ENG_PASS', 'zScoreVar': '3_ENG_ZSCORE'},
-			{'studentsVar': '3_MATH_NUMBER_STUDENTS', 'passVar': '3_MATH_PASS', 'zScoreVar': '3_MATH_ZSCORE'},
-			{'studentsVar': '5_ENG_NUMBER_STUDENTS', 'passVar': '5_ENG_PASS', 'zScoreVar': '5_ENG_ZSCORE'},
-			{'studentsVar': '5_MATH_NUMBER_STUDENTS', 'passVar': '5_MATH_PASS', 'zScoreVar': '5_MATH_ZSCORE'}	
-		]
-		# iterate through zScorestoCalculate
-		for zScore in zScorestoCalculate:
-			
-			# build distribution from schools with ≥20 tested and not SPED/Magnet/Charter/Alternative
-			passPercentages = [row[zScore['passVar']] for row in data if zScore['passVar'] in row 
-				and row[zScore['studentsVar']] >= 20
-				and row.get('SCH_STATUS_SPED') == 'No'
-				and row.get('SCH_STATUS_MAGNET') == 'No'
-				and row.get('SCH_STATUS_CHARTER') == 'No'
-				and row.get('SCH_STATUS_ALT') == 'No']
+			# rows are matched to schools by the join, which reports them; this span has no matched count
+			record['rowsMatched'] = None
+	
+	return results
+
+# function for merging a state's assessment results into its school records, given the state's crosswalk
+# each result key's code in the crosswalk's join key index gives the ids of its schools (their positions in data)
+# as a slice of stored integers, so the cost scales with matched rows rather than schools x tests
+def joinAssessments (data, spec, results, crosswalk):
+	with instrumentationARP.span("join", state=spec['state']):
+		index = crosswalkARP.crosswalkIndex(crosswalk, 'native')
+		order = np.asarray(index['order'], dtype=np.int64)
+		starts = np.asarray(index['starts'], dtype=np.int64)
+		
+		joined = 0
+		matched = np.zeros(len(data), dtype=bool)
+		for test, stateData in zip(spec['tests'], results):
+			# result rows whose key is the same as a school's key, with the key's code
+			rowCodes = np.fromiter((index['codes'].get(key, -1) for key in stateData), dtype=np.int64, count=len(stateData))
+			positions = np.flatnonzero(rowCodes >= 0)
+			rows = list(stateData.values())
+			rows = [rows[position] for position in positions]
+			codes = rowCodes[positions]
+			if rows and 'keep' in test:
+				kept = np.asarray(test['keep'](rows), dtype=bool)
+				rows = [row for row, keep in zip(rows, kept) if keep]
+				codes = codes[kept]
+			if not rows:
+				continue
 			
-			# calculate mean and standard deviation
-			mean = np.mean(passPercentages)
-			sd = np.std(passPercentages, ddof=1)
+			# the ids of every row's schools, with the row each id belongs to
+			sizes = starts[codes + 1] - starts[codes]
+			rowOfId = np.repeat(np.arange(len(rows)), sizes)
+			ids = order[np.repeat(starts[codes] - np.cumsum(sizes) + sizes, sizes) + np.arange(int(sizes.sum()))]
 			
-			# add Z score to data
-			for school in data:
-				if zScore['passVar'] in school:
-					school[zScore['zScoreVar']] = (school[zScore['passVar']] - mean) / sd
-					
-		# add Z score changes to data
-		for school in data:
-			if '5_ENG_ZSCORE' in school and '3_ENG_ZSCORE' in school:
-				school['ENG_ZSCORE_CHANGE'] = (school['5_ENG_ZSCORE'] - school['3_ENG_ZSCORE'])
-			if '5_MATH_ZSCORE' in school and '3_MATH_ZSCORE' in school:
-				school['MATH_ZSCORE_CHANGE'] = (school['5_MATH_ZSCORE'] - school['3_MATH_ZSCORE'])
+			# decode each field for all matched rows at once, then add number of students and pass rate to the schools
+			for field, values in test['fields'].items():
+				for i, value in zip(ids.tolist(), values(rows)[rowOfId].tolist()):
+					data[i][field] = value
+			joined += len(rows)
+			matched[ids] = True
+		
+		# result rows offered to the join, result rows joined to a school, and schools that got a value
+		instrumentationARP.count(rowsRead=sum(len(stateData) for stateData in results), rowsKept=joined, rowsMatched=int(matched.sum()))
+	
+	return data
+
+# function for merging one state's parsed assessment results into its CRDC/CCD school records
+# cacheDir keeps the state's crosswalk between runs (see crosswalkARP.stateCrosswalk)
+def mergeState (national, state, results, cacheDir=None):
+	spec = stateSpecs[state]
+	
+	# import the state's CRDC/CCD data, and the crosswalk of its schools' identifiers (in the same order)
+	data = importCRDC(national, spec['state'])
+	crosswalk = crosswalkARP.stateCrosswalk(national, spec, sourcePaths('characteristics') + sourcePaths('ccd'), cacheDir)
+	
+	# add fields the state's join key needs, as derived in the crosswalk
+	for field, values in crosswalk['derived'].items():
+		for school, value in zip(data, values):
+			if value is not None:
+				school[field] = value
+	
+	# merge the state's assessment results into the school records
+	return joinAssessments(data, spec, results, crosswalk)
+
+# function for building one state's merged dataset from the national index and its spec
+def assessState (state, national=None, cacheDir=None):
+	spec = stateSpecs[state]
+	
+	# worker processes use the national index inherited from the parent, or parse the state's share of it
+	if national is None:
+		national = sharedNational if sharedNational is not None else importNational([spec['state']])
+	
+	# import the state's assessment results and merge them into its CRDC/CCD data
+	data = mergeState(national, state, readAssessments(spec), cacheDir)
+	
+	# add Z scores
+	return calculateZScores(data)
+
+# function run in worker processes: one state's pipeline plus the spans it recorded, which would otherwise stay in the worker
+def assessStateTraced (state, cacheDir=None):
+	del instrumentationARP.spans[:]
+	data = assessState(state, cacheDir=cacheDir)
+	return data, list(instrumentationARP.spans)
+
+# function for a selection of states in output order (every state if None); raises ValueError naming any unknown state
+def selectStates (states=None):
+	if states is None:
+		return list(stateSpecs)
+	unknown = [state for state in states if state not in stateSpecs]
+	if unknown:
+		raise ValueError(f"unknown states: {', '.join(unknown)} (choose from {', '.join(stateSpecs)})")
+	return [state for state in stateSpecs if state in states]
+
+# national index handed to worker processes; set by dataFinal before its process pool starts
+sharedNational = None
+
+# function imported into the data analysis Python program as dataImportProcessingARP.dataFinal
+# workers > 1 runs the per-state pipelines in a process pool; parseWorkers > 1 parses the large national files in
+# parallel byte ranges (see minChunkBytes); states selects a subset of states;
+# national reuses an already-parsed national index; tracePath writes the run's spans as a JSON trace and prints
+# their summary (verbose prints it without a trace); cacheDir (e.g. incrementalBuildARP.cacheDir) keeps each
+# state's crosswalk there, otherwise nothing is written
+def dataFinal(workers=1, states=None, national=None, tracePath=None, cacheDir=None, verbose=False, parseWorkers=1):
+	firstSpan = len(instrumentationARP.spans)
+	
+	# states in output order
+	states = selectStates(states)
+	
+	# parse the national files once; every state's importCRDC call is a lookup into this index
+	if national is None:
+		national = importNational([stateSpecs[state]['state'] for state in states], parseWorkers)
+	
+	# import data by state, either serially or across a process pool
+	if workers > 1 and len(states) > 1:
+		
+		# workers inherit the national index when processes are forked; otherwise each one parses it again
+		# (the index is released even if a state's pipeline fails)
+		global sharedNational
+		sharedNational = national
+		try:
+			with ProcessPoolExecutor(max_workers=workers, mp_context=poolContext()) as pool:
+				# submit the largest states first so the slowest pipeline starts immediately
+				bySize = sorted(states, key=lambda state: len(national['schoolsByState'].get(stateSpecs[state]['state'], [])), reverse=True)
+				futures = {state: pool.submit(assessStateTraced, state, cacheDir) for state in bySize}
 				
-		# print completion
-		print("data imported and z scores calculated for function", inspect.stack()[1].function)
-		return data
-	
-	# import data by state
-	stateDatasets = {
-		"Alabama": assessmentAL(),
-		"Arkansas": assessmentAR(),
-		"Georgia": assessmentGA(),
-		"Indiana": assessmentIN(),
-		"Iowa": assessmentIA(),
-		"Louisiana": assessmentLA(),
-		"Mississippi": assessmentMS(),
-		"Nebraska": assessmentNE(),
-		"South Carolina": assessmentSC(),
-		"South Dakota": assessmentSD(),
-		"Texas": assessmentTX(),
-		"Utah": assessmentUT(),
-		"Vermont": assessmentVT(),
-		"Wyoming": assessmentWY()
-	}
+				# merge results and worker spans back in the fixed state order
+				stateDatasets = {}
+				for state in states:
+					stateDatasets[state], workerSpans = futures[state].result()
+					instrumentationARP.spans.extend(workerSpans)
+		finally:
+			sharedNational = None
+	else:
+		stateDatasets = {state: assessState(state, national, cacheDir) for state in states}
 	
 	# consolidate per-state lists into a single list of school records
 	stateDatasets["All"] = [school for data in stateDatasets.values() for school in data]
 	
+	# summarize the run's spans when asked to
+	runSpans = instrumentationARP.spans[firstSpan:]
+	if verbose or tracePath is not None:
+		instrumentationARP.printSummary(runSpans)
+	if tracePath is not None:
+		instrumentationARP.writeTrace(tracePath, runSpans)
+	
 	return stateDatasets
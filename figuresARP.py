@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+'''This script renders the analysis figures (boxplots of z-score change by
+   1:1-device access, and device ratio vs. z-score change as scatter and
+   hexbin plots) for every state and subject on the non-interactive Agg
+   backend, across a process pool, skipping each figure whose input data,
+   plotting code and library versions are unchanged since its last render'''
+
+
+# import relevant Python libraries
+import hashlib
+import json
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+
+# import the process pool context, cache directory and atomic writes scripted for this ARP
+from dataImportProcessingARP import poolContext
+from incrementalBuildARP import cacheDir
+from atomicWriteARP import atomicWrite
+
+# kinds of figure rendered for every state and subject
+figureKinds = ['boxplot', 'scatter', 'hexbin']
+
+# directory (relative to the data directory) for the per-state figures, and the hashes of the last render of every figure
+figuresDir = "figures"
+manifestPath = os.path.join(cacheDir, "figures.json")
+
+# bump when the figures' layout changes so every figure is rendered again
+figureVersion = 1
+
+# function for the path of a figure; the "All" boxplots keep their original names in the data directory
+def figurePath (kind, state, subject):
+	if kind == 'boxplot' and state == "All":
+		return f"{subject}_boxplot.png"
+	return os.path.join(figuresDir, f"{state.replace(' ', '_')}_{subject}_{kind}.png")
+
+# function for hashing what a figure depends on: its kind, the plotting code, the library versions, and its data
+def figureHash (kind, state, subject, ratios, values):
+	digest = hashlib.sha256(json.dumps([figureVersion, kind, state, subject,
+		[metadata.version(package) for package in ['matplotlib', 'seaborn']]]).encode())
+	with open(__file__, mode="rb") as sourceFile:
+		digest.update(sourceFile.read())
+	digest.update(ratios.tobytes())
+	digest.update(values.tobytes())
+	return digest.hexdigest()
+
+# function run in worker processes: render one figure to path
+def renderFigure (kind, state, subject, ratios, values, path):
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+	import pandas as pd
+	import seaborn as sns
+
+	sns.set(style="whitegrid")
+
+	# set TNR as the font for all plots
+	plt.rcParams['font.family'] = 'Times New Roman'
+
+	fig = plt.figure(figsize=(8, 5))
+	if kind == 'boxplot':
+		# schools not 1:1 (0) and schools that are 1:1 (1); schools in between are left out
+		oneToOne = np.where(ratios >= 0.90, 1.0, np.where(ratios <= 0.5, 0.0, np.nan))
+		data = pd.DataFrame({'OneToOne': oneToOne, f'{subject}_ZSCORE_CHANGE': values}).dropna()
+		sns.boxplot(x='OneToOne', y=f'{subject}_ZSCORE_CHANGE', data=data)
+		plt.xlabel("")
+		plt.xticks(ticks=[0, 1], labels=["No 1:1-Device Access", "1:1-Device Access"])
+	elif kind == 'scatter':
+		plt.scatter(ratios, values, s=6, alpha=0.4, edgecolors='none')
+		plt.xlabel("Devices per Student")
+	else:
+		if len(values):
+			plt.hexbin(ratios, values, gridsize=40, mincnt=1, cmap='viridis')
+			plt.colorbar(label="Schools")
+		plt.xlabel("Devices per Student")
+
+	# the non-1:1 and 1:1 thresholds on the ratio plots
+	if kind != 'boxplot':
+		for threshold in [0.5, 0.90]:
+			plt.axvline(threshold, color='gray', linestyle='--', linewidth=1)
+
+	# define labels and other layout specs
+	if subject == "ENG":
+		plt.ylabel("ELA z-Score Change")
+	else:
+		plt.ylabel("Math z-Score Change")
+	plt.tight_layout()
+
+	# save figure as high-res PNG
+	atomicWrite(path, lambda figureFile: plt.savefig(figureFile, format='png', dpi=300, bbox_inches='tight'), mode="wb")
+	plt.close(fig)
+	return path
+
+# function for rendering every kind of figure for each state and subject from the columnar frame and the funnel's samples,
+# serially or across a process pool; returns the paths rendered and the paths skipped as unchanged
+def renderFigures (frame, samples, states, subjects, workers=1):
+	manifest = {}
+	if os.path.exists(manifestPath):
+		with open(manifestPath) as manifestFile:
+			manifest = json.load(manifestFile)
+
+	# every figure's data and hash; figures whose hash matches their last render (and whose file still exists) are skipped
+	jobs, unchanged, hashes = [], [], {}
+	for state in states:
+		for subject in subjects:
+			filteredData = frame.iloc[samples[(state, subject)]]
+			ratios = filteredData['RATIO_DEVICES_TO_ENROLLMENT'].to_numpy(dtype=np.float64)
+			values = filteredData[f'{subject}_ZSCORE_CHANGE'].to_numpy(dtype=np.float64)
+			keep = ~np.isnan(ratios) & ~np.isnan(values)
+			ratios, values = ratios[keep], values[keep]
+			for kind in figureKinds:
+				path = figurePath(kind, state, subject)
+				hashes[path] = figureHash(kind, state, subject, ratios, values)
+				if manifest.get(path) == hashes[path] and os.path.exists(path):
+					unchanged.append(path)
+				else:
+					jobs.append((kind, state, subject, ratios, values, path))
+
+	# render the changed figures
+	if workers > 1 and len(jobs) > 1:
+		with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=poolContext()) as pool:
+			rendered = list(pool.map(renderFigure, *zip(*jobs)))
+	else:
+		rendered = [renderFigure(*job) for job in jobs]
+
+	# record the rendered figures' hashes
+	manifest.update(hashes)
+	atomicWrite(manifestPath, lambda manifestFile: json.dump(manifest, manifestFile, indent=1))
+
+	return rendered, unchanged
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+'''This script converts the merged state datasets once into a columnar frame
+   and computes the analysis sample funnel (any state data, all state data,
+   no charter etc., excluding virtual schools, >=20 students, 75%-125%) for
+   every state and subject as boolean masks in one grouped pass, so each
+   filtered sample is a set of row indexes into the frame instead of a
+   rebuilt list of school records'''
+
+
+# import relevant Python libraries
+import itertools
+import numpy as np
+import pandas as pd
+
+# import the school record schema scripted for this ARP
+import dataImportProcessingARP
+
+# subjects analyzed, in output order
+subjects = ['MATH', 'ENG']
+
+# funnel stages in order: a label and a function of (frame, present, subject) returning a boolean mask;
+# a school stays in a sample only while every stage up to the current one holds
+funnelStages = [
+	("any state data", lambda frame, present, subject:
+		present[[f"{grade}_{subject}_{field}" for grade in ['3', '5'] for field in ['NUMBER_STUDENTS', 'PASS']]].any(axis=1)),
+	("all state data", lambda frame, present, subject:
+		present[f"{subject}_ZSCORE_CHANGE"] & present['RATIO_DEVICES_TO_ENROLLMENT']),
+	("no charter etc.", lambda frame, present, subject:
+		(frame['SCH_STATUS_SPED'] == 'No') & (frame['SCH_STATUS_MAGNET'] == 'No') & (frame['SCH_STATUS_CHARTER'] == 'No') & (frame['SCH_STATUS_ALT'] == 'No')),
+	("excluding virtual schools", lambda frame, present, subject:
+		frame['SCH_DIND_INSTRUCTIONTYPE'].isin(['A', 'C', 'D'])),
+	(">=20 students", lambda frame, present, subject:
+		(frame[f"3_{subject}_NUMBER_STUDENTS"] >= 20) & (frame[f"5_{subject}_NUMBER_STUDENTS"] >= 20)),
+	("75%-125%", lambda frame, present, subject:
+		(.75*frame[f"3_{subject}_NUMBER_STUDENTS"] < frame[f"5_{subject}_NUMBER_STUDENTS"]) & (frame[f"5_{subject}_NUMBER_STUDENTS"] < 1.25*frame[f"3_{subject}_NUMBER_STUDENTS"]))
+]
+
+# function for converting stateDatasets to one frame with a row per school, in the order of "All", and a column per
+# schema field (NaN where a school lacks the field), plus a boolean frame of which fields each school has
+def columnarFrame (stateDatasets):
+	records = [school for state, data in stateDatasets.items() if state != "All" for school in data]
+
+	# read each field straight from the records' slots
+	columns, present = {}, {}
+	for field, slot in dataImportProcessingARP.slotNames.items():
+		present[field] = np.fromiter(map(hasattr, records, itertools.repeat(slot)), dtype=bool, count=len(records))
+		columns[field] = pd.Series(list(map(getattr, records, itertools.repeat(slot), itertools.repeat(np.nan))), dtype=None if records else np.float64)
+
+	return pd.DataFrame(columns), pd.DataFrame(present)
+
+# function for the funnel of every dataset (each state and "All") and subject; datasetRows maps each dataset,
+# in order, to its number of schools (the frame holds the states' schools one state after another)
+# returns a table of counts per dataset, subject and stage, and each final sample as row indexes into the frame
+def funnel (datasetRows, frame, present):
+	states = [state for state in datasetRows if state != "All"]
+	groups = np.repeat(np.arange(len(states)), [datasetRows[state] for state in states])
+
+	# cumulative stage masks as columns of one matrix: every subject's stages side by side
+	labels = ["n"] + [label for label, stage in funnelStages]
+	masks = {}
+	for subject in subjects:
+		mask = np.ones(len(frame), dtype=bool)
+		masks[(subject, "n")] = mask
+		for label, stage in funnelStages:
+			mask = mask & stage(frame, present, subject).to_numpy(dtype=bool)
+			masks[(subject, label)] = mask
+
+	# counts for every state, subject and stage in one grouped pass; "All" is the sum over states
+	counts = pd.DataFrame(masks).groupby(groups).sum().reindex(range(len(states)), fill_value=0)
+	counts.index = states
+	counts.loc["All"] = counts.sum()
+	table = counts.stack(level=0, future_stack=True)[labels].reindex([(dataset, subject) for dataset in datasetRows for subject in subjects])
+	table.index.names = ["dataset", "subject"]
+
+	# final samples as row indexes, in record order
+	samples = {}
+	for subject in subjects:
+		final = masks[(subject, labels[-1])]
+		samples[("All", subject)] = np.flatnonzero(final)
+		for s, state in enumerate(states):
+			samples[(state, subject)] = np.flatnonzero(final & (groups == s))
+
+	return table, samples
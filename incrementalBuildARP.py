@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+'''This script rebuilds the merged state datasets as a dependency graph of
+   stages (national sources, per-state assessment sources, per-state merge,
+   per-state z scores, and the "All" union), caching every stage's output
+   under a key made from the content hashes of its inputs and the ingestion
+   code, so a republished file only recomputes the stages that depend on it'''
+
+
+# import relevant Python libraries
+import hashlib
+import json
+import os
+import pickle
+
+# import data importing/processing functions, state assessment specs, identifier crosswalk and atomic writes scripted for this ARP
+import dataImportProcessingARP
+import stateAssessmentsARP
+import instrumentationARP
+import valueDecodingARP
+import crosswalkARP
+from atomicWriteARP import atomicWrite
+
+# directory (relative to the data directory) holding cached outputs; shared with the snapshot in dataCacheARP
+cacheDir = ".arp_cache"
+
+# directory holding one pickle per cached stage output, the key of the latest output of every stage, and the memo of input file hashes
+nodesDir = os.path.join(cacheDir, "nodes")
+nodeKeysPath = os.path.join(cacheDir, "nodeKeys.json")
+fileHashesPath = os.path.join(cacheDir, "fileHashes.json")
+
+# bump when a stage's output layout changes so old stage outputs are ignored
+graphVersion = 1
+
+# function for hashing the ingestion code; any change to it invalidates every stage
+def codeHash ():
+	digest = hashlib.sha256(f"graph v{graphVersion}".encode())
+	for sourcePath in [dataImportProcessingARP.__file__, stateAssessmentsARP.__file__, valueDecodingARP.__file__, crosswalkARP.__file__, __file__]:
+		with open(sourcePath, mode="rb") as sourceFile:
+			digest.update(sourceFile.read())
+	return digest.hexdigest()
+
+# function for hashing the contents of the input files
+# hashes are memoized by path, size and mtime so unchanged files are not re-read on every run
+def fileHashes (paths):
+	memo = {}
+	if os.path.exists(fileHashesPath):
+		with open(fileHashesPath) as memoFile:
+			memo = json.load(memoFile)
+
+	hashes = {}
+	for path in paths:
+		stat = os.stat(path)
+		entry = memo.get(path)
+		if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+			digest = hashlib.sha256()
+			with open(path, mode="rb") as inputFile:
+				for block in iter(lambda: inputFile.read(1 << 20), b""):
+					digest.update(block)
+			entry = memo[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+		hashes[path] = entry[2]
+
+	atomicWrite(fileHashesPath, lambda memoFile: json.dump(memo, memoFile))
+
+	return hashes
+
+# function for combining a stage's name and the keys/hashes of its inputs into its cache key
+def nodeKey (name, *inputs):
+	return hashlib.sha256("|".join((name,) + inputs).encode()).hexdigest()
+
+# function for building the stage graph: each node is (name, key, compute, dependencies); a node with no key is not cached
+# parseWorkers > 1 parses the large national files in parallel byte ranges
+def buildGraph (states, code, hashes, parseWorkers=1):
+	# the national index covers every state with a spec and depends only on the national files, so selecting other
+	# states reuses it; each state's merge looks up its own schools in it
+	codes = [spec['state'] for spec in stateAssessmentsARP.stateSpecs.values()]
+	national = ("national", nodeKey("national", code, *[hashes[path] for source in dataImportProcessingARP.nationalFiles for path in dataImportProcessingARP.sourcePaths(source)]),
+		lambda: dataImportProcessingARP.importNational(codes, parseWorkers), [])
+
+	zNodes = []
+	for state in states:
+		spec = stateAssessmentsARP.stateSpecs[state]
+		files = list(dict.fromkeys(test['file'] for test in spec['tests']))
+
+		# the state's parsed assessment files depend only on those files
+		source = (f"source:{state}", nodeKey(f"source:{state}", code, *[hashes[path] for path in files]),
+			lambda spec=spec: dataImportProcessingARP.readAssessments(spec), [])
+
+		# the merged records depend on the national index and the state's assessment results
+		merge = (f"merge:{state}", nodeKey(f"merge:{state}", national[1], source[1]),
+			lambda national, results, state=state: dataImportProcessingARP.mergeState(national, state, results, cacheDir), [national, source])
+
+		zNodes.append((f"zscores:{state}", nodeKey(f"zscores:{state}", merge[1]),
+			dataImportProcessingARP.calculateZScores, [merge]))
+
+	# the union depends on every state's z scores; it only lists their records, so it is rebuilt rather than cached
+	def union (*datasets):
+		stateDatasets = dict(zip(states, datasets))
+		stateDatasets["All"] = [school for data in datasets for school in data]
+		return stateDatasets
+
+	return ("All", None, union, zNodes)
+
+# function for evaluating a node: load its cached output if present, otherwise evaluate its dependencies and compute it
+# nodes whose cached output is found never touch their dependencies
+def evaluate (node, results, report):
+	name, key, compute, dependencies = node
+	if name in results:
+		return results[name]
+	if key is None:
+		results[name] = compute(*[evaluate(dependency, results, report) for dependency in dependencies])
+		return results[name]
+
+	path = os.path.join(nodesDir, key + ".pkl")
+	if os.path.exists(path):
+		with open(path, mode="rb") as nodeFile:
+			value = pickle.load(nodeFile)
+		report[name] = "reused"
+	else:
+		value = compute(*[evaluate(dependency, results, report) for dependency in dependencies])
+		atomicWrite(path, lambda nodeFile: pickle.dump(value, nodeFile, protocol=pickle.HIGHEST_PROTOCOL), mode="wb")
+		report[name] = "recomputed"
+
+	results[name] = value
+	return value
+
+# function for the (name, key) of every cached node of a graph
+def graphKeys (node):
+	name, key, compute, dependencies = node
+	keys = {name: key} if key is not None else {}
+	for dependency in dependencies:
+		keys.update(graphKeys(dependency))
+	return keys
+
+# function for deleting stage outputs left behind by earlier graphs, after a successful build: every stage keeps only
+# the output of its latest key (stages of states outside this build keep theirs), and unrecorded outputs are removed
+def pruneNodes (graph):
+	latest = {}
+	if os.path.exists(nodeKeysPath):
+		with open(nodeKeysPath) as keysFile:
+			latest = json.load(keysFile)
+	latest.update(graphKeys(graph))
+
+	atomicWrite(nodeKeysPath, lambda keysFile: json.dump(latest, keysFile, indent=1))
+
+	kept = {key + ".pkl" for key in latest.values()}
+	for fileName in os.listdir(nodesDir):
+		if fileName not in kept:
+			os.remove(os.path.join(nodesDir, fileName))
+
+# function imported into the data cache: rebuild stateDatasets, recomputing only stages whose inputs changed
+# tracePath writes the spans of the recomputed stages as a JSON trace and prints their summary (verbose prints it
+# without a trace); parseWorkers is passed to the national parse
+def incrementalBuild (states=None, tracePath=None, parseWorkers=1, verbose=False):
+	firstSpan = len(instrumentationARP.spans)
+
+	# states in output order
+	states = dataImportProcessingARP.selectStates(states)
+
+	graph = buildGraph(states, codeHash(), fileHashes(dataImportProcessingARP.inputFiles), parseWorkers)
+	report = {}
+	stateDatasets = evaluate(graph, {}, report)
+	pruneNodes(graph)
+
+	# report reused versus recomputed stages
+	for status in ["reused", "recomputed"]:
+		names = [name for name, nodeStatus in report.items() if nodeStatus == status]
+		print(f"{status} {len(names)} stages:", ", ".join(names) if names else "none")
+	
+	# summarize the spans of the recomputed stages when asked to
+	runSpans = instrumentationARP.spans[firstSpan:]
+	if runSpans:
+		if verbose or tracePath is not None:
+			instrumentationARP.printSummary(runSpans)
+		if tracePath is not None:
+			instrumentationARP.writeTrace(tracePath, runSpans)
+
+	return stateDatasets, report
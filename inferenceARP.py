@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+'''This script runs permutation tests and bootstrap confidence intervals for
+   the difference between 1:1 and non-1:1 schools (mean difference and
+   Hedges' g), resampling whole batches at once as NumPy index matrices,
+   chunked to bound memory, with one seed per chunk so results do not
+   depend on the number of worker processes'''
+
+
+# import relevant Python libraries
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# import the process pool context scripted for this ARP
+from dataImportProcessingARP import poolContext
+
+# largest index matrix built at once (resamples x observations); 4M indexes is 32 MB
+maxCells = 1 << 22
+
+# function for the mean difference and Hedges' g of two samples along the last axis, both second minus first (as the
+# analysis prints the mean difference; pingouin.compute_effsize(first, second) has the opposite sign);
+# works on single samples and on matrices of resampled rows
+def effectSizes (first, second):
+	n1, n2 = first.shape[-1], second.shape[-1]
+	mean1, mean2 = first.mean(axis=-1), second.mean(axis=-1)
+	pooledSD = np.sqrt(((n1 - 1)*first.var(axis=-1, ddof=1) + (n2 - 1)*second.var(axis=-1, ddof=1)) / (n1 + n2 - 2))
+
+	# Cohen's d with the small-sample correction, second minus first
+	with np.errstate(divide='ignore', invalid='ignore'):
+		hedgesG = (mean2 - mean1) / pooledSD * (1 - 3 / (4*(n1 + n2) - 9))
+	return mean2 - mean1, hedgesG
+
+# function run in worker processes: one chunk of resamples of one comparison
+# permutation chunks return how many shuffled mean differences are at least as extreme as the observed one;
+# bootstrap chunks return the resampled mean differences and Hedges' g values
+def resampleChunk (kind, first, second, seedSequence, size):
+	rng = np.random.default_rng(seedSequence)
+	n1, n2 = len(first), len(second)
+
+	if kind == 'permutation':
+		# shuffle group labels: each row is a permutation of the pooled sample, its first n1 entries form the first group
+		pooled = np.concatenate([first, second])
+		permutations = rng.permuted(np.tile(np.arange(n1 + n2), (size, 1)), axis=1)
+		firstSums = pooled[permutations[:, :n1]].sum(axis=1)
+		differences = (pooled.sum() - firstSums)/n2 - firstSums/n1
+		observed = second.mean() - first.mean()
+		return int((np.abs(differences) >= abs(observed) - 1e-12).sum())
+
+	# bootstrap: resample each group with replacement
+	return effectSizes(first[rng.integers(0, n1, (size, n1))], second[rng.integers(0, n2, (size, n2))])
+
+# function for testing every comparison: maps a key (e.g. (state, subject)) to the (first, second) samples and returns,
+# per key, the observed mean difference and Hedges' g (both second minus first, as recorded under 'direction'),
+# the permutation p value, and percentile bootstrap intervals
+# workers > 1 spreads the chunks of every comparison across one process pool; keys limits the comparisons tested
+# to some of them, each resampled exactly as it would be among all of them
+def compareGroups (comparisons, resamples=10000, confidence=0.95, seed=0, workers=1, keys=None):
+
+	# one seed sequence per comparison (in key order), split into one per chunk
+	jobs = []
+	for key, seedSequence in zip(comparisons, np.random.SeedSequence(seed).spawn(len(comparisons))):
+		if keys is not None and key not in keys:
+			continue
+		first, second = (np.asarray(sample, dtype=np.float64) for sample in comparisons[key])
+		if len(first) < 2 or len(second) < 2:
+			continue
+		size = max(1, maxCells // (len(first) + len(second)))
+		chunks = [min(size, resamples - start) for start in range(0, resamples, size)]
+		for kind, kindSeed in zip(['permutation', 'bootstrap'], seedSequence.spawn(2)):
+			jobs.extend((key, kind, first, second, chunkSeed, chunk) for chunkSeed, chunk in zip(kindSeed.spawn(len(chunks)), chunks))
+
+	# run the chunks, serially or across a process pool, keeping their order
+	if workers > 1 and len(jobs) > 1:
+		with ProcessPoolExecutor(max_workers=workers, mp_context=poolContext()) as pool:
+			outputs = list(pool.map(resampleChunk, *zip(*[job[1:] for job in jobs]), chunksize=max(1, len(jobs) // (4*workers))))
+	else:
+		outputs = [resampleChunk(*job[1:]) for job in jobs]
+
+	# gather each comparison's chunks
+	extreme, bootstrap = {}, {}
+	for (key, kind, *_), output in zip(jobs, outputs):
+		if kind == 'permutation':
+			extreme[key] = extreme.get(key, 0) + output
+		else:
+			bootstrap.setdefault(key, []).append(output)
+
+	# observed statistics, p values, and percentile intervals
+	tails = [100*(1 - confidence)/2, 100*(1 + confidence)/2]
+	results = {}
+	for key, (first, second) in comparisons.items():
+		if keys is not None and key not in keys:
+			continue
+		first, second = np.asarray(first, dtype=np.float64), np.asarray(second, dtype=np.float64)
+		result = {'n1': len(first), 'n2': len(second), 'direction': 'second minus first', 'meanDifference': np.nan, 'hedgesG': np.nan, 'permutationP': np.nan,
+			'meanDifferenceCI': (np.nan, np.nan), 'hedgesGCI': (np.nan, np.nan)}
+		if key in extreme:
+			result['meanDifference'], result['hedgesG'] = (float(value) for value in effectSizes(first, second))
+			# add one to both counts so the observed labelling counts as one of the permutations
+			result['permutationP'] = (extreme[key] + 1) / (resamples + 1)
+			differences = np.concatenate([differences for differences, hedgesG in bootstrap[key]])
+			hedgesG = np.concatenate([hedgesG for differences, hedgesG in bootstrap[key]])
+			result['meanDifferenceCI'] = tuple(np.percentile(differences, tails).tolist())
+			result['hedgesGCI'] = tuple(np.nanpercentile(hedgesG, tails).tolist())
+		results[key] = result
+
+	return results
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+'''This script records per-stage spans of the ingestion pipeline (national
+   file parses, state file parses, merges, joins, and z scores) with wall
+   time, CPU time, row counts, and peak memory growth, and writes them as a
+   JSON trace and a summary table'''
+
+
+# import relevant Python libraries
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# the resource module is Unix-only; elsewhere peak memory comes from psutil if it is installed, or is not reported
+try:
+	import resource
+except ImportError:
+	resource = None
+
+# finished spans of this process, in the order they closed
+spans = []
+
+# spans currently open, innermost last; row counts go to the innermost one
+openSpans = []
+
+# function for the process's peak resident set size in MB (ru_maxrss is in KB on Linux, bytes on macOS);
+# with children, the peak of its largest finished child process instead; None where it cannot be measured
+def peakMemory (children=False):
+	if resource is not None:
+		peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+		return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+	# Windows: psutil reports the peak working set of this process only
+	try:
+		import psutil
+	except ImportError:
+		return None
+	if children:
+		return None
+	memory = psutil.Process().memory_info()
+	return getattr(memory, 'peak_wset', memory.rss) / (1 << 20)
+
+# function for the growth between two peak memory readings, None if either is unknown
+def memoryGrowth (before, after):
+	return after - before if before is not None and after is not None else None
+
+# function for formatting a memory figure in MB for the summary tables (blank when unknown)
+def formatMemory (megabytes, width):
+	return f"{megabytes:>{width}.1f}" if megabytes is not None else " " * width
+
+# function for formatting a row count for the summary table (blank for spans without that count)
+def formatCount (rows, width):
+	return f"{rows:>{width}}" if rows is not None else " " * width
+
+# context manager for timing one stage; labels (state, file, source) identify what the stage worked on
+@contextmanager
+def span (stage, **labels):
+	record = {'stage': stage, **labels, 'rowsRead': 0, 'rowsKept': 0, 'rowsMatched': 0}
+	wallStart, cpuStart, peakStart = time.perf_counter(), time.process_time(), peakMemory()
+	openSpans.append(record)
+	try:
+		yield record
+	finally:
+		openSpans.pop()
+		record['wallSeconds'] = time.perf_counter() - wallStart
+		record['cpuSeconds'] = time.process_time() - cpuStart
+		record['peakMemoryGrowthMB'] = memoryGrowth(peakStart, peakMemory())
+		record['pid'] = os.getpid()
+		spans.append(record)
+
+# function for adding row counts to the innermost open span; does nothing outside a span
+# (a span whose rowsMatched is set to None has no matched count and keeps it None)
+def count (rowsRead=0, rowsKept=0, rowsMatched=0):
+	if openSpans:
+		openSpans[-1]['rowsRead'] += rowsRead
+		openSpans[-1]['rowsKept'] += rowsKept
+		if openSpans[-1]['rowsMatched'] is not None:
+			openSpans[-1]['rowsMatched'] += rowsMatched
+
+# function for writing spans to a JSON trace file
+def writeTrace (path, traceSpans):
+	os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+	with open(path, mode="w") as traceFile:
+		json.dump({'created': time.time(), 'spans': traceSpans}, traceFile, indent=1)
+
+# function for printing spans as a table, slowest first, with a total per stage
+def printSummary (traceSpans):
+	print(f"{'stage':<16}{'state':<8}{'file':<52}{'wall s':>9}{'cpu s':>9}{'read':>10}{'kept':>10}{'matched':>10}{'+MB':>8}")
+	for record in sorted(traceSpans, key=lambda record: record['wallSeconds'], reverse=True):
+		label = os.path.basename(record.get('file') or record.get('source') or "")
+		print(f"{record['stage']:<16}{record.get('state') or '':<8}{label[:50]:<52}{record['wallSeconds']:>9.3f}{record['cpuSeconds']:>9.3f}"
+			f"{record['rowsRead']:>10}{record['rowsKept']:>10}{formatCount(record['rowsMatched'], 10)}{formatMemory(record['peakMemoryGrowthMB'], 8)}")
+
+	# totals per stage
+	totals = {}
+	for record in traceSpans:
+		total = totals.setdefault(record['stage'], {'spans': 0, 'wallSeconds': 0.0, 'cpuSeconds': 0.0})
+		total['spans'] += 1
+		total['wallSeconds'] += record['wallSeconds']
+		total['cpuSeconds'] += record['cpuSeconds']
+	for stage, total in totals.items():
+		print(f"total {stage:<18}{total['spans']:>4} spans{total['wallSeconds']:>10.3f} s wall{total['cpuSeconds']:>10.3f} s cpu")
+	if peakMemory() is not None:
+		print(f"peak RSS {peakMemory():.1f} MB")
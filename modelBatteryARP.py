@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+'''This script fits the "All"-state test battery of the analysis (descriptive
+   characteristics, regressions, ANOVA, alternate thresholds, and the
+   hierarchical linear model) as independent jobs, optionally across a
+   process pool whose workers receive the filtered frames once, and returns
+   each job's printed output in the battery's order; model fits go through
+   the memoized result store'''
+
+
+# import relevant Python libraries
+import contextlib
+import io
+import os
+import numpy as np
+import pingouin as pg
+from concurrent.futures import ProcessPoolExecutor
+
+# import the process pool context, column store, threshold sweep, and memoized model fits scripted for this ARP
+from dataImportProcessingARP import poolContext
+import columnStoreARP
+import thresholdSweepARP
+import resultStoreARP
+
+# tests run on the "All" data, in output order; each is run for both subjects
+battery = ['Descriptive Characteristics', 'Multiple Linear Regression', 'RATIO_DEVICES_TO_ENROLLMENT',
+	'TITLE1ELIG', "3_ENG_ZSCORE", "3_MATH_ZSCORE", "pctBlack", "pctHispanic",
+	"DISTRICT_POVERTY_PERCENTAGE", "Alternate Thresholds", "Hierarchical Linear Model"]
+
+# filtered "All" frames by subject, set once per worker process by the pool initializer
+sharedFrames = None
+
+# function for listing the battery's jobs in order (optionally only some tests and subjects),
+# skipping 3_MATH_ZSCORE with ENG and 3_ENG_ZSCORE with MATH
+def batteryJobs (tests=None, subjects=None):
+	return [(test, subject) for test in battery for subject in ['MATH', 'ENG']
+		if (tests is None or test in tests) and (subjects is None or subject in subjects)
+		and not (test == '3_MATH_ZSCORE' and subject == 'ENG') and not (test == '3_ENG_ZSCORE' and subject == 'MATH')]
+
+# function for adding the demographic/1:1 columns the battery uses to one subject's filtered "All" frame
+def batteryFrame (filteredData):
+	filteredData['OneToOne'] = filteredData['RATIO_DEVICES_TO_ENROLLMENT'].apply(
+		lambda x: 1 if x is not None and x >= 0.90
+			else 0 if x is not None and x <= 0.5
+			else None
+		)
+	filteredData['pctBlack'] = filteredData['TOTAL_ENROLLMENT_BLACK'] / filteredData['TOTAL_ENROLLMENT']
+	filteredData['pctHispanic'] = filteredData['TOTAL_ENROLLMENT_HISPANIC'] / filteredData['TOTAL_ENROLLMENT']
+	return filteredData
+
+# function for building the filtered frames from the memory-mapped column store, given each subject's rows of the "All" sample
+def storeFrames (rows):
+	store = columnStoreARP.openStore()
+	return {subject: batteryFrame(columnStoreARP.storeFrame(store, rows=subjectRows)[0]) for subject, subjectRows in rows.items()}
+
+# function run once in each worker process to receive the filtered frames
+def setFrames (dfFiltered):
+	global sharedFrames
+	sharedFrames = dfFiltered
+
+# function run once in each worker process to build the filtered frames from the column store
+# (pages are read zero-copy and shared through the OS cache rather than pickled to every worker)
+def openFrames (rows):
+	setFrames(storeFrames(rows))
+
+# function run in worker processes: one test for one subject on the shared frames, returning what it printed,
+# the result store records of the models it fitted, and the table fitTest returned (if any)
+def runJob (test, subject):
+	resultStoreARP.takeRecords()
+	output = io.StringIO()
+	with contextlib.redirect_stdout(output):
+		table = fitTest(test, subject, sharedFrames)
+	return output.getvalue(), [{'test': test, 'subject': subject, **record} for record in resultStoreARP.takeRecords()], table
+
+# function for running the battery on dfFiltered (the filtered "All" frames by subject, with the batteryFrame columns)
+# or on rows (each subject's rows of the "All" sample in the column store), serially or across a process pool;
+# with rows, each worker opens the column store itself instead of receiving the frames
+# returns the printed output of every job, in the battery's order, and writes the fitted models' records to resultsPath;
+# sweepDir saves each subject's 0.01-step alternate threshold sweep there as {subject}_threshold_sweep.csv
+def runBattery (dfFiltered=None, workers=1, resultsPath=None, tests=None, subjects=None, rows=None, sweepDir=None):
+	jobs = batteryJobs(tests, subjects)
+	if workers > 1 and len(jobs) > 1:
+		initializer, initargs = (setFrames, (dfFiltered,)) if rows is None else (openFrames, (rows,))
+		with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=poolContext(), initializer=initializer, initargs=initargs) as pool:
+			# submit the slowest models first so they start immediately
+			bySlowest = sorted(jobs, key=lambda job: job[0] != "Hierarchical Linear Model")
+			futures = {job: pool.submit(runJob, *job) for job in bySlowest}
+			results = [futures[job].result() for job in jobs]
+	else:
+		setFrames(storeFrames(rows) if dfFiltered is None else dfFiltered)
+		try:
+			results = [runJob(*job) for job in jobs]
+		finally:
+			setFrames(None)
+	
+	# models fitted versus loaded from the result store
+	records = [record for output, jobRecords, table in results for record in jobRecords]
+	cached = sum(record['cached'] for record in records)
+	print(f"model fits: {len(records) - cached} fitted, {cached} loaded from {resultStoreARP.resultsDir}")
+	if resultsPath is not None:
+		resultStoreARP.writeResults(resultsPath, records)
+	
+	# threshold sweeps, written by this process only
+	if sweepDir is not None:
+		os.makedirs(sweepDir, exist_ok=True)
+		for (test, subject), (output, jobRecords, table) in zip(jobs, results):
+			if table is not None:
+				path = os.path.join(sweepDir, f"{subject}_threshold_sweep.csv")
+				table.to_csv(path, index=False)
+				print(f"saved the 0.01-step threshold sweep for {subject} to {path}")
+	
+	return [output for output, jobRecords, table in results]
+
+# function for fitting one test of the battery for one subject and printing its results
+# returns the 0.01-step threshold sweep table for "Alternate Thresholds", otherwise None
+def fitTest (test, subject, dfFiltered):
+	if test == "Descriptive Characteristics":
+		# printing various descriptive characteristics for 1:1 and non-1:1
+		print(f"\n{subject} descriptive characteristics:\n")
+		for label, value in [("One To One", 1), ("Not One To One", 0)]:
+			baselineData = dfFiltered[subject][dfFiltered[subject]['OneToOne'] == value]
+			print(f"{label}:")
+			print(f"n: {len(baselineData)}")
+			print(f"mean pctBlack: {baselineData['pctBlack'].mean(skipna=True)}")
+			print(f"mean pctHispanic: {baselineData['pctHispanic'].mean(skipna=True)}")
+			print(f"fifth-grade {subject} test takers: {baselineData[f'5_{subject}_NUMBER_STUDENTS'].mean(skipna=True)}")
+			print(f"third-grade {subject} z score: {baselineData[f'3_{subject}_ZSCORE'].mean(skipna=True)}")
+			print(f"fifth-grade {subject} z score: {baselineData[f'5_{subject}_ZSCORE'].mean(skipna=True)}")
+			print(f"{subject} z score change: {baselineData[f'{subject}_ZSCORE_CHANGE'].mean(skipna=True)}")
+			print(f"mean district poverty percentage: {baselineData['DISTRICT_POVERTY_PERCENTAGE'].mean(skipna=True)}")
+			print(f"percentage Title I elig.: {baselineData['TITLE1ELIG'].mean(skipna=True)}")
+			print()
+			
+	# run multiple linear regression
+	elif test == "Multiple Linear Regression":
+		
+		# filter data
+		dfTesting = dfFiltered[subject][
+			dfFiltered[subject]['OneToOne'].notna() &
+			dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna() &
+			dfFiltered[subject]['pctBlack'].notna() &
+			dfFiltered[subject]['pctHispanic'].notna() &
+			dfFiltered[subject]['DISTRICT_POVERTY_PERCENTAGE'].notna()
+		]
+		
+		# create OLS model and print summary results
+		formula = f"""{subject}_ZSCORE_CHANGE ~ C(OneToOne) + pctBlack + pctHispanic + DISTRICT_POVERTY_PERCENTAGE + Q("3_{subject}_ZSCORE")"""
+		fit = resultStoreARP.fitModel('ols', formula, dfTesting)
+		
+		print("\n-------")
+		print(f"\nMultiple linear regression for {subject}_ZSCORE_CHANGE:\n")
+		print(fit['printed'], "\n")
+		
+	# linear regression on all schools, including ones with ratios between 1:1 and non-1:1	
+	elif test == "RATIO_DEVICES_TO_ENROLLMENT":
+		
+		# filter data
+		dfTesting = dfFiltered[subject][
+			dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'].notna() &
+			dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna()
+		]
+		
+		# create OLS model and print summary results
+		formula = f'Q("{subject}_ZSCORE_CHANGE") ~ Q("RATIO_DEVICES_TO_ENROLLMENT")'
+		fit = resultStoreARP.fitModel('ols', formula, dfTesting)
+		
+		print("\n-------")
+		print(f"Linear regression for the effect of RATIO_DEVICES_TO_ENROLLMENT on {subject}_ZSCORE_CHANGE:\n")
+		print(fit['printed'], '\n')
+		
+		# additional linear regression on schools where RATIO_DEVICES_TO_ENROLLMENT <= .5
+		# filter data
+		dfTesting = dfFiltered[subject][
+			dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'].notna() &
+			(dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'] <= 0.5) &
+			dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna()
+		]
+		
+		# create OLS model and print summary results
+		formula = f'Q("{subject}_ZSCORE_CHANGE") ~ Q("RATIO_DEVICES_TO_ENROLLMENT")'
+		fit = resultStoreARP.fitModel('ols', formula, dfTesting)
+		
+		print("\n-------")
+		print(f"Linear regression for the effect of RATIO_DEVICES_TO_ENROLLMENT on {subject}_ZSCORE_CHANGE, only on schools where RATIO_DEVICES_TO_ENROLLMENT <= .5:\n")
+		print(fit['printed'], '\n')
+	
+	# run t-tests with various threshold combinations
+	elif test == "Alternate Thresholds":
+		
+		print("\n-------")
+		print(f"\nAlternate Threshold Analysis for {subject}:")
+		
+		# define threshold combos
+		thresholds = [(0.4, 0.85), (0.4, 0.9), (0.4, 0.95), (0.5, 0.85), (0.5, 0.9), (0.5, 0.95), (0.6, 0.85), (0.6, 0.9), (0.6, 0.95)]
+		
+		for non1to1Threshold, yes1to1Threshold in thresholds:
+			
+			# filter at current threshold
+			not1to1DataAlt = dfFiltered[subject][dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'] <= non1to1Threshold][subject + '_ZSCORE_CHANGE'].dropna().values
+				
+			yes1to1DataAlt = dfFiltered[subject][dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'] >= yes1to1Threshold][subject + '_ZSCORE_CHANGE'].dropna().values
+			
+			# perform and print t test
+			result = pg.ttest(np.array(not1to1DataAlt), np.array(yes1to1DataAlt), paired=False, correction='auto', alternative='two-sided')
+			print(f"\n-------\nNon-1:1: <= {non1to1Threshold}, 1:1: >= {yes1to1Threshold}\n")
+			print(result, "\n")
+			
+			# calculate/print sample sizes, means, and SDs for 1:1/non-1:1
+			n1 = len(not1to1DataAlt)
+			n2 = len(yes1to1DataAlt)
+			mean1 = np.mean(not1to1DataAlt)
+			mean2 = np.mean(yes1to1DataAlt)
+			sd1 = np.std(not1to1DataAlt, ddof=1)
+			sd2 = np.std(yes1to1DataAlt, ddof=1)
+				
+			print(f"Not 1:1 Access: n={n1}, M={mean1:.3f}, SD={sd1:.3f}")
+			print(f"1:1 Access: n={n2}, M={mean2:.3f}, SD={sd2:.3f}")
+			print(f"Mean Difference: {mean2-mean1:.3f}")
+		
+		# sweep every threshold combo on a 0.01 grid from one sort of the schools by RATIO_DEVICES_TO_ENROLLMENT (for heatmaps)
+		grid = np.round(np.arange(101) / 100, 2)
+		ratios = dfFiltered[subject]['RATIO_DEVICES_TO_ENROLLMENT'].to_numpy(dtype=float)
+		changes = dfFiltered[subject][subject + '_ZSCORE_CHANGE'].to_numpy(dtype=float)
+		return thresholdSweepARP.sweepTable(thresholdSweepARP.thresholdSweep(ratios, changes, grid, grid))
+	
+	# run HLM
+	elif test == "Hierarchical Linear Model":
+		
+		# filter data
+		dfTesting = dfFiltered[subject][
+			dfFiltered[subject]['OneToOne'].notna() &
+			dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna() &
+			dfFiltered[subject]['pctBlack'].notna() &
+			dfFiltered[subject]['pctHispanic'].notna() &
+			dfFiltered[subject]['DISTRICT_POVERTY_PERCENTAGE'].notna() &
+			dfFiltered[subject][f'3_{subject}_ZSCORE'].notna() &
+			dfFiltered[subject]['LEA_STATE'].notna()
+		]
+		
+		# create HLM/Mixed LM model and print summary results
+		formula = f'Q("{subject}_ZSCORE_CHANGE") ~ OneToOne + pctBlack + pctHispanic + DISTRICT_POVERTY_PERCENTAGE + Q("3_{subject}_ZSCORE")'
+		fit = resultStoreARP.fitModel('mixedlm', formula, dfTesting, groups='LEA_STATE', re_formula="1", reml=True)
+		
+		print("\n-------")
+		print(f"HLM Random Intercept for {subject}_ZSCORE_CHANGE:\n")
+		print(fit['printed'], '\n')
+		
+		# calculate random/residual and print results
+		tau00  = float(fit['fit']['covRE'][0][0])
+		sigma2 = float(fit['fit']['scale'])
+		icc    = tau00 / (tau00 + sigma2)
+
+		print("\nRandom/Residual:")
+		print(f"  State intercept variance (tau_00): {tau00:.3f}")
+		print(f"  Residual variance (sigma^2):       {sigma2:.3f}")
+		print(f"  ICC (rho):                         {icc:.3f}\n")
+		
+	else:
+		
+		# for all other tests, use the test name to filter data
+		dfTesting = dfFiltered[subject][
+			dfFiltered[subject]['OneToOne'].notna() &
+			dfFiltered[subject][f'{subject}_ZSCORE_CHANGE'].notna() &
+			dfFiltered[subject][test].notna()
+		]
+		
+		# run ANOVA for TITLE1ELIG because everything's categorical
+		if test == "TITLE1ELIG":
+			#run AVOVA test and print summary results
+			formula = f'{subject}_ZSCORE_CHANGE ~ C(OneToOne) + C({test}) + C(OneToOne):C({test})'
+			anova_table = resultStoreARP.fitModel('anova', formula, dfTesting, typ=2)
+			
+			print("\n-------")
+			print(f"ANOVA test for effect of OneToOne, {test}, and their interaction on {subject}_ZSCORE_CHANGE:\n")
+			print(anova_table['printed'], '\n')
+			print(f"\nn: {len(dfTesting)}")
+			
+		# otherwise run linear regression
+		else:
+			# create OLS model and print summary results
+			formula = f'Q("{subject}_ZSCORE_CHANGE") ~ C(OneToOne) + Q("{test}") + C(OneToOne):Q("{test}")'
+			fit = resultStoreARP.fitModel('ols', formula, dfTesting)
+			
+			print("\n-------")
+			print(f"Linear regression for the effect of OneToOne, {test}, and their interaction on {subject}_ZSCORE_CHANGE:\n")
+			print(fit['printed'], '\n')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+'''This script fits the analysis models (OLS, type-2 ANOVA, and mixed linear
+   models) through a memo keyed by a hash of the filtered input frame, the
+   formula, and the fit options, storing each fit as a JSON record of
+   coefficients, standard errors, p values, n, fit statistics, and the
+   printed summary, so re-running the analysis only refits models whose
+   data or specification changed'''
+
+
+# import relevant Python libraries
+import hashlib
+import json
+import os
+import pandas as pd
+import statsmodels
+import statsmodels.api as sm
+import statsmodels.formula.api as smf
+
+# import the cache directory and atomic writes scripted for this ARP
+from incrementalBuildARP import cacheDir
+from atomicWriteARP import atomicWrite
+
+# directory (relative to the data directory) holding one JSON record per memoized fit
+resultsDir = os.path.join(cacheDir, "results")
+
+# bump when a record's layout or a fit's options change meaning so old records are ignored
+storeVersion = 1
+
+# records fitted or loaded by this process since the last takeRecords call, in order
+records = []
+
+# function for hashing a frame's columns, types, and values
+def frameHash (data):
+	digest = hashlib.sha256(json.dumps([[str(column), str(dtype)] for column, dtype in data.dtypes.items()]).encode())
+	digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+	return digest.hexdigest()
+
+# function for the memo key of a fit: the data, the model kind, formula and options, and the statsmodels version
+def fitKey (kind, formula, data, options):
+	specification = json.dumps([storeVersion, statsmodels.__version__, kind, formula, options], sort_keys=True)
+	return hashlib.sha256((frameHash(data) + specification).encode()).hexdigest()
+
+# function for fitting a model and reducing it to a JSON-ready record
+def fitRecord (kind, formula, data, options):
+	if kind == 'mixedlm':
+		model = smf.mixedlm(formula, data=data, groups=data[options['groups']], re_formula=options['re_formula']).fit(reml=options['reml'])
+	else:
+		model = smf.ols(formula, data=data).fit()
+
+	record = {'kind': kind, 'formula': formula, 'options': options, 'n': int(model.nobs),
+		'params': model.params.to_dict(), 'bse': model.bse.to_dict(), 'pvalues': model.pvalues.to_dict()}
+
+	# fit statistics and the printed results
+	if kind == 'mixedlm':
+		record['fit'] = {'llf': model.llf, 'scale': float(model.scale), 'covRE': model.cov_re.to_numpy().tolist(), 'converged': bool(model.converged)}
+	else:
+		record['fit'] = {'rsquared': model.rsquared, 'rsquaredAdj': model.rsquared_adj, 'fvalue': model.fvalue, 'fPvalue': model.f_pvalue,
+			'aic': model.aic, 'bic': model.bic, 'llf': model.llf, 'dfModel': model.df_model, 'dfResid': model.df_resid}
+	if kind == 'anova':
+		table = sm.stats.anova_lm(model, typ=options['typ'])
+		record['anova'] = table.to_dict(orient='index')
+		record['printed'] = str(table)
+	else:
+		record['printed'] = str(model.summary())
+	return record
+
+# function for fitting a model through the memo: kind is 'ols', 'anova' (options: typ) or 'mixedlm'
+# (options: groups column, re_formula, reml); returns the record, from the store when this fit was done before
+def fitModel (kind, formula, data, **options):
+	key = fitKey(kind, formula, data, options)
+	path = os.path.join(resultsDir, key + ".json")
+
+	if os.path.exists(path):
+		with open(path) as recordFile:
+			record = json.load(recordFile)
+		record['cached'] = True
+	else:
+		record = fitRecord(kind, formula, data, options)
+		atomicWrite(path, lambda recordFile: json.dump(record, recordFile, indent=1))
+		record['cached'] = False
+
+	record['key'] = key
+	records.append(record)
+	return record
+
+# function for taking (and clearing) the records fitted or loaded by this process
+def takeRecords ():
+	taken = records[:]
+	records.clear()
+	return taken
+
+# function for writing a run's records, labelled by test and subject, to one JSON file
+def writeResults (path, labelledRecords):
+	atomicWrite(path, lambda resultsFile: json.dump(labelledRecords, resultsFile, indent=1))
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+'''This script declares how each state's assessment files are read and
+   merged into the CRDC/CCD school records by dataImportProcessingARP:
+   which file, which rows, how rows are keyed to schools, and how the
+   number of students tested and pass rate are derived from a row'''
+
+
+# import relevant Python libraries
+import re
+import numpy as np
+
+# import the bulk value decoder scripted for this ARP
+from valueDecodingARP import decodeValues, decodeRequired, VALUE
+
+# Each state spec has:
+#   'state':   postal code used to select the state's schools from the CRDC
+#   'join':    school field (or function of a school) that assessment keys are matched against
+#   'derived': optional fields computed on every school before joining
+#   Join keys and derived fields may use only a school's COMBOKEY and ST_SCHID: they are computed once
+#   into crosswalkARP's per-state crosswalk rather than on every run.
+#   'pivot':   optional; long-format files are first pivoted to wide rows grouped on the 'by'
+#              columns, with one column per 'indicator' holding that indicator's 'value'
+#   'tests':   one entry per output; each has the assessment 'file', a row 'filter', the row 'key',
+#              and 'fields' mapping output variables to functions of the list of matched rows that
+#              return an array with one value per row (int64 arrays give ints, float64 arrays floats).
+#              An optional 'keep' function of the matched rows returns a mask of the rows to keep.
+# Within a test the last row with a given key wins, and every file is read once per state no
+# matter how many tests use it.
+
+# function for a column's cells across the matched rows
+def cells (rows, column):
+	return [row.get(column) for row in rows]
+
+# functions for building field functions from column names; rules are valueDecodingARP rules for the column's format
+def integer (column, rules=None):
+	def decode (rows):
+		numbers = decodeRequired(cells(rows, column), column, rules)
+		if (numbers != np.floor(numbers)).any():
+			raise ValueError(f"{column}: non-integer counts")
+		return numbers.astype(np.int64)
+	return decode
+
+def number (column, rules=None):
+	return lambda rows: decodeRequired(cells(rows, column), column, rules)
+
+def percent (column):
+	# cut % sign
+	return number(column, {'percent': True})
+
+def total (*fields):
+	# fields added left to right, as the published percentages were summed by hand
+	def add (rows):
+		values = fields[0](rows)
+		for field in fields[1:]:
+			values = values + field(rows)
+		return values
+	return add
+
+# Alabama: derive proficiency by priority: (1) 'Proficient Rate' if present; else (2) Level3 + Level4; else (3) 100 - (Level1 + Level2)
+# returns the rates and a mask of the rows that have any of them (rows without one are not kept)
+def alProficientRates (rows):
+	rate, rateReasons = decodeValues(cells(rows, 'Proficient Rate'))
+	levels = [decodeValues(cells(rows, f"Level {level} %")) for level in range(1, 5)]
+	hasRate = rateReasons == VALUE
+	hasUpper = (levels[2][1] == VALUE) & (levels[3][1] == VALUE)
+	hasLower = (levels[0][1] == VALUE) & (levels[1][1] == VALUE)
+	rates = np.where(hasRate, rate, np.where(hasUpper, levels[2][0] + levels[3][0], 100 - levels[0][0] - levels[1][0]))
+	return rates, hasRate | hasUpper | hasLower
+
+# Alabama: tested count: use Tested when available; otherwise fall back to 'Enrolled' - 10
+def alTested (rows):
+	tested, testedReasons = decodeValues(cells(rows, 'Tested'))
+	enrolled = np.trunc(decodeRequired(cells(rows, 'Enrolled'), 'Enrolled'))
+	return np.where(testedReasons == VALUE, np.trunc(tested), enrolled - 10).astype(np.int64)
+
+def alTest (file, subject, grade, subjectVar):
+	return {'file': file, 'key': lambda row: f"0{row['COMBOKEY']}",
+		'filter': lambda row: row.get('Enrolled') != '*' and row.get("Subject") == subject, #exclude those with no data provided
+		'keep': lambda rows: alProficientRates(rows)[1],
+		'fields': {f"{grade}_{subjectVar}_NUMBER_STUDENTS": alTested, f"{grade}_{subjectVar}_PASS": lambda rows: alProficientRates(rows)[0]}}
+
+# Arkansas: ELA and math results share a row
+def arTest (file, grade, gradeNumber):
+	return {'file': file,
+		# key on "AR-{District LEA}-{School LEA}" to align with CCD ST_SCHID
+		'key': lambda row: f"AR-{row['District LEA']}-{row['School LEA']}",
+		'filter': lambda row: (row.get('Grade') == grade or row.get('Grade Level') == grade)
+			and row.get('English N') != 'N<10', #exclude those with no data provided
+		'fields': {f"{gradeNumber}_ENG_NUMBER_STUDENTS": integer('English N'), f"{gradeNumber}_ENG_PASS": percent('English % Met Readiness Benchmark'),
+			f"{gradeNumber}_MATH_NUMBER_STUDENTS": integer('Math N'), f"{gradeNumber}_MATH_PASS": percent('Math % Met Readiness Benchmark')}}
+
+def gaTest (file, subject, grade, prefix):
+	return {'file': file,
+		# key "GA-{SCHOOL_DISTRCT_CD}-{INSTN_NUMBER.zfill(4)}" to match CCD ST_SCHID format
+		'key': lambda row: f"GA-{row['SCHOOL_DISTRCT_CD']}-{row['INSTN_NUMBER'].zfill(4)}",
+		# N < 10 excluded by GA
+		'filter': lambda row: row.get('NUM_TESTED_CNT') != 'TFS'
+			and row.get('SUBGROUP_NAME') == "All Students"
+			and row.get('TEST_CMPNT_TYP_NM') == subject
+			and (row.get('ACDMC_LVL') == grade or row.get('ACDMC_LVL') == grade[1:]),
+		'fields': {f"{prefix}_NUMBER_STUDENTS": integer('NUM_TESTED_CNT'), f"{prefix}_PASS": total(number('PROFICIENT_PCT'), number('DISTINGUISHED_PCT'))}}
+
+def inTest (file, testedNo, proficient, prefix):
+	return {'file': file,
+		# key on "IN-{Corp ID}-{School ID}" to align with CCD ST_SCHID
+		'key': lambda row: f"IN-{row['Corp ID']}-{row['School ID']}",
+		# N < 10 excluded by IN
+		'filter': lambda row: row.get(proficient) != '***' and row.get(proficient) != '',
+		'fields': {f"{prefix}_NUMBER_STUDENTS": integer(testedNo), f"{prefix}_PASS": percent(proficient)}}
+
+# Iowa and South Dakota results come from the same Zelma EDC layout
+def edcTest (file, grade, subject, prefix, key, excluded):
+	return {'file': file, 'key': key,
+		'filter': lambda row: (row.get('GradeLevel') == grade)
+			and row.get('StudentGroup') == 'All Students'
+			and row.get('DataLevel') == 'School'
+			and row.get('Subject') == subject
+			and row.get('StudentSubGroup_TotalTested') != '*'
+			and row.get('ProficientOrAbove_percent') not in excluded, #exclude those with no data provided
+		'fields': {f"{prefix}_NUMBER_STUDENTS": integer('StudentSubGroup_TotalTested'), f"{prefix}_PASS": number('ProficientOrAbove_percent')}}
+
+def iaKey (row):
+	return f"IA-**{str(row['StateAssignedDistID']).zfill(4)} 000-**{str(row['StateAssignedDistID']).zfill(4)} {row['StateAssignedSchID'][-3:]}"
+
+# Iowa publishes state school IDs with the county digits masked
+def iaMaskedSchoolID (school):
+	if 'ST_SCHID' in school:
+		return re.sub(r'(\d{2})(\d{4})', r'**\2', school['ST_SCHID'])
+
+# Louisiana: "≤1" results are counted as 0
+laRules = {'fixed': {"≤1": 0}}
+
+def laLevel (column):
+	return integer(column, laRules)
+
+# tested counts are published with a leading space, which the decoder strips
+laTested = integer('Total Students Tested in at Least One Subject', laRules)
+
+def laTest (file, grade):
+	return {'file': file,
+		'key': lambda row: f"LA-{row['Site Code'][:3]}-{row['Site Code']}",
+		'filter': lambda row: row.get('Total Students Tested in at Least One Subject') != '<10'
+			and row.get('ELA M') != 'NR'
+			and row.get('ELA A') != 'NR', #exclude those with no data provided
+		'fields': {f"{grade}_ENG_NUMBER_STUDENTS": laTested, f"{grade}_ENG_PASS": total(laLevel('ELA A'), laLevel('ELA M')),
+			f"{grade}_MATH_NUMBER_STUDENTS": laTested, f"{grade}_MATH_PASS": total(laLevel('Math A'), laLevel('Math M'))}}
+
+# Mississippi: one file, both years; proficiency = Level 3 + 4 + 5
+# test-taker counts are published as floats, e.g. "42.0"
+def msTested (column):
+	return lambda rows: np.trunc(number(f"{column} Test-Takers")(rows)).astype(np.int64)
+
+def msPass (column):
+	return total(percent(f"{column} Level 3 (PCT)"), percent(f"{column} Level 4 (PCT)"), percent(f"{column} Level 5 (PCT)"))
+
+def msFields ():
+	fields = {}
+	for prefix, column in [['3_ENG', 'ELA 2019'], ['3_MATH', 'Math 2019'], ['5_ENG', '2021 ELA'], ['5_MATH', '2021 Math']]:
+		fields[f"{prefix}_NUMBER_STUDENTS"] = msTested(column)
+		fields[f"{prefix}_PASS"] = msPass(column)
+	return fields
+
+def neTest (file, schoolYear, grade, prefix):
+	return {'file': file,
+		# key "NE-{County}{District}000-{County}{District}{School}" matches CCD ST_SCHID
+		'key': lambda row: f"NE-{row['County']}{row['District']}000-{row['County']}{row['District']}{row['School']}",
+		'filter': lambda row: row.get('Proficient Pct') != '-1'
+			and row.get('Advanced Pct') != '-1' #exclude those with no data provided
+			and row.get('Category') == "All Students"
+			and row.get('School Year') == schoolYear
+			and row.get('Grade') == grade,
+		'fields': {f"{prefix}_NUMBER_STUDENTS": integer('Student Count'), f"{prefix}_PASS": total(number('Proficient Pct'), number('Advanced Pct'))}}
+
+def scTest (file, grade, gradeNumber):
+	return {'file': file,
+		'key': lambda row: f"SC-{row['schoolid'][:4]}-{row['schoolid'][4:]}",
+		'filter': lambda row: (row.get('testgrade') == grade)
+			and row.get('demoID') == '01ALL'
+			and row.get('ELAN') != ''
+			and row.get('ELApct34') != ''
+			and row.get('MathN') != ''
+			and row.get('Mathpct34') != '', #exclude those with no data provided
+		'fields': {f"{gradeNumber}_ENG_NUMBER_STUDENTS": integer('ELAN'), f"{gradeNumber}_ENG_PASS": number('ELApct34'),
+			f"{gradeNumber}_MATH_NUMBER_STUDENTS": integer('MathN'), f"{gradeNumber}_MATH_PASS": number('Mathpct34')}}
+
+def txTest (file, testType, prefix):
+	return {'file': file,
+		'key': lambda row: f"TX-{row['ID/CDC'][:-3]}-{row['ID/CDC']}",
+		'filter': lambda row: row.get(testType + '|Performance Levels|Meets and Above|Percentage') != ''
+			and row.get(testType + '|Tests Taken') != '' #exclude those with no data provided
+			and row.get('Student Group') == "All Students",
+		'fields': {f"{prefix}_NUMBER_STUDENTS": integer(testType + '|Tests Taken'), f"{prefix}_PASS": number(testType + '|Performance Levels|Meets and Above|Percentage')}}
+
+# Utah and Wyoming: if a range for percent proficient/advanced, average the smallest and largest;
+# "<=N%" and ">=N%" are the midpoints of 0-N and N-100
+def rangedPercent (column):
+	return number(column, {'percent': True, 'bounds': True, 'ranges': True})
+
+# COMBOKEY added to the Utah and Wyoming CSVs via VLOOKUP and manually
+def utTest (schoolYear, testType, grade, prefix):
+	return {'file': 'UT/UT-all-COMBOKEY.csv', 'key': lambda row: row['Combokey'],
+		'filter': lambda row: row.get('Percent Proficient') != 'N<10' # exclude those with no data provided
+			and row['School Year'] == schoolYear and row['Grade'] == grade and row['Subject'] == testType,
+		'fields': {f"{prefix}_NUMBER_STUDENTS": integer('Number Students'), f"{prefix}_PASS": rangedPercent('Percent Proficient')}}
+
+# Wyoming: average the smallest and largest values from the range for number of students; as in the original
+# analysis, the dash-separated values are summed and halved, so a count published as a single number is halved too
+def wyTested (rows):
+	counts = cells(rows, 'NUMBER OF STUDENTS TESTED')
+	numbers = decodeRequired(counts, 'NUMBER OF STUDENTS TESTED', {'ranges': True})
+	single = np.array(['-' not in count.strip() for count in counts], dtype=bool)
+	return np.where(single, numbers / 2, numbers)
+
+def wyTest (schoolYear, testType, grade, prefix):
+	return {'file': 'WY/WY-all-COMBOKEY.csv', 'key': lambda row: row['COMBOKEY'],
+		'filter': lambda row: row.get('PERCENT PROFICIENT ADVANCED') != '.' # exclude those with no data provided
+			and row['SCHOOL YEAR'] == schoolYear and row['GRADE'] == str(grade) and row['SUBJECT'] == testType,
+		'fields': {f"{prefix}_NUMBER_STUDENTS": wyTested,
+			f"{prefix}_PASS": rangedPercent('PERCENT PROFICIENT ADVANCED')}}
+
+# Vermont: make shorter ST_SCHID for VT, e.g. VT-T151-PS223 to VT-PS223
+def vtShortSchoolID (school):
+	if 'ST_SCHID' in school:
+		return re.sub(r"^(\w+)-\w+-(\w+)$", r"\1-\2", school['ST_SCHID'])
+
+# Vermont: results are published one indicator per row, so files are pivoted to one row per
+# organization x test x group with a column per indicator (see 'pivot' in the Vermont spec)
+def vtTest (file, subject, prefix):
+	return {'file': file, 'key': lambda row: f"VT-{row['OrganizationIdentifer']}",
+		'filter': lambda row: row.get('TestName') == subject and row.get('AssessGroup') == "All Students"
+			and "Total Proficient and Above" in row,
+		'fields': {f"{prefix}_NUMBER_STUDENTS": number("Number of Students Tested"),
+			f"{prefix}_PASS": number("Total Proficient and Above")}}
+
+# state specs in output order
+stateSpecs = {
+	# exported from https://www.alabamaachieves.org/reports-data/school-performance/
+	"Alabama": {'state': 'AL', 'join': 'COMBOKEY', 'tests': [
+		alTest('AL/AL-2019-COMBOKEY.csv', 'Reading', 3, 'ENG'),
+		alTest('AL/AL-2019-COMBOKEY.csv', 'Math', 3, 'MATH'),
+		alTest('AL/AL-2021-COMBOKEY.csv', 'ELA', 5, 'ENG'),
+		alTest('AL/AL-2021-COMBOKEY.csv', 'Math', 5, 'MATH')
+	]},
+	# exported from https://dese.ade.arkansas.gov/Offices/public-school-accountability/assessment-test-scores
+	"Arkansas": {'state': 'AR', 'join': 'ST_SCHID', 'tests': [
+		arTest('AR/20201203132354_ACT_Aspire_Summary_10052020.csv', '03', 3),
+		arTest('AR/ACT_Aspire_Summary_Post_Appeals_Spring_2021_20210930124157.csv', '05', 5)
+	]},
+	# exported from https://gosa.georgia.gov/dashboards-data-report-card/downloadable-data
+	"Georgia": {'state': 'GA', 'join': 'ST_SCHID', 'tests': [
+		gaTest('GA/EOG_2019_By_Grad_FEB_24_2020.csv', 'English Language Arts', '03', '3_ENG'),
+		gaTest('GA/EOG_2019_By_Grad_FEB_24_2020.csv', 'Mathematics', '03', '3_MATH'),
+		gaTest('GA/EOG_2021_by_grade_March_7_2022.csv', 'English Language Arts', '05', '5_ENG'),
+		gaTest('GA/EOG_2021_by_grade_March_7_2022.csv', 'Mathematics', '05', '5_MATH')
+	]},
+	# exported from https://www.in.gov/doe/it/data-center-and-reports/data-reports-archive
+	"Indiana": {'state': 'IN', 'join': 'ST_SCHID', 'tests': [
+		inTest('IN/ilearn-2019-grade3-8-final-school-ELA.csv', 'ELA Total Tested', 'ELA Proficient %', '3_ENG'),
+		inTest('IN/ilearn-2019-grade3-8-final-school-math.csv', 'Math Total Tested', 'Math Proficient %', '3_MATH'),
+		inTest('IN/ILEARN-2021-Grade3-8-Final-School-ELA.csv', 'ELA Total Tested', 'ELA Proficient %', '5_ENG'),
+		inTest('IN/ILEARN-2021-Grade3-8-Final-School-Math.csv', 'Math Total Tested', 'Math Proficient %', '5_MATH')
+	]},
+	# exported from https://www.zelma.ai/data
+	"Iowa": {'state': 'IA', 'join': iaMaskedSchoolID, 'tests': [
+		edcTest('IA/edc-2.1-iowa-2019.csv', 'G03', 'math', '3_MATH', iaKey, ['*', '.']),
+		edcTest('IA/edc-2.1-iowa-2019.csv', 'G03', 'ela', '3_ENG', iaKey, ['*', '.']),
+		edcTest('IA/IA_AssmtData_2021.csv', 'G05', 'math', '5_MATH', iaKey, ['*', '.']),
+		edcTest('IA/IA_AssmtData_2021.csv', 'G05', 'ela', '5_ENG', iaKey, ['*', '.'])
+	]},
+	# exported from https://doe.louisiana.gov/data-and-reports/elementary-and-middle-school-performance
+	"Louisiana": {'state': 'LA', 'join': 'ST_SCHID', 'tests': [
+		laTest('LA/2019-school-leap-2025-achievement-level-summary.csv', 3),
+		laTest('LA/2021-leap-2025-state-lea-school-achievement-level-summary.csv', 5)
+	]},
+	# exported from https://mdek12.org/publicreporting/assessment/
+	"Mississippi": {'state': 'MS', 'join': 'COMBOKEY', 'tests': [
+		{'file': 'MS/MS-All-COMBOKEY.csv', 'key': lambda row: row['COMBOKEY'],
+			'filter': lambda row: row.get('Math 2019 Level 3 (PCT)') != '*' #exclude those with no data provided
+				and row.get('2021 Math Level 3 (PCT)') != '*',
+			'fields': msFields()}
+	]},
+	# exported from https://nep.education.ne.gov/#/data-downloads
+	"Nebraska": {'state': 'NE', 'join': 'ST_SCHID', 'tests': [
+		neTest('NE/NSCAS_ELA_Proficient_20202021.csv', '2018-2019', '03', '3_ENG'),
+		neTest('NE/NSCAS_Math_Proficient_20202021.csv', '2018-2019', '03', '3_MATH'),
+		neTest('NE/NSCAS_ELA_Proficient_20202021.csv', '2020-2021', '05', '5_ENG'),
+		neTest('NE/NSCAS_Math_Proficient_20202021.csv', '2020-2021', '05', '5_MATH')
+	]},
+	# exported from https://ed.sc.gov/data/test-scores/state-assessments/sc-ready/
+	"South Carolina": {'state': 'SC', 'join': 'ST_SCHID', 'tests': [
+		scTest('SC/SCREADY 2018-2019 Press Release v2.csv', '03', 3),
+		scTest('SC/SCREADY 2020-2021 Press Release V3.csv', '05', 5)
+	]},
+	# exported from https://www.zelma.ai/data
+	"South Dakota": {'state': 'SD', 'join': 'ST_SCHID', 'tests': [
+		edcTest('SD/edc-2.1-south dakota-2019.csv', 'G03', 'math', '3_MATH', lambda row: f"SD-{row['StateAssignedSchID']}", ['*']),
+		edcTest('SD/edc-2.1-south dakota-2019.csv', 'G03', 'ela', '3_ENG', lambda row: f"SD-{row['StateAssignedSchID']}", ['*']),
+		edcTest('SD/edc-2.1-south dakota-2021.csv', 'G05', 'math', '5_MATH', lambda row: f"SD-{row['StateAssignedSchID']}", ['*']),
+		edcTest('SD/edc-2.1-south dakota-2021.csv', 'G05', 'ela', '5_ENG', lambda row: f"SD-{row['StateAssignedSchID']}", ['*'])
+	]},
+	# exported from https://txresearchportal.com/
+	"Texas": {'state': 'TX', 'join': 'ST_SCHID', 'tests': [
+		txTest('TX/TX-Reading-3.csv', 'STAAR - Reading', '3_ENG'),
+		txTest('TX/TX-Math-3.csv', 'STAAR - Mathematics', '3_MATH'),
+		txTest('TX/TX-Reading-5.csv', 'STAAR - Reading', '5_ENG'),
+		txTest('TX/TX-Math-5.csv', 'STAAR - Mathematics', '5_MATH')
+	]},
+	# exported from https://schools.utah.gov/datastatistics/reports
+	"Utah": {'state': 'UT', 'join': 'COMBOKEY', 'tests': [
+		utTest('2019', 'English Language Arts', '3rd Grade Language Arts', '3_ENG'),
+		utTest('2019', 'Mathematics', '3rd Grade Math', '3_MATH'),
+		utTest('2021', 'English Language Arts', '5th Grade Language Arts', '5_ENG'),
+		utTest('2021', 'Mathematics', '5th Grade Math', '5_MATH')
+	]},
+	# exported from https://education.vermont.gov/sites/aoe/files/documents/Assessment_Sept2023.zip
+	"Vermont": {'state': 'VT', 'join': 'ST_SCHID_shortened', 'derived': {'ST_SCHID_shortened': vtShortSchoolID},
+		'pivot': {'by': ['OrganizationIdentifer', 'TestName', 'AssessGroup'], 'indicator': 'IndicatorLabel', 'value': 'SchoolValue'}, 'tests': [
+		vtTest('VT/Smarter Balance_Assessment_2019.csv', 'SB English Language Arts Grade 03', '3_ENG'),
+		vtTest('VT/Smarter Balance_Assessment_2019.csv', 'SB Math Grade 03', '3_MATH'),
+		vtTest('VT/Smarter Balance_Assessment_2021.csv', 'SB English Language Arts Grade 05', '5_ENG'),
+		vtTest('VT/Smarter Balance_Assessment_2021.csv', 'SB Math Grade 05', '5_MATH')
+	]},
+	# exported from https://edu.wyoming.gov/data/assessment-reports/
+	"Wyoming": {'state': 'WY', 'join': 'COMBOKEY', 'tests': [
+		wyTest('2018-19', 'English Language Arts (ELA)', 3, '3_ENG'),
+		wyTest('2018-19', 'Math', 3, '3_MATH'),
+		wyTest('2020-21', 'English Language Arts (ELA)', 5, '5_ENG'),
+		wyTest('2020-21', 'Math', 5, '5_MATH')
+	]}
+}
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+'''This script writes synthetic CRDC, CCD, SAIPE, and state assessment CSV
+   files in the exact layouts read by dataImportProcessingARP so the
+   ingestion pipeline can be run and benchmarked without the restricted
+   raw files'''
+
+
+# import relevant Python libraries
+import argparse
+import csv
+import os
+import random
+
+# the 14 study states: postal code, FIPS code
+studyStates = {'AL': '01', 'AR': '05', 'GA': '13', 'IN': '18', 'IA': '19', 'LA': '22', 'MS': '28',
+	'NE': '31', 'SC': '45', 'SD': '46', 'TX': '48', 'UT': '49', 'VT': '50', 'WY': '56'}
+
+# a few non-study states so national files contain rows that must be filtered out
+otherStates = {'AK': '02', 'CA': '06', 'NY': '36', 'OH': '39', 'WA': '53'}
+
+enrollmentCategories = ['SCH_ENR_HI_M', 'SCH_ENR_HI_F', 'SCH_ENR_AM_M', 'SCH_ENR_AM_F', 'SCH_ENR_AS_M', 'SCH_ENR_AS_F', 'SCH_ENR_HP_M', 'SCH_ENR_HP_F', 'SCH_ENR_BL_M', 'SCH_ENR_BL_F', 'SCH_ENR_WH_M', 'SCH_ENR_WH_F', 'SCH_ENR_TR_M', 'SCH_ENR_TR_F']
+
+# write a list of rows to a CSV file, creating parent directories as needed
+def writeCSV (path, header, rows, encoding=None):
+	os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+	with open(path, mode="w", newline="", encoding=encoding) as csvFile:
+		writer = csv.writer(csvFile)
+		if header:
+			writer.writerow(header)
+		writer.writerows(rows)
+
+# format a percentage with a trailing % sign
+def pct (value):
+	return f"{value:.1f}%"
+
+# build the list of synthetic schools with their national identifiers and latent characteristics
+def makeSchools (schoolCount, rng):
+	allStates = {**studyStates, **otherStates}
+	codes = list(allStates)
+	# weight study states so most schools are in the study
+	weights = [3 if code in studyStates else 1 for code in codes]
+	schools = []
+	districtCounter = {}
+	for i in range(schoolCount):
+		state = rng.choices(codes, weights)[0]
+		fips = allStates[state]
+		# roughly 8 schools per district
+		districtNumber = districtCounter.setdefault(state, 0) // 8 + 1
+		districtCounter[state] += 1
+		leaid = f"{fips}{districtNumber:05d}"
+		schid = f"{districtCounter[state]:05d}"
+		schools.append({
+			'state': state,
+			'fips': fips,
+			'leaid': leaid,
+			'districtNumber': districtNumber,
+			'schoolNumber': districtCounter[state],
+			'combokey': leaid + schid,
+			'quality': rng.gauss(0, 1),
+			'growth': rng.gauss(0, 0.5),
+			'devices': rng.random(),
+			'enrollment': rng.randint(0, 900),
+		})
+	return schools
+
+# derive each school's state-assigned school ID (CCD ST_SCHID) in the format the state adapters expect
+def stateSchoolID (school):
+	state, d, s = school['state'], school['districtNumber'], school['schoolNumber']
+	if state == 'AR':
+		return f"AR-{d:07d}-{s:07d}"
+	if state == 'GA':
+		return f"GA-{600 + d}-{s:04d}"
+	if state == 'IN':
+		return f"IN-{d:04d}-{s:04d}"
+	if state == 'IA':
+		return f"IA-{d % 100:02d}{d:04d} 000-{d % 100:02d}{d:04d} {s:03d}"
+	if state == 'LA':
+		return f"LA-{d:03d}-{d:03d}{s:03d}"
+	if state == 'NE':
+		return f"NE-{d % 90:02d}{d:04d}000-{d % 90:02d}{d:04d}{s:03d}"
+	if state == 'SC':
+		return f"SC-{d:04d}-{s:03d}"
+	if state == 'SD':
+		return f"SD-{d:05d}{s:02d}"
+	if state == 'TX':
+		return f"TX-{d:06d}-{d:06d}{s:03d}"
+	if state == 'VT':
+		return f"VT-T{d:03d}-PS{s:03d}"
+	return f"{state}-{d:03d}-{s:05d}"
+
+# generate a pass percentage and tested count for a school, grade and subject
+def schoolResult (school, grade, subject, rng):
+	shift = school['growth'] if grade == 5 else 0
+	shift += 0.15 if subject == 'MATH' else 0
+	passRate = min(max(50 + 18 * (school['quality'] + shift) + rng.gauss(0, 4), 0), 100)
+	tested = max(int(school['enrollment'] / 6 * rng.uniform(0.8, 1.2)), 0)
+	return round(passRate, 1), tested
+
+# write the national CRDC, CCD, and SAIPE files
+def writeNational (schools, rng, root):
+	# CRDC school characteristics; padded with extra columns to match the width of the real file
+	extraColumns = [f"SCH_GRADE_G{grade:02d}" for grade in range(1, 13)] + ['SCH_UGDETAILS_IND', 'SCH_STATUS_JJ']
+	header = ['LEA_STATE', 'LEA_STATE_NAME', 'LEAID', 'LEA_NAME', 'SCHID', 'SCH_NAME', 'COMBOKEY', 'JJ',
+		'SCH_STATUS_SPED', 'SCH_STATUS_MAGNET', 'SCH_STATUS_CHARTER', 'SCH_STATUS_ALT'] + extraColumns
+	rows = []
+	for school in schools:
+		flags = ['Yes' if rng.random() < 0.04 else 'No' for _ in range(4)]
+		rows.append([school['state'], school['state'] + ' State', school['leaid'], f"District {school['leaid']}",
+			school['combokey'][7:], f"School {school['combokey']}", school['combokey'], 'No'] + flags
+			+ [rng.choice(['Yes', 'No']) for _ in extraColumns])
+	writeCSV(f"{root}/2020-21-crdc-data/CRDC/School/School Characteristics.csv", header, rows)
+
+	# CRDC internet access and devices; -9 is a CRDC error code
+	header = ['LEA_STATE', 'LEAID', 'SCHID', 'COMBOKEY', 'SCH_INTERNET_FIBER', 'SCH_INTERNET_WIFI', 'SCH_INTERNET_SCHDEV', 'SCH_INTERNET_STUDDEV', 'SCH_INTERNET_WIFIENDEV']
+	rows = [[school['state'], school['leaid'], school['combokey'][7:], school['combokey'], 'Yes', 'Yes', 'Yes', 'Yes',
+		-9 if rng.random() < 0.02 else int(school['devices'] * school['enrollment'] * 1.1)]
+		for school in schools]
+	writeCSV(f"{root}/2020-21-crdc-data/CRDC/School/Internet Access and Devices.csv", header, rows)
+
+	# CRDC COVID directional indicators
+	header = ['LEA_STATE', 'LEAID', 'SCHID', 'COMBOKEY', 'SCH_DIND_INSTRUCTIONTYPE', 'SCH_DIND_VIRTUALTYPE']
+	rows = [[school['state'], school['leaid'], school['combokey'][7:], school['combokey'],
+		rng.choices(['A', 'B', 'C', 'D'], [5, 1, 3, 2])[0], rng.choice(['A', 'B', 'C'])]
+		for school in schools]
+	writeCSV(f"{root}/2020-21-crdc-data/CRDC/School/COVID Directional Indicators.csv", header, rows)
+
+	# CRDC enrollment by race and sex; negative values are CRDC error codes
+	header = ['LEA_STATE', 'LEAID', 'SCHID', 'COMBOKEY'] + enrollmentCategories + ['TOT_ENR_M', 'TOT_ENR_F']
+	rows = []
+	for school in schools:
+		shares = [rng.random() for _ in enrollmentCategories]
+		counts = [-9 if rng.random() < 0.01 else int(school['enrollment'] * share / sum(shares)) for share in shares]
+		rows.append([school['state'], school['leaid'], school['combokey'][7:], school['combokey']] + counts
+			+ [sum(counts[0::2]), sum(counts[1::2])])
+	writeCSV(f"{root}/2020-21-crdc-data/CRDC/School/Enrollment.csv", header, rows)
+
+	# CCD directory file (Latin-1, with a quoted multi-line address field like the published file)
+	header = ['SCHOOL_YEAR', 'FIPST', 'ST', 'SCH_NAME', 'LEAID', 'ST_SCHID', 'NCESSCH', 'MSTREET1', 'TITLEI_STATUS']
+	rows = [['2020-2021', school['fips'], school['state'], f"École {school['combokey']}", school['leaid'],
+		stateSchoolID(school), school['combokey'], f"{school['schoolNumber']} Main St\nSuite {school['districtNumber']}",
+		rng.choices(['TGELGBNOPROG', 'SWELIGSWPROG', 'NOTTITLE1ELIG', 'Not reported'], [4, 4, 3, 1])[0]]
+		for school in schools]
+	writeCSV("{0}/ccd_sch_129_2021_w_1a_080621/ccd_sch_129_2021_w_1a_080621.csv".format(root), header, rows, encoding="ISO-8859-1")
+
+	# SAIPE school district estimates (no header row, comma-formatted counts)
+	districts = {}
+	for school in schools:
+		districts.setdefault(school['leaid'], school)
+	rows = []
+	for leaid, school in districts.items():
+		students = rng.randint(500, 60000)
+		rows.append([school['state'], leaid[:2], leaid[2:], f"District {leaid}", f"{students * 5:,}", f"{students:,}", f"{int(students * rng.uniform(0.05, 0.4)):,}"])
+	writeCSV(f"{root}/SAIPE/ussd20.csv", None, rows, encoding="ISO-8859-1")
+
+# write every state's assessment files in the state's published layout
+def writeStates (schools, rng, root):
+	byState = {state: [school for school in schools if school['state'] == state] for state in studyStates}
+
+	# only a share of schools report results each year, so joins are partial
+	def reported (rate=0.9):
+		return rng.random() < rate
+
+	# Alabama: one file per year, keyed on COMBOKEY without its leading zero
+	for year, subjects, grade in [('2019', ['Reading', 'Math'], 3), ('2021', ['ELA', 'Math'], 5)]:
+		rows = []
+		for school in byState['AL']:
+			for subject in subjects:
+				if not reported():
+					continue
+				passRate, tested = schoolResult(school, grade, 'MATH' if subject == 'Math' else 'ENG', rng)
+				levels = [100 - passRate - 20, 20, passRate - 10, 10]
+				enrolled = '*' if rng.random() < 0.03 else tested + 2
+				rows.append([school['combokey'][1:], subject, enrolled, '*' if rng.random() < 0.1 else tested,
+					'*' if rng.random() < 0.2 else passRate] + [rng.choice(['*', '~']) if rng.random() < 0.1 else round(level, 1) for level in levels])
+		writeCSV(f"{root}/AL/AL-{year}-COMBOKEY.csv", ['COMBOKEY', 'Subject', 'Enrolled', 'Tested', 'Proficient Rate', 'Level 1 %', 'Level 2 %', 'Level 3 %', 'Level 4 %'], rows)
+
+	# Arkansas: one ACT Aspire summary per year with ELA and math on the same row
+	for path, gradeColumn, grade in [('AR/20201203132354_ACT_Aspire_Summary_10052020.csv', 'Grade', 3), ('AR/ACT_Aspire_Summary_Post_Appeals_Spring_2021_20210930124157.csv', 'Grade Level', 5)]:
+		rows = []
+		for school in byState['AR']:
+			for rowGrade in [3, 4, 5]:
+				_, d, s = stateSchoolID(school).split('-')
+				engPass, engTested = schoolResult(school, grade, 'ENG', rng)
+				mathPass, mathTested = schoolResult(school, grade, 'MATH', rng)
+				rows.append([d, s, f"{rowGrade:02d}", 'N<10' if engTested < 10 else engTested, pct(engPass), mathTested, pct(mathPass)])
+		writeCSV(f"{root}/{path}", ['District LEA', 'School LEA', gradeColumn, 'English N', 'English % Met Readiness Benchmark', 'Math N', 'Math % Met Readiness Benchmark'], rows)
+
+	# Georgia: EOG by grade, subgroup and subject; 'TFS' marks too few students
+	for path, grade in [('GA/EOG_2019_By_Grad_FEB_24_2020.csv', 3), ('GA/EOG_2021_by_grade_March_7_2022.csv', 5)]:
+		rows = []
+		for school in byState['GA']:
+			_, district, instn = stateSchoolID(school).split('-')
+			for subject, code in [('English Language Arts', 'ENG'), ('Mathematics', 'MATH')]:
+				for subgroup in ['All Students', 'Female']:
+					passRate, tested = schoolResult(school, grade, code, rng)
+					rows.append([district, instn.lstrip('0'), subgroup, subject, rng.choice([f"{grade:02d}", str(grade)]),
+						'TFS' if tested < 10 else tested, round(passRate * 0.7, 1), round(passRate * 0.3, 1)])
+		writeCSV(f"{root}/{path}", ['SCHOOL_DISTRCT_CD', 'INSTN_NUMBER', 'SUBGROUP_NAME', 'TEST_CMPNT_TYP_NM', 'ACDMC_LVL', 'NUM_TESTED_CNT', 'PROFICIENT_PCT', 'DISTINGUISHED_PCT'], rows)
+
+	# Indiana: separate ILEARN files per year and subject; '***' marks suppression
+	for path, prefix, code, grade in [('IN/ilearn-2019-grade3-8-final-school-ELA.csv', 'ELA', 'ENG', 3), ('IN/ilearn-2019-grade3-8-final-school-math.csv', 'Math', 'MATH', 3),
+			('IN/ILEARN-2021-Grade3-8-Final-School-ELA.csv', 'ELA', 'ENG', 5), ('IN/ILEARN-2021-Grade3-8-Final-School-Math.csv', 'Math', 'MATH', 5)]:
+		rows = []
+		for school in byState['IN']:
+			_, corp, sch = stateSchoolID(school).split('-')
+			passRate, tested = schoolResult(school, grade, code, rng)
+			rows.append([corp, sch, tested, rng.choice(['***', '']) if tested < 10 or not reported(0.97) else pct(passRate)])
+		writeCSV(f"{root}/{path}", ['Corp ID', 'School ID', f"{prefix} Total Tested", f"{prefix} Proficient %"], rows)
+
+	# Iowa and South Dakota: Zelma EDC layout; state IDs partially masked in Iowa
+	for state, files in [('IA', [('IA/edc-2.1-iowa-2019.csv', 'G03', 3), ('IA/IA_AssmtData_2021.csv', 'G05', 5)]),
+			('SD', [('SD/edc-2.1-south dakota-2019.csv', 'G03', 3), ('SD/edc-2.1-south dakota-2021.csv', 'G05', 5)])]:
+		for path, gradeLevel, grade in files:
+			rows = []
+			for school in byState[state]:
+				stSchID = stateSchoolID(school)
+				if state == 'IA':
+					distID, schID = str(school['districtNumber']), f"{school['districtNumber']:04d}{school['schoolNumber']:03d}"
+				else:
+					distID, schID = stSchID[3:8], stSchID[3:]
+				for subject, code in [('math', 'MATH'), ('ela', 'ENG')]:
+					for level in ['G03', 'G05', 'G38']:
+						passRate, tested = schoolResult(school, grade, code, rng)
+						rows.append([distID, schID, level, 'All Students', 'School', subject,
+							'*' if tested < 10 else tested, rng.choice(['*', '.'] if state == 'IA' else ['*']) if not reported(0.95) else round(passRate / 100, 4)])
+			writeCSV(f"{root}/{path}", ['StateAssignedDistID', 'StateAssignedSchID', 'GradeLevel', 'StudentGroup', 'DataLevel', 'Subject', 'StudentSubGroup_TotalTested', 'ProficientOrAbove_percent'], rows)
+
+	# Louisiana: LEAP achievement level summaries; '≤1' is a censored percentage
+	for path, grade in [('LA/2019-school-leap-2025-achievement-level-summary.csv', 3), ('LA/2021-leap-2025-state-lea-school-achievement-level-summary.csv', 5)]:
+		rows = []
+		for school in byState['LA']:
+			siteCode = stateSchoolID(school).split('-')[2]
+			engPass, tested = schoolResult(school, grade, 'ENG', rng)
+			mathPass, _ = schoolResult(school, grade, 'MATH', rng)
+			def level (value):
+				return '≤1' if value <= 1 else int(value)
+			rows.append([siteCode, '<10' if tested < 10 else f" {tested}", level(engPass * 0.2), 'NR' if not reported(0.97) else level(engPass * 0.8),
+				level(mathPass * 0.2), level(mathPass * 0.8)])
+		writeCSV(f"{root}/{path}", ['Site Code', 'Total Students Tested in at Least One Subject', 'ELA A', 'ELA M', 'Math A', 'Math M'], rows, encoding="utf-8")
+
+	# Mississippi: a single wide file with both years, keyed on COMBOKEY
+	header = ['COMBOKEY']
+	for prefix in ['ELA 2019', 'Math 2019', '2021 ELA', '2021 Math']:
+		header += [f"{prefix} Test-Takers", f"{prefix} Level 3 (PCT)", f"{prefix} Level 4 (PCT)", f"{prefix} Level 5 (PCT)"]
+	rows = []
+	for school in byState['MS']:
+		row = [school['combokey']]
+		suppressed = not reported(0.97)
+		for grade, code in [(3, 'ENG'), (3, 'MATH'), (5, 'ENG'), (5, 'MATH')]:
+			passRate, tested = schoolResult(school, grade, code, rng)
+			row += [f"{tested}.0", '*' if suppressed else pct(passRate * 0.5), pct(passRate * 0.3), pct(passRate * 0.2)]
+		rows.append(row)
+	writeCSV(f"{root}/MS/MS-All-COMBOKEY.csv", header, rows)
+
+	# Nebraska: NSCAS proficiency files per subject with both years; -1 marks suppression
+	for path, code in [('NE/NSCAS_ELA_Proficient_20202021.csv', 'ENG'), ('NE/NSCAS_Math_Proficient_20202021.csv', 'MATH')]:
+		rows = []
+		for school in byState['NE']:
+			stSchID = stateSchoolID(school).split('-')[2]
+			for schoolYear, grade in [('2018-2019', 3), ('2018-2019', 5), ('2020-2021', 3), ('2020-2021', 5)]:
+				for category in ['All Students', 'Male']:
+					passRate, tested = schoolResult(school, grade, code, rng)
+					suppressed = tested < 10
+					rows.append([stSchID[:2], stSchID[2:6], stSchID[6:], category, schoolYear, f"{grade:02d}", tested,
+						'-1' if suppressed else round(passRate * 0.8, 2), '-1' if suppressed else round(passRate * 0.2, 2)])
+		writeCSV(f"{root}/{path}", ['County', 'District', 'School', 'Category', 'School Year', 'Grade', 'Student Count', 'Proficient Pct', 'Advanced Pct'], rows)
+
+	# South Carolina: SC READY press release files, ELA and math on the same row
+	for path, grade in [('SC/SCREADY 2018-2019 Press Release v2.csv', 3), ('SC/SCREADY 2020-2021 Press Release V3.csv', 5)]:
+		rows = []
+		for school in byState['SC']:
+			_, d, s = stateSchoolID(school).split('-')
+			for testGrade in ['03', '04', '05']:
+				for demo in ['01ALL', '02MALE']:
+					engPass, engTested = schoolResult(school, grade, 'ENG', rng)
+					mathPass, mathTested = schoolResult(school, grade, 'MATH', rng)
+					rows.append([d + s, testGrade, demo, engTested, engPass if reported(0.97) else '', mathTested, mathPass])
+		writeCSV(f"{root}/{path}", ['schoolid', 'testgrade', 'demoID', 'ELAN', 'ELApct34', 'MathN', 'Mathpct34'], rows)
+
+	# Texas: one research portal export per grade and subject
+	for path, testType, code, grade in [('TX/TX-Reading-3.csv', 'STAAR - Reading', 'ENG', 3), ('TX/TX-Math-3.csv', 'STAAR - Mathematics', 'MATH', 3),
+			('TX/TX-Reading-5.csv', 'STAAR - Reading', 'ENG', 5), ('TX/TX-Math-5.csv', 'STAAR - Mathematics', 'MATH', 5)]:
+		rows = []
+		for school in byState['TX']:
+			cdc = stateSchoolID(school).split('-')[2]
+			for group in ['All Students', 'Hispanic']:
+				passRate, tested = schoolResult(school, grade, code, rng)
+				blank = not reported(0.95)
+				rows.append([cdc, group, '' if blank else tested, '' if blank else passRate])
+		writeCSV(f"{root}/{path}", ['ID/CDC', 'Student Group', f"{testType}|Tests Taken", f"{testType}|Performance Levels|Meets and Above|Percentage"], rows)
+
+	# Utah and Wyoming: a single long file keyed on COMBOKEY with ranged and censored percentages
+	def censoredPercent (passRate, allowRange):
+		draw = rng.random()
+		if draw < 0.05:
+			return '<=10%'
+		if draw < 0.1:
+			return '>=90%'
+		if allowRange and draw < 0.2:
+			low = int(passRate // 10 * 10)
+			return f"{low}-{low + 9}%"
+		return f"{int(passRate)}%"
+	rows = []
+	for school in byState['UT']:
+		for schoolYear, grade, gradeLabel in [('2019', 3, '3rd Grade'), ('2021', 5, '5th Grade')]:
+			for subject, code, suffix in [('English Language Arts', 'ENG', 'Language Arts'), ('Mathematics', 'MATH', 'Math')]:
+				passRate, tested = schoolResult(school, grade, code, rng)
+				rows.append([school['combokey'], schoolYear, f"{gradeLabel} {suffix}", subject, tested, 'N<10' if tested < 10 else censoredPercent(passRate, True)])
+	writeCSV(f"{root}/UT/UT-all-COMBOKEY.csv", ['Combokey', 'School Year', 'Grade', 'Subject', 'Number Students', 'Percent Proficient'], rows)
+	rows = []
+	for school in byState['WY']:
+		for schoolYear, grade in [('2018-19', 3), ('2020-21', 5)]:
+			for subject, code in [('English Language Arts (ELA)', 'ENG'), ('Math', 'MATH')]:
+				passRate, tested = schoolResult(school, grade, code, rng)
+				low = tested // 10 * 10
+				rows.append([school['combokey'], schoolYear, grade, subject, f"{low}-{low + 9}", '.' if tested < 10 else censoredPercent(passRate, False)])
+	writeCSV(f"{root}/WY/WY-all-COMBOKEY.csv", ['COMBOKEY', 'SCHOOL YEAR', 'GRADE', 'SUBJECT', 'NUMBER OF STUDENTS TESTED', 'PERCENT PROFICIENT ADVANCED'], rows)
+
+	# Vermont: long indicator format, one row per organization x test x group x indicator
+	for path, grade in [('VT/Smarter Balance_Assessment_2019.csv', 3), ('VT/Smarter Balance_Assessment_2021.csv', 5)]:
+		rows = []
+		for school in byState['VT']:
+			organization = stateSchoolID(school).split('-')[2]
+			for testGrade in [3, 4, 5]:
+				for subject, code in [('English Language Arts', 'ENG'), ('Math', 'MATH')]:
+					testName = f"SB {subject} Grade {testGrade:02d}"
+					for group in ['All Students', 'Female']:
+						passRate, tested = schoolResult(school, grade, code, rng)
+						suppressed = tested < 11
+						for indicator, value in [('Number of Students Tested', tested), ('Total Proficient and Above', passRate), ('Proficient', passRate * 0.7)]:
+							rows.append([organization, testName, group, indicator, '' if suppressed else value])
+		writeCSV(f"{root}/{path}", ['OrganizationIdentifer', 'TestName', 'AssessGroup', 'IndicatorLabel', 'SchoolValue'], rows)
+
+# write a complete synthetic input tree
+def generate (root, schoolCount=5000, seed=0):
+	rng = random.Random(seed)
+	schools = makeSchools(schoolCount, rng)
+	writeNational(schools, rng, root)
+	writeStates(schools, rng, root)
+	return schools
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('root', help="directory to write the synthetic input tree into")
+	parser.add_argument('--schools', type=int, default=5000, help="number of schools nationwide (default 5000)")
+	parser.add_argument('--seed', type=int, default=0, help="random seed (default 0)")
+	args = parser.parse_args()
+	generate(args.root, args.schools, args.seed)
+	print(f"wrote synthetic inputs for {args.schools} schools to {args.root}")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+'''This script sweeps grids of non-1:1 and 1:1 device-ratio thresholds: it
+   sorts schools by RATIO_DEVICES_TO_ENROLLMENT once and reads every
+   threshold pair's group sizes, means and variances from prefix sums, giving
+   the t test (as pingouin.ttest with correction='auto'), Cohen's d, and the
+   mean difference for the whole grid in a few array operations'''
+
+
+# import relevant Python libraries
+import numpy as np
+import pandas as pd
+from scipy.special import stdtr
+
+# function for sweeping every pair of a non-1:1 threshold (ratio <= low) and a 1:1 threshold (ratio >= high)
+# returns a dict of (len(lows), len(highs)) arrays; pairs with low >= high would overlap and are NaN
+def thresholdSweep (ratios, values, lows, highs):
+	ratios, values = np.asarray(ratios, dtype=np.float64), np.asarray(values, dtype=np.float64)
+	lows, highs = np.asarray(lows, dtype=np.float64), np.asarray(highs, dtype=np.float64)
+
+	# drop schools without a value, and sort by ratio once
+	keep = ~np.isnan(values) & ~np.isnan(ratios)
+	order = np.argsort(ratios[keep], kind='stable')
+	ratios, values = ratios[keep][order], values[keep][order]
+
+	# prefix sums of values centred on their mean (which keeps the variances from losing precision)
+	center = values.mean() if len(values) else 0.0
+	sums = np.concatenate([[0.0], np.cumsum(values - center)])
+	squares = np.concatenate([[0.0], np.cumsum((values - center)**2)])
+
+	# group sizes: a prefix of the sorted schools for the non-1:1 group, a suffix for the 1:1 group
+	total, shape = len(values), (len(lows), len(highs))
+	n1 = np.broadcast_to(np.searchsorted(ratios, lows, side='right')[:, None], shape)
+	n2 = np.broadcast_to(total - np.searchsorted(ratios, highs, side='left')[None, :], shape)
+	sum1, square1 = sums[n1], squares[n1]
+	sum2, square2 = sums[total] - sums[total - n2], squares[total] - squares[total - n2]
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+		# means and sample variances of both groups
+		mean1, mean2 = sum1/n1 + center, sum2/n2 + center
+		var1 = np.maximum(square1 - sum1**2/n1, 0) / (n1 - 1)
+		var2 = np.maximum(square2 - sum2**2/n2, 0) / (n2 - 1)
+
+		# Welch t test with Welch-Satterthwaite degrees of freedom; Student's pooled t test when the groups are the same size
+		pooled = ((n1 - 1)*var1 + (n2 - 1)*var2) / (n1 + n2 - 2)
+		equal = n1 == n2
+		se = np.where(equal, np.sqrt(pooled*(1/n1 + 1/n2)), np.sqrt(var1/n1 + var2/n2))
+		dof = np.where(equal, n1 + n2 - 2, (var1/n1 + var2/n2)**2 / ((var1/n1)**2/(n1 - 1) + (var2/n2)**2/(n2 - 1)))
+		t = (mean1 - mean2) / se
+		p = 2*stdtr(dof, -np.abs(t))
+
+		# Cohen's d with the pooled standard deviation (unsigned, as pingouin reports it)
+		cohenD = np.abs(mean1 - mean2) / np.sqrt(pooled)
+
+	sweep = {'low': np.broadcast_to(lows[:, None], shape), 'high': np.broadcast_to(highs[None, :], shape),
+		'n1': n1, 'n2': n2, 'mean1': mean1, 'mean2': mean2, 'sd1': np.sqrt(var1), 'sd2': np.sqrt(var2),
+		'meanDifference': mean2 - mean1, 'T': t, 'dof': dof, 'p': p, 'cohenD': cohenD}
+
+	# overlapping or too small groups have no test
+	invalid = (sweep['low'] >= sweep['high']) | (n1 < 2) | (n2 < 2)
+	for name in ['mean1', 'mean2', 'sd1', 'sd2', 'meanDifference', 'T', 'dof', 'p', 'cohenD']:
+		sweep[name] = np.where(invalid, np.nan, sweep[name])
+	return sweep
+
+# function for flattening a sweep into a tidy table with one row per threshold pair (low < high)
+def sweepTable (sweep):
+	table = pd.DataFrame({name: values.ravel() for name, values in sweep.items()})
+	return table[table['low'] < table['high']].reset_index(drop=True)
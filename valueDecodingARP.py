@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+'''This script decodes whole columns of published assessment values into
+   float arrays, classifying every cell as a plain value, a suppression
+   marker, a censored value, or a range, so the state specs get consistent
+   handling of the formats states use to hide small counts'''
+
+
+# import relevant Python libraries
+import numpy as np
+
+# reason codes returned for every cell
+VALUE, BLANK, SUPPRESSED, CENSORED, RANGE, INVALID = range(6)
+reasonNames = ['value', 'blank', 'suppressed', 'censored', 'range', 'invalid']
+
+# markers states publish in place of a value for small or missing groups
+suppressionMarkers = {'*', '~', '***', 'N<10', '<10', 'TFS', 'NR', '.'}
+
+# Rules for a source (all optional):
+#   'sentinels': extra suppression markers for this source, e.g. '-1'
+#   'fixed':     literal cells standing for a censored value, e.g. {'≤1': 0}
+#   'percent':   a trailing % sign is removed
+#   'bounds':    '<=N' and '>=N' percentages become the midpoints N/2 and (N + 100)/2
+#   'ranges':    'low-high' becomes the midpoint (low + high)/2
+
+# function for converting a numeric string to a float; returns (number, reason)
+def parseNumber (text, reason=VALUE):
+	try:
+		return float(text), reason
+	except ValueError:
+		return np.nan, INVALID
+
+# function for decoding one distinct cell with a source's rules; returns (number, reason)
+def decodeCell (value, rules, markers):
+	text = "" if value is None else value.strip()
+
+	# blanks, suppression markers and literal censored cells
+	if text == "":
+		return np.nan, BLANK
+	if text in markers:
+		return np.nan, SUPPRESSED
+	if text in rules.get('fixed', {}):
+		return rules['fixed'][text], CENSORED
+	if rules.get('percent'):
+		text = text.rstrip('%')
+
+	# censored percentages: midpoint of the interval below or above the bound
+	if rules.get('bounds'):
+		for prefix, offset in [('<=', 0), ('>=', 100)]:
+			if text.startswith(prefix):
+				number, reason = parseNumber(text.lstrip('<>='), CENSORED)
+				return (number + offset) / 2, reason
+
+	# ranges: midpoint of the low and high ends (a leading '-' is a sign, not a range)
+	if rules.get('ranges') and text.find('-', 1) > 0:
+		low, _, high = text.partition('-')
+		(low, lowReason), (high, highReason) = parseNumber(low, RANGE), parseNumber(high, RANGE)
+		if INVALID in (lowReason, highReason):
+			return np.nan, INVALID
+		return (low + high) / 2, RANGE
+
+	# plain numbers
+	return parseNumber(text)
+
+# function for decoding a column of cells with a source's rules; returns (float array, reason code array)
+# suppressed, blank and invalid cells are NaN
+def decodeValues (values, rules=None):
+	rules = rules or {}
+	markers = suppressionMarkers | set(rules.get('sentinels', ()))
+
+	# published columns repeat a small set of strings, so each distinct cell is decoded once and indexed back out
+	positions = {value: position for position, value in enumerate(set(values))}
+	decoded = [decodeCell(value, rules, markers) for value in positions]
+	codes = np.fromiter(map(positions.__getitem__, values), dtype=np.intp, count=len(values))
+	numbers = np.array([number for number, reason in decoded], dtype=np.float64)
+	reasons = np.array([reason for number, reason in decoded], dtype=np.uint8)
+	return numbers[codes], reasons[codes]
+
+# function for decoding a column that must hold a number in every cell; raises ValueError naming the offending cells
+def decodeRequired (values, column, rules=None):
+	numbers, reasons = decodeValues(values, rules)
+	bad = (reasons != VALUE) & (reasons != CENSORED) & (reasons != RANGE)
+	if bad.any():
+		examples = sorted({values[i] for i in np.flatnonzero(bad)[:5]}, key=str)
+		raise ValueError(f"{column}: {int(bad.sum())} cells without a value, e.g. {examples}")
+	return numbers